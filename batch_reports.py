@@ -0,0 +1,149 @@
+import pandas as pd
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from csv_processing import load_manifest_data, load_dim_weapon_data, load_dim_armour_data
+from data_preperation import owned_counted_list, not_owned_list, ownership_summary, crafted_weapon_list, owned_weapons_perk_list, perk_coverage, weapon_type_output_with_dim
+from build_optimizer import armour_skyline_report
+from clan_vaults import ClanVaultIndex
+
+# Vault Reports For Every Member In A Directory Of DIM Exports, Without Streamlit
+manifest_file = 'data/Master Weapon Manifest.csv'
+report_formats = ['parquet', 'csv']
+export_suffix_pattern = r'[-_ .]*(destiny)?[-_ .]*(weapons?|armou?r)$'
+
+# The Manifest Each Worker Reports Against - Loaded Once In The Parent And Handed To Every Worker As It Starts
+worker_manifest = None
+
+
+def export_kind(path):
+    # DIM weapon and armour exports told apart by their header - None for any other CSV
+    columns = pd.read_csv(path, nrows=0).columns
+    if 'Mobility (Base)' in columns:
+        return 'armour'
+    if any(col.startswith('Perks') for col in columns):
+        return 'weapons'
+    return None
+
+def member_exports(directory):
+    # {member: {'weapons': path, 'armour': path}} - a member is a sub-directory holding their exports, or for files directly in the
+    # directory the file name less any 'weapons' / 'armour' suffix (alice-weapons.csv, alice_destinyArmor.csv)
+    members = {}
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            if not file.lower().endswith('.csv'):
+                continue
+            path = os.path.join(root, file)
+            kind = export_kind(path)
+            if kind is None:
+                continue
+            if os.path.abspath(root) != os.path.abspath(directory):
+                member = os.path.relpath(root, directory)
+            else:
+                member = re.sub(export_suffix_pattern, '', os.path.splitext(file)[0], flags=re.IGNORECASE) or os.path.splitext(file)[0]
+            if kind in members.setdefault(member, {}):
+                raise ValueError('{} has more than one {} export: {} and {}'.format(member, kind, members[member][kind], path))
+            members[member][kind] = path
+    return dict(sorted(members.items()))
+
+def init_worker(manifest_weapon_data):
+    global worker_manifest
+    worker_manifest = manifest_weapon_data
+
+def member_reports(member, exports):
+    # Every per-member report, plus the member's weapon frame for the clan index
+    manifest_weapon_data = worker_manifest
+    start = time.perf_counter()
+    reports = {}
+    dim_weapon_data = None
+    summary = {'Member': member, 'Weapons': 0, 'Unique Weapons': 0, 'Crafted Weapons': 0, 'Armour Pieces': 0}
+    if 'weapons' in exports:
+        dim_weapon_data = load_dim_weapon_data(exports['weapons'], manifest_weapon_data)
+        perk_list = owned_weapons_perk_list(manifest_weapon_data, dim_weapon_data)
+        reports['vault_summary'] = weapon_type_output_with_dim(manifest_weapon_data, dim_weapon_data)
+        weapon_ownership = ownership_summary(dim_weapon_data)
+        reports['owned'] = owned_counted_list(weapon_ownership)
+        reports['not_owned'] = not_owned_list(manifest_weapon_data, weapon_ownership)
+        reports['crafted'] = crafted_weapon_list(dim_weapon_data).drop(columns=['index'], errors='ignore').reset_index(drop=True)
+        reports['perk_coverage'] = perk_coverage(manifest_weapon_data, perk_list)
+        summary.update({'Weapons': len(dim_weapon_data), 'Unique Weapons': dim_weapon_data['Weapon Name'].nunique(), 'Crafted Weapons': len(reports['crafted'])})
+    if 'armour' in exports:
+        dim_armour_data = load_dim_armour_data(exports['armour'])
+        reports['redundant_armour'] = armour_skyline_report(dim_armour_data)
+        summary['Armour Pieces'] = len(dim_armour_data)
+    summary['Seconds'] = round(time.perf_counter() - start, 3)
+    return member, reports, dim_weapon_data, summary
+
+def clan_reports(manifest_weapon_data, results):
+    # Clan-wide tables from every member's weapons - who owns what and who holds the most, what nobody owns, crafted copies and
+    # perk coverage across the clan
+    clan = {'members': pd.DataFrame([summary for _, _, _, summary in results])}
+    frames = {member: dim_weapon_data for member, _, dim_weapon_data, _ in results if dim_weapon_data is not None}
+    if len(frames) == 0:
+        return clan
+    clan_index = ClanVaultIndex(manifest_weapon_data, frames)
+    clan['owned'] = clan_index.clan_summary().reset_index(drop=True)
+    clan['not_owned'] = clan_index.not_owned().reset_index(drop=True)
+    clan['crafted'] = pd.concat([reports['crafted'].assign(Member=member) for member, reports, _, _ in results if 'crafted' in reports], ignore_index=True)
+    clan['perk_coverage'] = clan_index.perk_coverage().reset_index(drop=True)
+    return clan
+
+def write_reports(reports, directory, report_format):
+    os.makedirs(directory, exist_ok=True)
+    for name, df in reports.items():
+        path = os.path.join(directory, '{}.{}'.format(name, report_format))
+        if report_format == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description='Write vault reports for every member in a directory of DIM exports, plus clan-wide totals.')
+    parser.add_argument('exports', help='Directory of DIM weapon / armour CSV exports, one sub-directory per member or <member>-weapons.csv style names')
+    parser.add_argument('--output', default='reports', help='Directory the reports are written to')
+    parser.add_argument('--format', choices=report_formats, default=report_formats[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes (1 runs everything in this process)')
+    parser.add_argument('--manifest', default=manifest_file)
+    args = parser.parse_args()
+
+    members = member_exports(args.exports)
+    if len(members) == 0:
+        print('No DIM exports found in {}'.format(args.exports))
+        return 1
+    manifest_weapon_data = load_manifest_data(args.manifest)
+
+    # Fan Members Out Across The Pool - A Member Whose Exports Fail Is Reported And Skipped
+    start = time.perf_counter()
+    outcomes, failures = [], []
+    if args.workers == 1:
+        init_worker(manifest_weapon_data)
+        for member, exports in members.items():
+            try:
+                outcomes.append(member_reports(member, exports))
+            except Exception as error:
+                failures.append((member, error))
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(members)), initializer=init_worker, initargs=(manifest_weapon_data,)) as pool:
+            futures = {pool.submit(member_reports, member, exports): member for member, exports in members.items()}
+            for future in as_completed(futures):
+                try:
+                    outcomes.append(future.result())
+                except Exception as error:
+                    failures.append((futures[future], error))
+
+    results = sorted(outcomes, key=lambda outcome: outcome[0])
+    for member, reports, _, summary in results:
+        write_reports(reports, os.path.join(args.output, 'members', member), args.format)
+        print('{:<30} {:>6} weapons  {:>6} armour  {:.2f}s'.format(member, summary['Weapons'], summary['Armour Pieces'], summary['Seconds']))
+    write_reports(clan_reports(manifest_weapon_data, results), os.path.join(args.output, 'clan'), args.format)
+    for member, error in failures:
+        print('{:<30} failed: {}'.format(member, error))
+    print('{} members reported in {:.2f}s to {}'.format(len(results), time.perf_counter() - start, args.output))
+    return 1 if len(failures) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import time
+import numpy as np
+
+from csv_processing import armour_stat_matrix
+from build_optimizer import armour_skyline_report, skyline, stat_pairs
+from benchmarks.synthetic_vault import load_synthetic_dim_armour_data
+
+vault_sizes = [1000, 5000, 20000]
+pair_names = tuple(stat_pairs)
+repeats = 3
+
+
+def pairwise_non_dominated(stats):
+    # The all-pairs comparison the skyline replaces, kept here as the reference it is timed against
+    at_least = (stats[None, :, :] >= stats[:, None, :]).all(axis=2)
+    better = (stats[None, :, :] > stats[:, None, :]).any(axis=2)
+    dominated = (at_least & better).any(axis=1)
+    duplicate = np.tril(at_least & ~better, k=-1).any(axis=1)
+    return np.flatnonzero(~dominated & ~duplicate)
+
+
+def best_time(function, *args):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main():
+    for vault_size in vault_sizes:
+        dim_armour_data = load_synthetic_dim_armour_data(vault_size)
+
+        # Whole Report - Six-Stat Skyline Plus Every Stat Pair, For Every Class And Slot
+        report, report_time = best_time(armour_skyline_report.__wrapped__, dim_armour_data, pair_names)
+
+        # One Skyline Over Every Piece At Once Against The All-Pairs Reference
+        stats = armour_stat_matrix(dim_armour_data)
+        kept, skyline_time = best_time(skyline, stats)
+        reference, pairwise_time = best_time(pairwise_non_dominated, stats)
+        assert np.array_equal(kept, reference)
+        print('{:>6} pieces  {:>5} dominated  report {:.3f}s  |  all pieces: skyline {:.3f}s  pairwise {:.3f}s'.format(
+            vault_size, int(report['Dominated'].sum()), report_time, skyline_time, pairwise_time))
+
+
+if __name__ == '__main__':
+    main()
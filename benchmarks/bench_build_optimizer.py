@@ -0,0 +1,27 @@
+import time
+
+from build_optimizer import optimize_builds
+from benchmarks.synthetic_vault import load_synthetic_dim_armour_data
+
+vault_sizes = [200, 1000, 5000]
+target_tiers = [(0, 0, 0, 0, 0, 0), (7, 0, 7, 0, 0, 0)]
+repeats = 3
+
+
+def main():
+    for vault_size in vault_sizes:
+        dim_armour_data = load_synthetic_dim_armour_data(vault_size)
+
+        # Time The Uncached Search With And Without Targets
+        for targets in target_tiers:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                builds = optimize_builds.__wrapped__(dim_armour_data, 'Hunter', None, targets)
+                timings.append(time.perf_counter() - start)
+            best_tiers = builds['Total Tiers'].iloc[0] if len(builds) > 0 else 0
+            print('{:>6} pieces  targets {}  best {} tiers  best {:.3f}s'.format(vault_size, targets, best_tiers, min(timings)))
+
+
+if __name__ == '__main__':
+    main()
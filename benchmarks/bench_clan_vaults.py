@@ -0,0 +1,55 @@
+import time
+import numpy as np
+import pandas as pd
+
+from csv_processing import load_manifest_data
+from data_preperation import not_owned_list, ownership_summary
+from clan_vaults import ClanVaultIndex
+from benchmarks.synthetic_vault import load_synthetic_dim_weapon_data
+
+member_counts = [10, 50, 100, 200]
+vault_size = 500
+subset_size = 10
+repeats = 5
+
+
+def best_time(function, *args):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def table_top_holders(table, name, k):
+    # The same question asked of the merged table directly, for comparison - scans every member's rolls
+    return table.loc[table['Weapon Name'] == name, 'Member'].value_counts().head(k)
+
+
+def main():
+    manifest_weapon_data = load_manifest_data.__wrapped__('data/Master Weapon Manifest.csv')
+
+    # One Normalized Weapon Frame Per Member, Loaded The Same Way The App Loads Uploads
+    frames = {'Member {}'.format(member): load_synthetic_dim_weapon_data(manifest_weapon_data, vault_size, seed=member, duplicate_rate=0.1)
+              for member in range(max(member_counts))}
+
+    for member_count in member_counts:
+        members = dict(list(frames.items())[:member_count])
+        clan, build_time = best_time(ClanVaultIndex, manifest_weapon_data, members)
+        subset = list(members)[:subset_size]
+        name = clan.most_owned(1, by='Copies')['Weapon Name'].iat[0]
+
+        # Clan-Wide And Subset Queries Against The Sparse Ownership, And The Same Two Questions Asked Of The Merged Table
+        timings = {'nobody owns': best_time(clan.not_owned)[1], 'union {}'.format(subset_size): best_time(clan.union, subset)[1],
+                   'intersection {}'.format(subset_size): best_time(clan.intersection, subset)[1], 'top holders': best_time(clan.top_holders, name)[1],
+                   'top 20': best_time(clan.most_owned)[1], 'clan summary': best_time(clan.clan_summary)[1]}
+        nobody_table = best_time(lambda table: not_owned_list(manifest_weapon_data, ownership_summary(table)), clan.table)[1]
+        holders_table = best_time(table_top_holders, clan.table, name, 5)[1]
+        print('{:>4} members  {:>7} rolls  build {:.3f}s  |  {}  |  table scans: nobody owns {:.2f}ms  top holders {:.2f}ms'.format(
+            member_count, len(clan.table), build_time, '  '.join('{} {:.2f}ms'.format(query, seconds * 1000) for query, seconds in timings.items()),
+            nobody_table * 1000, holders_table * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+import time
+
+from csv_processing import load_manifest_data
+from data_preperation import owned_weapons_perk_list
+from benchmarks.synthetic_vault import load_synthetic_dim_weapon_data
+
+vault_sizes = [1000, 5000, 20000]
+repeats = 3
+
+
+def main():
+    manifest_weapon_data = load_manifest_data.__wrapped__('data/Master Weapon Manifest.csv')
+
+    for vault_size in vault_sizes:
+        dim_weapon_data = load_synthetic_dim_weapon_data(manifest_weapon_data, vault_size)
+
+        # Time The Uncached Function
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            df = owned_weapons_perk_list(manifest_weapon_data, dim_weapon_data)
+            timings.append(time.perf_counter() - start)
+        print('{:>6} rolls  {:>7} perk rows  best {:.3f}s'.format(vault_size, len(df), min(timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from csv_processing import load_manifest_data
+from snapshot_store import SnapshotStore
+from benchmarks.synthetic_vault import load_synthetic_dim_weapon_data
+
+vault_sizes = [1000, 5000]
+reuploads = 5
+churn_rate = 0.02
+repeats = 5
+
+
+def best_time(function, *args):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def table_rows(store, table):
+    return store.connection.execute('SELECT COUNT(*) FROM {}'.format(table)).fetchone()[0]
+
+
+def frame_delta(old, new):
+    # The same delta from two full frames held in memory, for comparison - a merge on Weapon ID then a column-wise compare
+    merged = old.merge(new, on='Weapon ID', how='outer', suffixes=('_old', '_new'), indicator=True)
+    both = merged.loc[merged['_merge'] == 'both']
+    columns = [col for col in new.columns if col != 'Weapon ID']
+    changed = np.zeros(len(both), dtype=bool)
+    for col in columns:
+        before, after = both[col + '_old'].astype(object), both[col + '_new'].astype(object)
+        changed |= ~((before == after) | (before.isna() & after.isna())).to_numpy(dtype=bool)
+    return (merged['_merge'] == 'right_only').sum(), (merged['_merge'] == 'left_only').sum(), changed.sum()
+
+
+def main():
+    manifest_weapon_data = load_manifest_data.__wrapped__('data/Master Weapon Manifest.csv')
+
+    for vault_size in vault_sizes:
+        # A Vault, Then The Same Vault After Some Rolls Are Dismantled, New Ones Dropped And Crafted Weapons Levelled
+        churn = int(vault_size * churn_rate)
+        weapons = load_synthetic_dim_weapon_data(manifest_weapon_data, vault_size + churn, seed=vault_size)
+        first = weapons.iloc[:vault_size].reset_index(drop=True)
+        second = weapons.iloc[churn:].reset_index(drop=True)
+        crafted = np.flatnonzero(second['Crafted Level'].notna().to_numpy())[:churn]
+        second.loc[crafted, 'Crafted Level'] += 1
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = SnapshotStore(os.path.join(directory, 'snapshots.sqlite'))
+            start = time.perf_counter()
+            first_id = store.save('bench', 'weapons', first)
+            first_save = time.perf_counter() - start
+
+            # Re-Uploading The Same Vault Only Adds Snapshot Rows
+            start = time.perf_counter()
+            for _ in range(reuploads):
+                store.save('bench', 'weapons', first)
+            reupload_save = (time.perf_counter() - start) / reuploads
+            items_after_reuploads, events_after_reuploads = table_rows(store, 'items'), table_rows(store, 'events')
+
+            start = time.perf_counter()
+            second_id = store.save('bench', 'weapons', second)
+            churn_save = time.perf_counter() - start
+
+            keys, keys_time = best_time(store.delta_keys, first_id, second_id)
+            delta, delta_time = best_time(store.delta, first_id, second_id)
+            _, load_time = best_time(store.load, second_id)
+            _, frame_time = best_time(frame_delta, first, second)
+            database_bytes = os.path.getsize(os.path.join(directory, 'snapshots.sqlite')) + os.path.getsize(os.path.join(directory, 'snapshots.sqlite-wal'))
+            counts = {name: len(df) for name, df in delta.items()}
+            store.close()
+
+        print('{:>5} items  save {:.1f}ms  re-upload {:.1f}ms ({} x: {} item rows, {} events)  churned save {:.1f}ms  |  delta ids {:.2f}ms  '
+              'delta frames {:.2f}ms {}  load {:.1f}ms  |  in-memory frame delta {:.2f}ms  |  {} snapshots in {:.2f}MB'.format(
+                  vault_size, first_save * 1000, reupload_save * 1000, reuploads, items_after_reuploads, events_after_reuploads, churn_save * 1000,
+                  keys_time * 1000, delta_time * 1000, counts, load_time * 1000, frame_time * 1000, reuploads + 2, database_bytes / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
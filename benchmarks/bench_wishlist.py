@@ -0,0 +1,36 @@
+import time
+
+from csv_processing import load_manifest_data
+from data_preperation import owned_weapons_perk_list
+from wishlist import parse_wishlist, perk_bits, compile_wishlist, match_wishlist
+from benchmarks.synthetic_vault import load_synthetic_dim_weapon_data, generate_dim_wishlist
+
+vault_sizes = [1000, 5000]
+wishlist_lines = [10000, 50000]
+repeats = 3
+
+
+def main():
+    manifest_weapon_data = load_manifest_data.__wrapped__('data/Master Weapon Manifest.csv')
+
+    for vault_size in vault_sizes:
+        perk_list = owned_weapons_perk_list(manifest_weapon_data, load_synthetic_dim_weapon_data(manifest_weapon_data, vault_size))
+
+        for line_count in wishlist_lines:
+            text = generate_dim_wishlist(manifest_weapon_data, line_count)
+
+            # Time Parsing And Compiling The Wishlist, Then Scoring The Vault Against It
+            compile_timings, match_timings = [], []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                compiled = compile_wishlist(parse_wishlist(text), perk_bits(manifest_weapon_data))
+                compiled_at = time.perf_counter()
+                matches = match_wishlist(compiled, perk_list)
+                compile_timings.append(compiled_at - start)
+                match_timings.append(time.perf_counter() - compiled_at)
+            print('{:>6} rolls  {:>6} lines  {:>6} matches  compile best {:.3f}s  match best {:.3f}s  total {:.3f}s'.format(
+                vault_size, line_count, len(matches), min(compile_timings), min(match_timings), min(compile_timings) + min(match_timings)))
+
+
+if __name__ == '__main__':
+    main()
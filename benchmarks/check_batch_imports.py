@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+# Checks The Batch CLI Loads Without Streamlit Or AgGrid - Each Module Is Imported In A Fresh Interpreter, So Nothing Loaded Here Leaks In
+batch_modules = ['batch_reports', 'csv_processing', 'data_preperation', 'build_optimizer', 'clan_vaults', 'wishlist', 'caching']
+ui_packages = ['streamlit', 'st_aggrid']
+probe = 'import sys, {module}; print(" ".join(name for name in {packages!r} if name in sys.modules))'
+
+
+def main():
+    failures = 0
+    for module in batch_modules:
+        result = subprocess.run([sys.executable, '-c', probe.format(module=module, packages=ui_packages)], capture_output=True, text=True)
+        loaded = result.stdout.split()
+        if result.returncode != 0:
+            outcome = 'FAILED TO IMPORT: {}'.format(result.stderr.strip().splitlines()[-1])
+        elif len(loaded) > 0:
+            outcome = 'LOADED {}'.format(', '.join(loaded))
+        else:
+            outcome = 'ok'
+        failures += outcome != 'ok'
+        print('{:<20} {}'.format(module, outcome))
+    return 1 if failures > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
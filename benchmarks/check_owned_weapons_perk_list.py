@@ -0,0 +1,145 @@
+import argparse
+import sys
+import time
+import pandas as pd
+
+from csv_processing import load_manifest_data
+from data_preperation import owned_weapons_perk_list
+from benchmarks.synthetic_vault import load_synthetic_dim_weapon_data
+
+# Checks The Long-Form owned_weapons_perk_list Against The Row-By-Row Version It Replaced, On Synthetic Vaults
+vault_sizes = [1000, 5000, 20000]
+baseline_chunk_size = 250
+
+
+def baseline_owned_weapons_perk_list(manifest_weapon_data, file):
+    # The previous implementation, kept as it was (less its st.cache_data decorator) - nested iterrows and a pd.concat per row
+    # Merge Data
+    df = pd.merge(file, manifest_weapon_data, on='Weapon Hash', how='left')
+
+    # Clean Up Columns
+    columns_to_drop = df.filter(like='_y')
+    df = df.drop(columns=columns_to_drop)
+    df.columns = [col.rstrip('_x') if col.endswith('_x') else col for col in df.columns]
+
+    # Define the list of columns to keep
+    columns_to_keep = [
+        'Weapon Name', 'Weapon Hash', 'Weapon ID', 'Perks 1', 'Perks 2', 'Perks 3', 'Perks 4', 'Perks 5', 'Perks 6', 'Perks 7', 'Perks 8',
+        'Perks 9', 'Perks 10', 'Perks 11', 'Perks 12', 'Perks 13', 'Perks 14', 'Perks 15', 'Perks 16', 'Perks 17',
+        'Slot 1 Perk 0', 'Slot 1 Perk 1', 'Slot 1 Perk 2', 'Slot 1 Perk 3', 'Slot 1 Perk 4', 'Slot 1 Perk 5','Slot 1 Perk 6',
+        'Slot 1 Perk 7', 'Slot 1 Perk 8', 'Slot 1 Perk 9', 'Slot 1 Perk 10', 'Slot 1 Perk 11', 'Slot 1 Perk 12',
+        'Slot 2 Perk 0', 'Slot 2 Perk 1', 'Slot 2 Perk 2', 'Slot 2 Perk 3', 'Slot 2 Perk 4', 'Slot 2 Perk 5','Slot 2 Perk 6',
+        'Slot 2 Perk 7', 'Slot 2 Perk 8', 'Slot 2 Perk 9', 'Slot 2 Perk 10', 'Slot 2 Perk 11', 'Slot 2 Perk 12',
+        'Slot 3 Perk 0', 'Slot 3 Perk 1', 'Slot 3 Perk 2', 'Slot 3 Perk 3', 'Slot 3 Perk 4', 'Slot 3 Perk 5','Slot 3 Perk 6',
+        'Slot 3 Perk 7', 'Slot 3 Perk 8', 'Slot 3 Perk 9', 'Slot 3 Perk 10', 'Slot 3 Perk 11', 'Slot 3 Perk 12',
+        'Slot 4 Perk 0', 'Slot 4 Perk 1', 'Slot 4 Perk 2', 'Slot 4 Perk 3', 'Slot 4 Perk 4', 'Slot 4 Perk 5','Slot 4 Perk 6',
+        'Slot 4 Perk 7', 'Slot 4 Perk 8', 'Slot 4 Perk 9', 'Slot 4 Perk 10', 'Slot 4 Perk 11', 'Slot 4 Perk 12']
+
+    # Keep only the selected columns
+    df = df[columns_to_keep]
+
+    # Select Perk Columns
+    perk_columns = [col for col in file.columns if col.startswith('Perk')]
+
+    # Iterate through each "Perk" column
+    for perk_col in perk_columns:
+        # Create a new column to store the results
+        df[f'{perk_col}_Slot_With_Perk'] = ''
+
+        # Iterate through each row
+        for index, row in df.iterrows():
+            perk_value = row[perk_col]
+
+            # Skip the iteration if perk_value is blank
+            if perk_value == '':
+                continue
+
+            # Check for Perk entry in Slot columns
+            for slot_col in df.columns:
+                if slot_col.startswith('Slot') and pd.notna(row[slot_col]) and pd.notna(perk_value) and str(perk_value) in str(row[slot_col]):
+                    df.at[index, f'{perk_col}_Slot_With_Perk'] = slot_col
+
+    # List of columns to explode
+    columns_to_explode = [col for col in df.columns if col.endswith('Slot_With_Perk')]
+
+    # Create a new DataFrame to store exploded rows
+    df_2 = pd.DataFrame()
+
+    # Iterate through the rows
+    for idx, row in df.iterrows():
+        entry_idx = 0  # Initialize the entry index
+
+        # Iterate through the columns to explode
+        for col in columns_to_explode:
+            # Get the non-blank entries in the column
+            entries = [entry for entry in row[col].split(', ') if entry != '']
+
+            # Create a new row for each entry
+            for entry in entries:
+                new_row = row.copy()  # Copy the original row
+                new_row[col] = entry  # Set the exploded entry
+                new_row['Entry_Index'] = entry_idx + 1  # Add the entry index
+                df_2 = pd.concat([df_2, new_row.to_frame().T], ignore_index=True)
+                entry_idx += 1  # Increment the entry index
+
+    df_2['Slot'] = ''
+    df_2['Perk'] = ''
+
+    # Find Column Numbers
+    column_number_1 = df_2.columns.get_loc('Perks 1') - 1
+    column_number_2 = df_2.columns.get_loc('Perks 1_Slot_With_Perk') - 1
+
+    # Iterate through the rows
+    for idx, row in df_2.iterrows():
+        column_idx_1 = column_number_1 + row['Entry_Index']
+        column_idx_2 = column_number_2 + row['Entry_Index']
+        df_2.loc[idx, 'Perk'] = row[column_idx_1]
+        df_2.loc[idx, 'Slot'] = row[column_idx_2]
+
+    df_2['Slot'] = df_2['Slot'].str.split(n=2).str[:2].str.join(' ')
+
+    # Reduce DataFrame
+    columns_to_keep = ['Weapon Name', 'Weapon Hash', 'Weapon ID', 'Slot', 'Perk']
+    df_2 = df_2[columns_to_keep]
+    return df_2
+
+
+def chunked_baseline(manifest_weapon_data, dim_weapon_data):
+    # Each roll's rows depend on that roll alone, so the baseline is run a chunk of rolls at a time - its per-row pd.concat makes a
+    # whole 20k vault take hours, where chunks give the same rows in the same order
+    chunks = [baseline_owned_weapons_perk_list(manifest_weapon_data, dim_weapon_data.iloc[start:start + baseline_chunk_size])
+              for start in range(0, len(dim_weapon_data), baseline_chunk_size)]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check owned_weapons_perk_list matches the implementation it replaced, and time both.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=vault_sizes, help='Owned rolls per synthetic vault')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    manifest_weapon_data = load_manifest_data.__wrapped__('data/Master Weapon Manifest.csv')
+    failures = 0
+    for vault_size in args.sizes:
+        dim_weapon_data = load_synthetic_dim_weapon_data(manifest_weapon_data, vault_size, seed=args.seed)
+
+        start = time.perf_counter()
+        df = owned_weapons_perk_list(manifest_weapon_data, dim_weapon_data)
+        seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = chunked_baseline(manifest_weapon_data, dim_weapon_data)
+        baseline_seconds = time.perf_counter() - start
+
+        # The Baseline Hands Back Object Columns Throughout - Compare Values In The New Function's Dtypes
+        try:
+            pd.testing.assert_frame_equal(df.reset_index(drop=True), expected.astype(df.dtypes.to_dict()))
+            outcome = 'equal'
+        except AssertionError as error:
+            outcome = 'DIFFERENT: {}'.format(str(error).splitlines()[0])
+            failures += 1
+        print('{:>6} rolls  {:>7} perk rows  new {:.3f}s  baseline {:.1f}s  {}'.format(vault_size, len(df), seconds, baseline_seconds, outcome))
+    return 1 if failures > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
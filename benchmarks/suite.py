@@ -0,0 +1,298 @@
+import argparse
+import inspect
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import csv_processing
+import data_preperation
+from benchmarks.synthetic_vault import generate_dim_weapon_data, generate_dim_armour_data
+
+manifest_file = 'data/Master Weapon Manifest.csv'
+default_vault_sizes = [1000, 5000, 20000]
+default_baseline_file = 'benchmarks/baseline.json'
+default_output_file = 'benchmarks/results.json'
+
+# Functions That Only Draw Streamlit Elements - Nothing To Time Without A Page To Draw On
+ui_functions = {'data_preperation.create_grid_table': 'renders the AgGrid table and its paging controls',
+                'data_preperation.write_dim_links': 'writes links into Streamlit columns',
+                'data_preperation.create_hyperlinks_v1': 'writes links into Streamlit columns',
+                'data_preperation.create_hyperlinks_v2': 'writes links into Streamlit columns'}
+
+# Regressions Need To Clear Both The Relative Tolerance And An Absolute Floor, So Sub-Millisecond Noise Isn't Flagged
+default_time_tolerance = 0.25
+default_memory_tolerance = 0.25
+time_floor_seconds = 0.005
+memory_floor_bytes = 2 ** 20
+
+# A Flagged Function Is Timed Again Before It Counts, So One Slow Call Isn't Reported As A Regression
+retime_repeats = 5
+retime_metrics = ['best_seconds', 'median_seconds', 'peak_bytes']
+
+
+def csv_buffer(df):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def uncached(function):
+    # Past the st.cache_data / st.cache_resource (and instrumentation) wrappers, so every repeat does the full work
+    return inspect.unwrap(function)
+
+
+def manifest_inputs(manifest_path):
+    # Everything built from the manifest alone, shared by every vault size
+    manifest_weapon_data = uncached(csv_processing.load_manifest_data)(manifest_path)
+    weapon_data = data_preperation.load_weapon_type_data(manifest_weapon_data, 'Hand Cannon')
+    item_index = csv_processing.ItemIndex(manifest_weapon_data)
+    return SimpleNamespace(path=manifest_path, manifest=manifest_weapon_data, weapon_data=weapon_data, item_index=item_index,
+                           stat_index=csv_processing.ArchetypeStatIndex(manifest_weapon_data),
+                           grid_table=SimpleNamespace(selected_rows=[{'Weapon Hash': int(manifest_weapon_data['Weapon Hash'].iat[0])}]))
+
+
+def vault_inputs(inputs, vault_size, duplicate_rate, enhanced_rate, seed):
+    # Synthetic DIM exports of one size, parsed the way the app parses uploads
+    weapon_csv = csv_buffer(generate_dim_weapon_data(inputs.manifest, vault_size, seed, duplicate_rate, enhanced_rate))
+    armour_csv = csv_buffer(generate_dim_armour_data(vault_size, seed=seed))
+    raw_weapons = pd.read_csv(io.StringIO(weapon_csv), usecols=csv_processing.use_dim_weapon_column)
+    dim_weapon_data = csv_processing.load_dim_weapon_data(io.StringIO(weapon_csv), inputs.manifest)
+    chunksize = max(1, vault_size // 4)
+    chunks = [csv_processing.prepare_dim_weapon_chunk(chunk, inputs.manifest[csv_processing.manifest_join_columns])
+              for chunk in csv_processing.read_csv_chunks(io.StringIO(weapon_csv), csv_processing.use_dim_weapon_column, chunksize)]
+    with_dim = uncached(data_preperation.weapon_type_output_with_dim)(inputs.manifest, dim_weapon_data)
+    return SimpleNamespace(weapon_csv=weapon_csv, armour_csv=armour_csv, raw_weapons=raw_weapons, dim_weapon_data=dim_weapon_data, chunks=chunks,
+                           chunksize=chunksize, raw_armour=pd.read_csv(io.StringIO(armour_csv), usecols=csv_processing.dim_armour_columns),
+                           dim_armour_data=csv_processing.load_dim_armour_data(io.StringIO(armour_csv)), with_dim=with_dim,
+                           perk_list=data_preperation.owned_weapons_perk_list(inputs.manifest, dim_weapon_data),
+                           ownership=data_preperation.ownership_summary(dim_weapon_data))
+
+
+def read_chunks(*args):
+    # read_csv_chunks hands back a lazy reader when chunked, so drain it inside the timing
+    return list(csv_processing.read_csv_chunks(*args))
+
+
+# Benchmark Cases - (function, arguments built from the shared inputs). Manifest cases run once, vault cases once per vault size.
+# Arguments are rebuilt before every call, so file buffers start from the top each time
+manifest_cases = {
+    'csv_processing.read_manifest_csv': lambda m: (m.path,),
+    'csv_processing.manifest_snapshot_path': lambda m: (m.path,),
+    'csv_processing.file_digest': lambda m: (m.path,),
+    'csv_processing.write_manifest_snapshot': lambda m: (m.manifest, m.path),
+    'csv_processing.read_manifest_snapshot': lambda m: (m.path,),
+    'csv_processing.build_manifest_snapshot': lambda m: (m.path,),
+    'csv_processing.load_manifest_data': lambda m: (m.path,),
+    'csv_processing.load_manifest_version': lambda m: (m.path,),
+    'csv_processing.load_perk_index': lambda m: (m.manifest,),
+    'csv_processing.load_facet_index': lambda m: (m.manifest,),
+    'csv_processing.load_item_index': lambda m: (m.manifest,),
+    'csv_processing.load_archetype_stat_index': lambda m: (m.manifest,),
+    'csv_processing.armour_combination_matrix': lambda m: (),
+    'data_preperation.weapon_type_columns': lambda m: ('Hand Cannon',),
+    'data_preperation.weapon_type_stat_columns': lambda m: ('Hand Cannon',),
+    'data_preperation.load_weapon_type_data': lambda m: (m.manifest, 'Hand Cannon'),
+    'data_preperation.apply_stat_view': lambda m: (m.weapon_data, m.stat_index, m.item_index, 'Archetype Percentile'),
+    'data_preperation.grid_visible_columns': lambda m: (m.weapon_data.columns, {'Weapon Type': True}),
+    'data_preperation.grid_options': lambda m: (tuple(m.weapon_data.columns), tuple(m.weapon_data[col].dtype.kind for col in m.weapon_data.columns)),
+    'data_preperation.grid_search': lambda m: (m.manifest, 'the'),
+    'data_preperation.grid_page': lambda m: (m.manifest, 'Weapon Hash', False, 2, 100),
+    'data_preperation.selected_weapon_links': lambda m: (m.item_index, m.grid_table),
+}
+vault_cases = {
+    'csv_processing.use_dim_weapon_column': lambda m, v: ('Perks 3',),
+    'csv_processing.read_csv_chunks': (read_chunks, lambda m, v: (io.StringIO(v.weapon_csv), csv_processing.use_dim_weapon_column, v.chunksize)),
+    'csv_processing.concat_chunks': lambda m, v: ([chunk.copy() for chunk in v.chunks],),
+    'csv_processing.normalize_perk_names': lambda m, v: (v.raw_weapons.filter(regex='^Perks').to_numpy(dtype=object).ravel(),),
+    'csv_processing.normalize_dim_perks': lambda m, v: (v.raw_weapons,),
+    'csv_processing.prepare_dim_weapon_chunk': lambda m, v: (v.raw_weapons, m.manifest[csv_processing.manifest_join_columns]),
+    'csv_processing.load_dim_weapon_data': lambda m, v: (io.StringIO(v.weapon_csv), m.manifest),
+    'csv_processing.armour_stat_matrix': lambda m, v: (v.dim_armour_data,),
+    'csv_processing.prepare_dim_armour_chunk': lambda m, v: (v.raw_armour.copy(),),
+    'csv_processing.load_dim_armour_data': lambda m, v: (io.StringIO(v.armour_csv),),
+    'data_preperation.weapon_type_count': lambda m, v: (v.dim_weapon_data,),
+    'data_preperation.weapon_type_element_count': lambda m, v: (v.dim_weapon_data,),
+    'data_preperation.vault_pivot': lambda m, v: (v.dim_weapon_data, 'Weapon Season', 'Weapon Archetype'),
+    'data_preperation.pivot_column_order': lambda m, v: (v.dim_weapon_data, 'Weapon Archetype'),
+    'data_preperation.weapon_type_output_without_dim': lambda m, v: (v.dim_weapon_data,),
+    'data_preperation.weapon_type_output_with_dim': lambda m, v: (m.manifest, v.dim_weapon_data),
+    'data_preperation.format_vault_summary': lambda m, v: (v.with_dim,),
+    'data_preperation.owned_counted_list': lambda m, v: (v.ownership,),
+    'data_preperation.not_owned_list': lambda m, v: (m.manifest, v.ownership),
+    'data_preperation.owned_weapons_perk_list': lambda m, v: (m.manifest, v.dim_weapon_data),
+    'data_preperation.perk_coverage': lambda m, v: (m.manifest, v.perk_list),
+    'data_preperation.ownership_summary': lambda m, v: (v.dim_weapon_data,),
+    'data_preperation.attach_ownership': lambda m, v: (m.weapon_data, v.ownership),
+    'data_preperation.crafted_weapon_list': lambda m, v: (v.dim_weapon_data,),
+    'data_preperation.dismantle_candidates': lambda m, v: (v.dim_weapon_data, v.perk_list),
+}
+
+
+def public_functions(*modules):
+    # Every function a module defines at top level without a leading underscore
+    return ['{}.{}'.format(module.__name__, name) for module in modules for name, value in vars(module).items()
+            if inspect.isfunction(value) and value.__module__ == module.__name__ and not name.startswith('_')]
+
+
+def case_function(name, case):
+    module_name, function_name = name.split('.')
+    if isinstance(case, tuple):
+        return case
+    return uncached(getattr(sys.modules[module_name], function_name)), case
+
+
+def measure(function, build_args, repeats):
+    # Best and median wall time over the repeats, then one more call under tracemalloc for the peak allocation above the starting point
+    timings = []
+    for _ in range(repeats):
+        args = build_args()
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+
+    args = build_args()
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'best_seconds': min(timings), 'median_seconds': statistics.median(timings), 'peak_bytes': peak_bytes}
+
+
+def run_suite(vault_sizes, repeats=3, duplicate_rate=0.1, enhanced_rate=0.5, seed=0, match=None, only=None):
+    # Results for every public csv_processing / data_preperation function (or just the ones named in only), as a list of
+    # {'function', 'scale', timings, peak memory}
+    names = public_functions(csv_processing, data_preperation)
+    missing = [name for name in names if name not in manifest_cases and name not in vault_cases and name not in ui_functions]
+    if len(missing) > 0:
+        raise KeyError('No benchmark case for {}'.format(', '.join(missing)))
+
+    def wanted(name):
+        return (match is None or match in name) and (only is None or name in only)
+
+    results = []
+    # The Snapshot Functions Write Next To The CSV, So Work On A Copy
+    with tempfile.TemporaryDirectory() as directory:
+        manifest_path = os.path.join(directory, os.path.basename(manifest_file))
+        shutil.copyfile(manifest_file, manifest_path)
+        inputs = manifest_inputs(manifest_path)
+
+        for name, case in manifest_cases.items():
+            if wanted(name):
+                function, build_args = case_function(name, case)
+                results.append({'function': name, 'scale': 'manifest', **measure(function, lambda: build_args(inputs), repeats)})
+                print_result(results[-1])
+
+        for vault_size in vault_sizes:
+            vault = vault_inputs(inputs, vault_size, duplicate_rate, enhanced_rate, seed)
+            for name, case in vault_cases.items():
+                if wanted(name):
+                    function, build_args = case_function(name, case)
+                    results.append({'function': name, 'scale': str(vault_size), **measure(function, lambda: build_args(inputs, vault), repeats)})
+                    print_result(results[-1])
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__, 'machine': platform.machine(),
+            'processor': platform.processor(), 'system': platform.system()}
+
+
+def compare_results(results, baseline, time_tolerance=default_time_tolerance, memory_tolerance=default_memory_tolerance):
+    # Rows that got slower or hungrier than the baseline by more than the tolerance (and the absolute floor)
+    stored = {(row['function'], row['scale']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        before = stored.get((row['function'], row['scale']))
+        if before is None:
+            continue
+        for metric, tolerance, floor in [('best_seconds', time_tolerance, time_floor_seconds), ('peak_bytes', memory_tolerance, memory_floor_bytes)]:
+            if row[metric] > before[metric] * (1 + tolerance) and row[metric] - before[metric] > floor:
+                regressions.append({'function': row['function'], 'scale': row['scale'], 'metric': metric, 'baseline': before[metric], 'current': row[metric],
+                                    'ratio': row[metric] / before[metric] if before[metric] > 0 else float('inf')})
+    return regressions
+
+
+def best_results(*runs):
+    # Per function and scale, the lowest of each measurement across runs
+    best = {}
+    for row in [row for run in runs for row in run]:
+        key = (row['function'], row['scale'])
+        best[key] = {**row, **{metric: min(row[metric], best[key][metric]) for metric in retime_metrics}} if key in best else row
+    return list(best.values())
+
+
+def print_result(row):
+    print('{:<50} {:>8}  best {:>9.4f}s  median {:>9.4f}s  peak {:>9.1f} MB'.format(
+        row['function'], row['scale'], row['best_seconds'], row['median_seconds'], row['peak_bytes'] / 2 ** 20), flush=True)
+
+
+def print_regressions(regressions):
+    for row in regressions:
+        unit, scale = ('s', 1) if row['metric'] == 'best_seconds' else (' MB', 2 ** 20)
+        print('REGRESSION {:<50} {:>8}  {:<12}  {:.4f}{unit} -> {:.4f}{unit}  (x{:.2f})'.format(
+            row['function'], row['scale'], row['metric'], row['baseline'] / scale, row['current'] / scale, row['ratio'], unit=unit))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time every public csv_processing and data_preperation function on synthetic DIM vaults.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=default_vault_sizes, help='Vault sizes (weapon and armour rows) to run at')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--enhanced-rate', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--match', help='Only run functions whose name contains this text')
+    parser.add_argument('--output', default=default_output_file, help='Where to write this run as JSON')
+    parser.add_argument('--baseline', default=default_baseline_file, help='Stored run to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline instead of comparing against it')
+    parser.add_argument('--time-tolerance', type=float, default=default_time_tolerance)
+    parser.add_argument('--memory-tolerance', type=float, default=default_memory_tolerance)
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.repeats, args.duplicate_rate, args.enhanced_rate, args.seed, args.match)
+    run = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(), 'skipped': ui_functions,
+           'settings': {'sizes': args.sizes, 'repeats': args.repeats, 'duplicate_rate': args.duplicate_rate, 'enhanced_rate': args.enhanced_rate, 'seed': args.seed},
+           'results': results}
+    # Timings Only Mean Something On The Machine That Made Them, So The Baseline Isn't Committed - The First Run Here Records It
+    first_run = not os.path.exists(args.baseline)
+    for path in [args.baseline] if args.save_baseline else [args.output] + ([args.baseline] if first_run else []):
+        with open(path, 'w') as f:
+            json.dump(run, f, indent=1)
+    if args.save_baseline or first_run:
+        print('Baseline written to {}'.format(args.baseline))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['environment'] != run['environment']:
+        print('Baseline was recorded on a different environment: {}'.format(baseline['environment']))
+    regressions = compare_results(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if len(regressions) > 0:
+        flagged = {row['function'] for row in regressions}
+        sizes = sorted({int(row['scale']) for row in regressions if row['scale'] != 'manifest'})
+        print('Timing {} flagged functions again'.format(len(flagged)))
+        retimed = run_suite(sizes, max(args.repeats, retime_repeats), args.duplicate_rate, args.enhanced_rate, args.seed, only=flagged)
+        regressions = compare_results(best_results(results, retimed), baseline, args.time_tolerance, args.memory_tolerance)
+    print_regressions(regressions)
+    stored = {(row['function'], row['scale']) for row in baseline['results']}
+    unmatched = sorted({row['function'] for row in results if (row['function'], row['scale']) not in stored})
+    if len(unmatched) > 0:
+        print('Not in the baseline, rerun with --save-baseline to record: {}'.format(', '.join(unmatched)))
+    print('{} regressions against {}'.format(len(regressions), args.baseline))
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
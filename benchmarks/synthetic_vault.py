@@ -0,0 +1,132 @@
+import io
+import numpy as np
+import pandas as pd
+
+from csv_processing import load_dim_weapon_data, load_dim_armour_data
+
+# Columns In A DIM Weapon Export Ahead Of The Perk Columns
+dim_weapon_columns = ['Name', 'Hash', 'Id', 'Tag', 'Tier', 'Type', 'Source', 'Category', 'Element', 'Power', 'Power Limit', 'Masterwork Type', 'Masterwork Tier',
+                      'Owner', 'Locked', 'Equipped', 'Year', 'Season', 'Event', 'Crafted', 'Crafted Level', 'Recoil', 'AA', 'Impact', 'Range', 'Zoom', 'Blast Radius',
+                      'Velocity', 'Stability', 'ROF', 'Reload', 'Mag', 'Handling', 'Charge Time', 'Guard Resistance', 'Draw Time', 'Accuracy', 'Charge Rate',
+                      'Guard Efficiency', 'Swing Speed', 'Shield Duration', 'Kill Tracker', 'Foundry', 'Loadouts', 'Notes']
+dim_perk_count = 18
+
+
+def manifest_perk_pools(manifest_weapon_data):
+    # Every manifest row's rollable perks for slots 1-4, in column order
+    manifest = manifest_weapon_data.reset_index(drop=True)
+    slots = [manifest.filter(regex='^Slot {} Perk'.format(slot)).to_numpy(dtype=object) for slot in range(1, 5)]
+    return [[[perk for perk in values[row] if isinstance(perk, str)] for values in slots] for row in range(len(manifest))]
+
+
+def generate_dim_weapon_data(manifest_weapon_data, vault_size, seed=0, duplicate_rate=0.0, enhanced_rate=0.5, crafted_rate=0.2):
+    # duplicate_rate is the share of rolls made another copy of a weapon already in the vault (on top of the repeats random picks
+    # give), and enhanced_rate the chance each trait on a crafted roll is enhanced
+    rng = np.random.default_rng(seed)
+    manifest = manifest_weapon_data.reset_index(drop=True)
+    pools = manifest_perk_pools(manifest)
+    picks = rng.integers(0, len(manifest), size=vault_size)
+    if duplicate_rate > 0:
+        for i in np.flatnonzero(rng.random(vault_size) < duplicate_rate):
+            if i > 0:
+                picks[i] = picks[rng.integers(0, i)]
+    weapons = {col: manifest[col].to_numpy(dtype=object) for col in ['Weapon Name', 'Weapon Hash', 'Weapon Tier', 'Weapon Type', 'Weapon Element', 'Weapon Archetype']}
+
+    rows = []
+    for i, pick in enumerate(picks):
+        crafted = bool(rng.random() < crafted_rate)
+        row = {'Name': weapons['Weapon Name'][pick], 'Hash': weapons['Weapon Hash'][pick], 'Id': str(6917529000000000000 + i), 'Tier': weapons['Weapon Tier'][pick],
+               'Type': weapons['Weapon Type'][pick], 'Element': weapons['Weapon Element'][pick], 'Crafted': crafted,
+               'Crafted Level': int(rng.integers(1, 30)) if crafted else np.nan}
+
+        # Intrinsic Frame, Then One Or Two Options Per Slot, Then Masterwork, Tracker And Cosmetic Sockets
+        perks = ['{}*'.format(weapons['Weapon Archetype'][pick])]
+        for slot, pool in enumerate(pools[pick], start=1):
+            if len(pool) == 0:
+                continue
+            chosen = list(rng.choice(pool, size=min(len(pool), int(rng.integers(1, 3))), replace=False))
+            # Crafted Weapons Often Carry Enhanced Traits
+            if crafted and slot >= 3 and rng.random() < enhanced_rate:
+                chosen[0] = 'Enhanced {}'.format(chosen[0])
+            perks.append('{}*'.format(chosen[0]))
+            perks.extend(chosen[1:])
+        perks.extend(['Tier 10: Handling*', 'Kill Tracker*'])
+        perks.extend(['Empty Mod Socket'] * (dim_perk_count - len(perks)))
+        for j in range(dim_perk_count):
+            row['Perks {}'.format(j)] = perks[j]
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=dim_weapon_columns + ['Perks {}'.format(j) for j in range(dim_perk_count)])
+    return df
+
+
+def load_synthetic_dim_weapon_data(manifest_weapon_data, vault_size, **options):
+    # A synthetic DIM weapon export written out as CSV and loaded the same way the app loads an upload
+    buffer = io.StringIO()
+    generate_dim_weapon_data(manifest_weapon_data, vault_size, **options).to_csv(buffer, index=False)
+    buffer.seek(0)
+    return load_dim_weapon_data(buffer, manifest_weapon_data)
+
+
+# Columns Read From A DIM Armour Export
+dim_armour_columns = ['Name', 'Hash', 'Id', 'Tier', 'Type', 'Equippable', 'Energy Capacity', 'Mobility (Base)', 'Resilience (Base)', 'Recovery (Base)',
+                      'Discipline (Base)', 'Intellect (Base)', 'Strength (Base)', 'Total (Base)']
+dim_armour_types = {'Hunter': ['Helmet', 'Gauntlets', 'Chest Armor', 'Leg Armor', 'Hunter Cloak'],
+                    'Titan': ['Helmet', 'Gauntlets', 'Chest Armor', 'Leg Armor', 'Titan Mark'],
+                    'Warlock': ['Helmet', 'Gauntlets', 'Chest Armor', 'Leg Armor', 'Warlock Bond']}
+
+
+def armour_stat_group(rng, size):
+    # Armour 2.0 rolls each group of three stats to a total of roughly 22-34, with every stat between 2 and 30
+    totals = rng.integers(22, 35, size=size)
+    weights = rng.dirichlet([1.0, 1.0, 1.0], size=size)
+    stats = np.clip(np.rint(weights * totals[:, None]), 2, 30).astype(int)
+    return stats
+
+
+def generate_dim_armour_data(vault_size, exotic_rate=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    characters = rng.choice(list(dim_armour_types), size=vault_size)
+    slots = rng.integers(0, 5, size=vault_size)
+    exotic = (rng.random(vault_size) < exotic_rate) & (slots < 4)
+    stats = np.concatenate([armour_stat_group(rng, vault_size), armour_stat_group(rng, vault_size)], axis=1)
+
+    # Class Items Roll Without Base Stats
+    stats[slots == 4] = 0
+
+    df = pd.DataFrame({
+        'Name': ['Exotic {} {}'.format(slot, rng.integers(0, 4)) if is_exotic else 'Legendary {}'.format(i) for i, (slot, is_exotic) in enumerate(zip(slots, exotic))],
+        'Hash': rng.integers(10 ** 8, 10 ** 9, size=vault_size),
+        'Id': [str(6917529100000000000 + i) for i in range(vault_size)],
+        'Tier': np.where(exotic, 'Exotic', 'Legendary'),
+        'Type': [dim_armour_types[character][slot] for character, slot in zip(characters, slots)],
+        'Equippable': characters,
+        'Energy Capacity': rng.integers(1, 11, size=vault_size)})
+    for i, col in enumerate(['Mobility (Base)', 'Resilience (Base)', 'Recovery (Base)', 'Discipline (Base)', 'Intellect (Base)', 'Strength (Base)']):
+        df[col] = stats[:, i]
+    df['Total (Base)'] = stats.sum(axis=1)
+    return df[dim_armour_columns]
+
+
+def load_synthetic_dim_armour_data(vault_size, **options):
+    # A synthetic DIM armour export written out as CSV and loaded the same way the app loads an upload
+    buffer = io.StringIO()
+    generate_dim_armour_data(vault_size, **options).to_csv(buffer, index=False)
+    buffer.seek(0)
+    return load_dim_armour_data(buffer)
+
+
+def generate_dim_wishlist(manifest_weapon_data, line_count, seed=0):
+    # DIM wishlist text naming one perk per slot (a few leave slots open), with block notes and the odd trash entry
+    rng = np.random.default_rng(seed)
+    manifest = manifest_weapon_data.reset_index(drop=True)
+    pools = manifest_perk_pools(manifest)
+
+    lines = ['title:Synthetic Wishlist', '']
+    for i, row in enumerate(rng.integers(0, len(manifest), size=line_count)):
+        if i % 50 == 0:
+            lines.extend(['', '//notes:Block {}'.format(i // 50)])
+        perks = [pool[int(rng.integers(0, len(pool)))] for pool in pools[row] if len(pool) > 0 and rng.random() < 0.9]
+        item = manifest['Weapon Hash'].iat[row] * (-1 if rng.random() < 0.05 else 1)
+        lines.append('dimwishlist:item={}&perks={}'.format(item, ','.join(perks)))
+    return '\n'.join(lines)
@@ -0,0 +1,247 @@
+import numpy as np
+import pandas as pd
+import itertools
+from csv_processing import armour_stat_matrix
+from caching import cache_data
+
+# Armour Slots And Stats In Build Order
+armour_slots = ['Helmet', 'Gauntlets', 'Chest Armor', 'Leg Armor', 'Class Item']
+armour_slot_aliases = {'Chest': 'Chest Armor', 'Legs': 'Leg Armor'}
+stat_names = ['Mobility', 'Resilience', 'Recovery', 'Discipline', 'Intellect', 'Strength']
+stat_groups = [[0, 1, 2], [3, 4, 5]]
+group_remainders = np.array(list(itertools.product(range(10), repeat=3)))
+remainder_place = np.array([100, 10, 1])
+
+# Largest Number Of Partial Builds Expanded At Once, And Pieces Checked Together By The Skyline
+chunk_rows = 1_000_000
+skyline_block_rows = 256
+
+
+def stat_tiers(totals):
+    return np.minimum(totals // 10, 10)
+
+def build_score(totals):
+    return stat_tiers(totals).sum(axis=-1)
+
+def score_upper_bound(totals, stat_max, group_max):
+    # Armour trades stats off within each group of three, so a group can't gain more tiers than its best remaining group total allows
+    per_stat = stat_tiers(totals + stat_max)
+    bound = 0
+    for group, remaining in zip(stat_groups, group_max):
+        bound = bound + np.minimum(per_stat[:, group].sum(axis=1), (totals[:, group].sum(axis=1) + remaining) // 10)
+    return bound
+
+def remainder_tables(candidates):
+    # tables[k][g][r] is the most tiers (ignoring the cap of 10) slots k onwards can add to group g, given the group's
+    # current stat remainders r (mod 10). Tiers only carry over through the remainders, so this is an exact DP
+    tables = [[np.zeros(len(group_remainders), dtype=np.int32) for _ in stat_groups]]
+    for stats in reversed(candidates):
+        slot_tables = []
+        for group, following in zip(stat_groups, tables[0]):
+            reached = group_remainders[:, None, :] + stats[None, :, group]
+            gain = (reached // 10).sum(axis=2) + following[(reached % 10) @ remainder_place]
+            slot_tables.append(gain.max(axis=1))
+        tables.insert(0, slot_tables)
+    return tables
+
+def remainder_upper_bound(totals, tables):
+    bound = (totals // 10).sum(axis=1)
+    for group, table in zip(stat_groups, tables):
+        bound = bound + table[(totals[:, group] % 10) @ remainder_place]
+    return bound
+
+def targets_reachable(totals, target_totals, stat_max, group_max):
+    reachable = (totals + stat_max >= target_totals).all(axis=1)
+    for group, remaining in zip(stat_groups, group_max):
+        reachable &= totals[:, group].sum(axis=1) + remaining >= target_totals[group].sum()
+    return reachable
+
+def covered_by(stats, others):
+    # covered[i, j] is True when others[j] matches or beats stats[i] on every stat, built one stat at a time to keep the arrays 2-D
+    covered = others[None, :, 0] >= stats[:, None, 0]
+    for k in range(1, stats.shape[1]):
+        covered &= others[None, :, k] >= stats[:, None, k]
+    return covered
+
+def skyline(stats):
+    # Positions (ascending) of pieces no other piece matches or beats on every stat, exact duplicates keeping the first copy. Sort-first
+    # skyline: in order of falling stat total only an earlier piece can dominate a later one, so each block of pieces is checked against
+    # the skyline kept so far and against the earlier pieces in its own block
+    if len(stats) <= 1:
+        return np.arange(len(stats))
+    order = np.argsort(-stats.sum(axis=1, dtype=np.int64), kind='stable')
+    ordered = stats[order]
+    window = ordered[:0]
+    kept = []
+    for start in range(0, len(ordered), skyline_block_rows):
+        block = ordered[start:start + skyline_block_rows]
+        beaten = covered_by(block, window).any(axis=1)
+        beaten |= np.tril(covered_by(block, block), k=-1).any(axis=1)
+        window = np.concatenate([window, block[~beaten]])
+        kept.append(order[start:start + skyline_block_rows][~beaten])
+    return np.sort(np.concatenate(kept))
+
+def search_builds(candidates, target_totals, top_n, threshold=-1):
+    # Best-first branch and bound over the slots: each level expands the surviving partial builds with every piece of the next
+    # slot, most promising partial builds first, and stops once the rest can't beat the current Nth best build
+    slot_count = len(candidates)
+    has_targets = (target_totals > 0).any()
+    suffix_max = [np.sum([stats.max(axis=0) for stats in candidates[k:]], axis=0) if k < slot_count else np.zeros(6, dtype=np.int32) for k in range(slot_count + 1)]
+    suffix_group_max = [[sum(stats[:, group].sum(axis=1).max() for stats in candidates[k:]) for group in stat_groups] for k in range(slot_count + 1)]
+    suffix_tables = remainder_tables(candidates)
+    # Greedy Completions Take Each Slot's Best Piece By Total, And By Total Leaning On The Target Stats
+    greedy_weights = [np.ones(6)] + ([1 + (target_totals > 0) * 2] if has_targets else [])
+    suffix_greedy = []
+    for weights in greedy_weights:
+        greedy = [stats[np.argmax(stats @ weights)] for stats in candidates]
+        suffix_greedy.append([np.sum(greedy[k:], axis=0) if k < slot_count else np.zeros(6, dtype=np.int32) for k in range(slot_count + 1)])
+
+    totals = np.zeros((1, 6), dtype=np.int16)
+    picks = np.zeros((1, 0), dtype=np.int32)
+    bounds = np.full(1, np.iinfo(np.int16).max, dtype=np.int16)
+    for k, stats in enumerate(candidates):
+        last = k == slot_count - 1
+        step = max(1, chunk_rows // len(stats))
+        kept_totals, kept_picks, kept_bounds = [], [], []
+        for start in range(0, len(totals), step):
+            # Partial Builds Are Sorted By Bound, So Once One Falls Short So Do All The Rest
+            if bounds[start] < threshold:
+                break
+            live = slice(start, start + step)
+            live_rows = np.flatnonzero(bounds[live] >= threshold) + start
+
+            # Add Every Piece In This Slot To Every Partial Build
+            chunk_totals = (totals[live_rows, None, :] + stats[None, :, :]).reshape(-1, 6)
+
+            if last:
+                # Complete Builds - The Bound Is The Score Itself
+                chunk_bounds = build_score(chunk_totals)
+                if has_targets:
+                    chunk_bounds[~(chunk_totals >= target_totals).all(axis=1)] = -1
+                completed_scores = chunk_bounds
+            else:
+                chunk_bounds = np.minimum(score_upper_bound(chunk_totals, suffix_max[k + 1], suffix_group_max[k + 1]),
+                                          remainder_upper_bound(chunk_totals, suffix_tables[k + 1]))
+
+                # Completing With The Greedy Pieces Gives Real Builds, So Their Scores Are Lower Bounds
+                completed_scores = np.full(len(chunk_totals), -1)
+                for greedy in suffix_greedy:
+                    completed = chunk_totals + greedy[k + 1]
+                    scores = build_score(completed)
+                    if has_targets:
+                        scores[~(completed >= target_totals).all(axis=1)] = -1
+                    completed_scores = np.maximum(completed_scores, scores)
+
+                # Drop Partial Builds That Can't Reach The Targets Even With The Best Remaining Pieces
+                if has_targets:
+                    chunk_bounds[~targets_reachable(chunk_totals, target_totals, suffix_max[k + 1], suffix_group_max[k + 1])] = -1
+
+            # The Nth Best Real Build Raises The Bar
+            if (completed_scores >= 0).sum() >= top_n:
+                threshold = max(threshold, np.partition(completed_scores, -top_n)[-top_n])
+            # Only Build The Piece Picks For The Rows That Survive
+            keep = np.flatnonzero((chunk_bounds >= threshold) & (chunk_bounds >= 0))
+            kept_totals.append(chunk_totals[keep])
+            kept_picks.append(np.concatenate([picks[live_rows[keep // len(stats)]], (keep % len(stats)).astype(np.int32)[:, None]], axis=1))
+            kept_bounds.append(chunk_bounds[keep])
+
+        if len(kept_totals) == 0:
+            return np.zeros((0, 6), dtype=np.int16), np.zeros((0, slot_count), dtype=np.int32), threshold
+        totals = np.concatenate(kept_totals)
+        picks = np.concatenate(kept_picks)
+        bounds = np.concatenate(kept_bounds)
+
+        # Re-Check Earlier Survivors Against The Final Bar And Put The Most Promising First
+        order = np.argsort(-bounds, kind='stable')
+        order = order[bounds[order] >= threshold]
+        totals, picks, bounds = totals[order], picks[order], bounds[order]
+        if len(totals) == 0:
+            return totals, np.zeros((0, slot_count), dtype=np.int32), threshold
+    return totals, picks, threshold
+
+@cache_data
+def optimize_builds(armour_data, character, exotic_lock=None, target_tiers=None, masterworked=True, top_n=10):
+    # Top builds for a character ranked by total stat tiers. exotic_lock is an exotic name, or None to allow any single exotic
+    target_totals = np.asarray(list(target_tiers) if target_tiers is not None else [0] * 6, dtype=np.int16) * 10
+
+    df = armour_data.loc[armour_data['Character'] == character].reset_index(drop=True)
+    slot = df['Type'].astype(str).replace(armour_slot_aliases).to_numpy()
+    exotic = (df['Tier'] == 'Exotic').to_numpy()
+    stats = armour_stat_matrix(df, 'mw_' if masterworked else 'base_')
+
+    # Which Slot Holds The Exotic - A Locked Exotic Fixes It, Otherwise Try Each Slot And No Exotic At All
+    if exotic_lock is not None:
+        locked = (df['Name'] == exotic_lock).to_numpy() & exotic
+        layouts = [(s, locked) for s in armour_slots if (locked & (slot == s)).any()]
+    else:
+        layouts = [(None, None)] + [(s, exotic) for s in armour_slots if (exotic & (slot == s)).any()]
+
+    found = []
+    threshold = -1
+    for exotic_slot, exotic_rows in layouts:
+        # Candidate Pieces Per Slot, With Dominated Pieces Removed
+        candidates, positions = [], []
+        for s in armour_slots:
+            rows = np.flatnonzero((slot == s) & (exotic_rows if s == exotic_slot else ~exotic))
+            rows = rows[skyline(stats[rows])]
+            candidates.append(stats[rows])
+            positions.append(rows)
+        if any(len(rows) == 0 for rows in positions):
+            continue
+
+        # Search The Smallest Slots First So Early Levels Stay Narrow
+        order = np.argsort([len(rows) for rows in positions], kind='stable')
+        totals, picks, threshold = search_builds([candidates[i] for i in order], target_totals, top_n, threshold)
+        picks = np.column_stack([positions[i][picks[:, j]] for j, i in enumerate(order)])[:, np.argsort(order)]
+        found.append((totals, picks))
+
+    if len(found) == 0:
+        return pd.DataFrame(columns=armour_slots + stat_names + ['Total Tiers', 'Total Stats', 'Wasted Points', 'DIM Search'])
+
+    # Rank By Total Tiers, Then By Fewest Wasted Points
+    totals = np.concatenate([totals for totals, _ in found])
+    picks = np.concatenate([picks for _, picks in found])
+    scores = build_score(totals)
+    wasted = np.where(totals < 100, totals % 10, totals - 100).sum(axis=1)
+    best = np.lexsort((wasted, -scores))[:top_n]
+    totals, picks = totals[best], picks[best]
+
+    builds = pd.DataFrame({s: df['Name'].to_numpy()[picks[:, i]] for i, s in enumerate(armour_slots)})
+    for i, name in enumerate(stat_names):
+        builds[name] = totals[:, i]
+    builds['Total Tiers'] = scores[best]
+    builds['Total Stats'] = totals.sum(axis=1)
+    builds['Wasted Points'] = wasted[best]
+    builds['DIM Search'] = [' or '.join('id:{}'.format(item_id) for item_id in df['id'].to_numpy()[row]) for row in picks]
+    builds.index += 1
+    return builds
+
+# Stat Pairs Offered For Pair Skylines, As Positions In stat_names
+stat_pairs = {'{} / {}'.format(stat_names[i], stat_names[j]): (i, j) for i, j in itertools.combinations(range(6), 2)}
+
+@cache_data
+def armour_skyline_report(armour_data, pair_names=()):
+    # Each piece that rolls stats (class items roll none), flagged where another piece for the same class and slot matches or beats it
+    # on all six base stats, and on each chosen stat pair. Exotics are only set against copies of the same exotic
+    df = armour_data.loc[armour_data['base_total'] > 0].reset_index(drop=True)
+    stats = armour_stat_matrix(df)
+    exotic_name = df['Name'].astype(str).where(df['Tier'] == 'Exotic', '')
+    groups = pd.DataFrame({'Character': df['Character'].astype(str), 'Type': df['Type'].astype(str), 'Exotic': exotic_name}).groupby(
+        ['Character', 'Type', 'Exotic']).indices
+
+    flags = {'Dominated': list(range(6))}
+    flags.update({'Dominated On {}'.format(name): list(stat_pairs[name]) for name in pair_names})
+    dominated = {flag: np.ones(len(df), dtype=bool) for flag in flags}
+    for positions in groups.values():
+        for flag, columns in flags.items():
+            dominated[flag][positions[skyline(stats[positions][:, columns])]] = False
+
+    report = pd.DataFrame({'Character': df['Character'], 'Type': df['Type'], 'Name': df['Name'], 'Tier': df['Tier'], 'id': df['id']})
+    for i, name in enumerate(stat_names):
+        report[name] = stats[:, i]
+    report['Total'] = df['base_total'].to_numpy()
+    for flag in flags:
+        report[flag] = dominated[flag]
+    report = report.sort_values(by=['Character', 'Type', 'Total'], ascending=[True, True, False]).reset_index(drop=True)
+    report.index += 1
+    return report
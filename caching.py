@@ -0,0 +1,35 @@
+import sys
+import threading
+from functools import wraps
+
+
+def streamlit_running():
+    # True only inside a running Streamlit app. Looks in sys.modules rather than importing Streamlit, so a batch job that never
+    # loaded it (batch_reports imports nothing from Streamlit) doesn't pay for the import just to find out
+    runtime = sys.modules.get('streamlit.runtime')
+    return runtime is not None and runtime.exists()
+
+def runtime_cache(decorator_name):
+    # st.cache_data / st.cache_resource for calls made inside the Streamlit app, a plain call anywhere else. Decided on every call
+    # rather than at import, so it doesn't matter which module was imported first, and __wrapped__ and clear() work either way
+    def decorator(function):
+        cached = []
+        lock = threading.Lock()
+
+        def streamlit_cached():
+            with lock:
+                if len(cached) == 0:
+                    cached.append(getattr(sys.modules['streamlit'], decorator_name)(function))
+            return cached[0]
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if streamlit_running():
+                return streamlit_cached()(*args, **kwargs)
+            return function(*args, **kwargs)
+        wrapper.clear = lambda: cached[0].clear() if len(cached) > 0 else None
+        return wrapper
+    return decorator
+
+cache_data = runtime_cache('cache_data')
+cache_resource = runtime_cache('cache_resource')
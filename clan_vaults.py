@@ -0,0 +1,164 @@
+import pandas as pd
+import numpy as np
+from csv_processing import concat_chunks
+from schema import apply_dim_weapon_schema
+from data_preperation import owned_weapons_perk_list, perk_coverage
+
+
+def sparse_counts(rows, columns, row_count, column_count):
+    # Compressed (indptr, indices, counts) from (row, column) pairs, repeats summed - indices sorted within each row
+    keys, counts = np.unique(rows.astype(np.int64) * column_count + columns, return_counts=True)
+    indptr = np.searchsorted(keys // column_count, np.arange(row_count + 1))
+    return indptr, keys % column_count, counts
+
+def align_frames(frames):
+    # Exports can carry different numbers of perk columns - give every frame the same columns, a missing categorical column as an
+    # empty categorical so the categories still union
+    columns = list(dict.fromkeys(col for df in frames for col in df.columns))
+    categorical = {col: df[col].cat.categories[:0] for df in frames for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}
+    return [df.assign(**{col: pd.Categorical.from_codes(np.full(len(df), -1), categories=categorical[col]) if col in categorical else np.nan
+                         for col in columns if col not in df.columns})[columns] for df in frames]
+
+class OwnershipMatrix:
+    # Copies owned per (member, item) as a sparse member x item matrix, held both ways round - by member (CSR) for one member's
+    # vault and subset unions / intersections, and by item (CSC) for who holds an item. Clan-wide totals per item are kept dense
+    def __init__(self, member_codes, item_codes, member_count, item_count):
+        self.member_count = member_count
+        self.item_count = item_count
+        self.indptr, self.indices, self.counts = sparse_counts(member_codes, item_codes, member_count, item_count)
+        self.item_indptr, self.item_members, self.item_counts = sparse_counts(item_codes, member_codes, item_count, member_count)
+
+        # Members Owning, Copies And The Biggest Holder Per Item (first member in clan order on a tie)
+        self.owners = np.diff(self.item_indptr)
+        self.copies = np.bincount(np.repeat(np.arange(item_count), self.owners), weights=self.item_counts, minlength=item_count).astype(np.int64)
+        items = np.repeat(np.arange(item_count), self.owners)
+        order = np.lexsort((self.item_members, -self.item_counts, items))
+        first = order[self.item_indptr[:-1][self.owners > 0]]
+        self.top_holder = np.full(item_count, -1, dtype=np.int64)
+        self.top_holder[self.owners > 0] = self.item_members[first]
+
+    def row(self, member):
+        return self.indices[self.indptr[member]:self.indptr[member + 1]], self.counts[self.indptr[member]:self.indptr[member + 1]]
+
+    def column(self, item):
+        return self.item_members[self.item_indptr[item]:self.item_indptr[item + 1]], self.item_counts[self.item_indptr[item]:self.item_indptr[item + 1]]
+
+    def subset(self, members):
+        # Items and (owners, copies) within a subset of members - reads only those members' rows
+        members = np.asarray(members, dtype=np.int64)
+        if len(members) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        starts, stops = self.indptr[members], self.indptr[members + 1]
+        positions = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+        items, inverse, owners = np.unique(self.indices[positions], return_inverse=True, return_counts=True)
+        copies = np.bincount(inverse, weights=self.counts[positions], minlength=len(items)).astype(np.int64)
+        return items, owners, copies
+
+class ClanVaultIndex:
+    # Many members' normalized DIM weapon frames (load_dim_weapon_data output) merged into one columnar table tagged by Member, with
+    # ownership kept as sparse vectors over the manifest - by Weapon Hash, and by Weapon Name for the owned / not owned semantics of
+    # owned_counted_list and not_owned_list. Clan-wide queries read the precomputed per-item totals, and subset queries only the
+    # members asked about, so neither grows with the rest of the clan
+    def __init__(self, manifest_weapon_data, member_frames):
+        self.manifest = manifest_weapon_data.reset_index(drop=True)
+        self.members = list(member_frames)
+        self.member_positions = {member: i for i, member in enumerate(self.members)}
+        if len(self.members) > 0:
+            # Perk Columns Share One Categorical Across Every Member, As They Do Across The Chunks Of One Upload
+            table = apply_dim_weapon_schema(concat_chunks(align_frames([df.assign(Member=member) for member, df in member_frames.items()])))
+        else:
+            table = pd.DataFrame(columns=['Member', 'Weapon Hash', 'Weapon Name'])
+        table['Member'] = pd.Categorical(table['Member'], categories=self.members)
+        self.table = table
+
+        # Items Are Manifest Rows, Or Distinct Weapon Names - Rolls Whose Hash Isn't In The Manifest Stay In The Table Only
+        member_codes = table['Member'].cat.codes.to_numpy(dtype=np.int64)
+        positions = pd.Index(self.manifest['Weapon Hash'].to_numpy(dtype=np.int64)).get_indexer(pd.to_numeric(table['Weapon Hash']).fillna(-1).to_numpy(dtype=np.int64))
+        known = positions >= 0
+        name_codes, self.names = pd.factorize(self.manifest['Weapon Name'].astype(str), sort=True)
+        self.matrices = {'hash': OwnershipMatrix(member_codes[known], positions[known], len(self.members), len(self.manifest)),
+                         'name': OwnershipMatrix(member_codes[known], name_codes[positions[known]], len(self.members), len(self.names))}
+
+    def member_codes(self, members):
+        return np.array([self.member_positions[member] for member in members], dtype=np.int64)
+
+    def item_code(self, item, level):
+        # A Weapon Name, or a Weapon Hash for the hash level
+        if level == 'hash':
+            return int(pd.Index(self.manifest['Weapon Hash'].to_numpy(dtype=np.int64)).get_loc(int(item)))
+        return int(self.names.get_loc(item))
+
+    def item_frame(self, items, level, **columns):
+        # Item codes back to manifest labels, with any extra columns alongside and a 1-based index
+        if level == 'hash':
+            df = self.manifest.loc[items, ['Weapon Name With Season', 'Weapon Name', 'Weapon Hash']].reset_index(drop=True)
+        else:
+            df = pd.DataFrame({'Weapon Name': self.names[items]})
+        for name, values in columns.items():
+            df[name] = values
+        df.index += 1
+        return df
+
+    def owned_counted(self, member, level='name'):
+        # owned_counted_list for one member - copies per item, most copies first
+        items, counts = self.matrices[level].row(self.member_positions[member])
+        order = np.lexsort((items, -counts))
+        return self.item_frame(items[order], level, Count=counts[order])
+
+    def not_owned(self, members=None, level='name'):
+        # not_owned_list for a set of members (every member by default) - manifest items none of them own
+        matrix = self.matrices[level]
+        owned = np.zeros(matrix.item_count, dtype=bool)
+        if members is None:
+            owned = matrix.owners > 0
+        else:
+            owned[matrix.subset(self.member_codes(members))[0]] = True
+        return self.item_frame(np.flatnonzero(~owned), level)
+
+    def union(self, members=None, level='name'):
+        # Items at least one of the members owns, with how many of them own it and their copies between them
+        matrix = self.matrices[level]
+        if members is None:
+            items = np.flatnonzero(matrix.owners > 0)
+            return self.item_frame(items, level, **{'Members Owning': matrix.owners[items], 'Copies': matrix.copies[items]})
+        items, owners, copies = matrix.subset(self.member_codes(members))
+        return self.item_frame(items, level, **{'Members Owning': owners, 'Copies': copies})
+
+    def intersection(self, members=None, level='name'):
+        # Items every one of the members owns
+        matrix = self.matrices[level]
+        if members is None:
+            items = np.flatnonzero(matrix.owners == len(self.members))
+            return self.item_frame(items, level, Copies=matrix.copies[items])
+        member_codes = np.unique(self.member_codes(members))
+        items, owners, copies = matrix.subset(member_codes)
+        shared = owners == len(member_codes)
+        return self.item_frame(items[shared], level, Copies=copies[shared])
+
+    def top_holders(self, item, k=5, level='name'):
+        # The k members holding the most copies of one item
+        members, counts = self.matrices[level].column(self.item_code(item, level))
+        top = np.argsort(-counts, kind='stable')[:k]
+        df = pd.DataFrame({'Member': np.asarray(self.members, dtype=object)[members[top]], 'Copies': counts[top]})
+        df.index += 1
+        return df
+
+    def most_owned(self, k=20, by='Members Owning', level='name'):
+        # The k items the clan owns most of, by members owning or by copies, the other breaking ties. Reads the per-item totals only
+        matrix = self.matrices[level]
+        values, others = (matrix.owners, matrix.copies) if by == 'Members Owning' else (matrix.copies, matrix.owners)
+        items = np.flatnonzero(matrix.owners > 0)
+        top = items[np.lexsort((items, -others[items], -values[items]))[:k]]
+        return self.item_frame(top, level, **{'Members Owning': matrix.owners[top], 'Copies': matrix.copies[top]})
+
+    def clan_summary(self, level='name'):
+        # Every item anyone owns - members owning, total copies and the biggest holder
+        matrix = self.matrices[level]
+        items = np.flatnonzero(matrix.owners > 0)
+        items = items[np.lexsort((items, -matrix.copies[items], -matrix.owners[items]))]
+        return self.item_frame(items, level, **{'Members Owning': matrix.owners[items], 'Total Owned': matrix.copies[items],
+                                                'Top Holder': np.asarray(self.members, dtype=object)[matrix.top_holder[items]]})
+
+    def perk_coverage(self):
+        # perk_coverage over every member's rolls at once
+        return perk_coverage(self.manifest, owned_weapons_perk_list(self.manifest, self.table))
@@ -1,9 +1,17 @@
-import streamlit as st
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+import hashlib
+import os
+from functools import reduce, lru_cache
+from pandas.api.types import union_categoricals
+from schema import apply_manifest_schema, apply_dim_weapon_schema, apply_dim_armour_schema, schema_fingerprint, weapon_stat_columns
+from caching import cache_data, cache_resource
+from instrumentation import instrumented
 
-@st.cache_data
-def load_manifest_data(file):
+@instrumented
+def read_manifest_csv(file):
     # Load file
     df = pd.read_csv(file)
 
@@ -14,66 +22,406 @@ def load_manifest_data(file):
     remaining_cols = [col for col in cols if col not in first_cols]
     df = df[first_cols + remaining_cols]
     df = df.rename(columns={'Weapon Range': 'Range'})
+
+    # Apply Compact Dtypes
+    df = apply_manifest_schema(df)
     return df
 
-@st.cache_data
-def load_dim_weapon_data(file, manifest_weapon_data):
-    df = pd.read_csv(file)
-    df = pd.merge(df, manifest_weapon_data[['Weapon Hash', 'Weapon Name With Season', 'Weapon Name', 'Weapon Season', 'Weapon Tier',
-                                            'Weapon Type', 'Weapon Archetype', 'Weapon Slot', 'Weapon Element', 'Weapon Current Version',
-                                            'Weapon Power Cap', 'Is Sunset']], left_on='Hash', right_on='Weapon Hash', how='left')
+def manifest_snapshot_path(file):
+    return os.path.splitext(file)[0] + '.feather'
+
+def file_digest(file):
+    with open(file, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def write_manifest_snapshot(df, file):
+    # Uncompressed Arrow IPC so the snapshot is read straight from a memory map without decompressing, tagged with the CSV content hash
+    table = pa.Table.from_pandas(df)
+    table = table.replace_schema_metadata({**table.schema.metadata, b'csv_sha256': file_digest(file).encode(), b'schema': schema_fingerprint().encode()})
+    feather.write_feather(table, manifest_snapshot_path(file), compression='uncompressed')
+
+def read_manifest_snapshot(file):
+    # Return None when the snapshot is missing or was built from a different CSV or schema. The snapshot saves the CSV parse and
+    # dtype conversion at startup, not memory - to_pandas copies every column into this process, and the category and perk columns
+    # have to become Python strings in each replica, so nothing stays shared through the memory map
+    path = manifest_snapshot_path(file)
+    if not os.path.exists(path):
+        return None
+    table = feather.read_table(path, memory_map=True)
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'csv_sha256') != file_digest(file).encode() or metadata.get(b'schema') != schema_fingerprint().encode():
+        return None
+    return table.to_pandas()
+
+def build_manifest_snapshot(file):
+    df = read_manifest_csv(file)
+    write_manifest_snapshot(df, file)
+    return df
+
+@instrumented
+@cache_data
+def load_manifest_data(file):
+    # Use the binary snapshot when it matches the CSV, otherwise parse the CSV and refresh the snapshot
+    df = read_manifest_snapshot(file)
+    if df is None:
+        df = read_manifest_csv(file)
+        try:
+            write_manifest_snapshot(df, file)
+        except OSError:
+            pass
+    return df
+
+@instrumented
+@cache_data
+def load_manifest_version(file):
+    # Changes with the manifest CSV or the declared schema, so cached uploads are rebuilt against a new manifest
+    return hashlib.sha256((file_digest(file) + schema_fingerprint()).encode()).hexdigest()
+
+class PerkIndex:
+    # Inverted index from (slot, perk) to the sorted manifest row positions that can roll that perk
+    def __init__(self, manifest_weapon_data):
+        self.slots = {}
+        self.vocabulary = {}
+        self.positions = {}
+        self.codes = {}
+        self.row_count = len(manifest_weapon_data)
+        slot_names = sorted({' '.join(col.split()[:2]) for col in manifest_weapon_data.columns if col.startswith('Slot')})
+        for slot in slot_names:
+            # Melt Slot Columns Into (row position, perk code) Pairs
+            stacked = manifest_weapon_data.filter(regex='^{} Perk'.format(slot)).reset_index(drop=True).stack()
+            codes, vocabulary = pd.factorize(stacked.to_numpy(), sort=True)
+            positions = stacked.index.get_level_values(0).to_numpy()
+
+            # Group Positions By Perk, Each Group Sorted And De-Duplicated
+            order = np.lexsort((positions, codes))
+            splits = np.flatnonzero(np.diff(codes[order])) + 1
+            self.slots[slot] = {perk: np.unique(group) for perk, group in zip(vocabulary, np.split(positions[order], splits))}
+            self.vocabulary[slot] = np.asarray(vocabulary, dtype=object)
+            self.positions[slot] = positions
+            self.codes[slot] = codes
+
+    def rows_with_any(self, slot, perks):
+        # OR - rows that can roll at least one of the perks
+        groups = [self.slots[slot].get(perk, np.empty(0, dtype=np.int64)) for perk in perks]
+        return np.unique(np.concatenate(groups)) if len(groups) > 0 else np.empty(0, dtype=np.int64)
+
+    def rows_with_all(self, slot, perks):
+        # AND - rows that can roll every one of the perks
+        groups = [self.slots[slot].get(perk, np.empty(0, dtype=np.int64)) for perk in perks]
+        return reduce(lambda x, y: np.intersect1d(x, y, assume_unique=True), groups) if len(groups) > 0 else np.arange(self.row_count)
+
+    def perk_options(self, slot, rows=None):
+        # Sorted perks available in the slot, optionally limited to a set of row positions
+        if slot not in self.slots:
+            return []
+        codes = self.codes[slot]
+        if rows is not None:
+            mask = np.zeros(self.row_count, dtype=bool)
+            mask[np.asarray(rows, dtype=np.int64)] = True
+            codes = codes[mask[self.positions[slot]]]
+        return self.vocabulary[slot][np.unique(codes)].tolist()
+
+@instrumented
+@cache_resource
+def load_perk_index(manifest_weapon_data):
+    return PerkIndex(manifest_weapon_data)
+
+class FacetIndex:
+    # Group index over the valid (tier, type, archetype, slot, element, sunset) combinations, with memoized sidebar queries
+    facet_columns = ['Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot', 'Weapon Element', 'Is Sunset']
+
+    def __init__(self, manifest_weapon_data, cache_size=4096):
+        groups = manifest_weapon_data.reset_index(drop=True).groupby(self.facet_columns, observed=True).indices
+        combinations = list(groups.keys())
+        self.values = {col: np.array([combination[i] for combination in combinations], dtype=object) for i, col in enumerate(self.facet_columns)}
+        self.positions = [groups[combination] for combination in combinations]
+        self.options = lru_cache(maxsize=cache_size)(self._options)
+        self.rows = lru_cache(maxsize=cache_size)(self._rows)
+
+    def _mask(self, selected_tier, selected_type='Select all', selected_archetype='Select all', selected_slot='Select all', selected_element='Select all',
+              selected_sunset='No'):
+        # The sidebar's filter rules, evaluated over the combinations instead of the manifest rows
+        mask = np.ones(len(self.positions), dtype=bool)
+        if len(selected_tier) > 0:
+            mask &= np.isin(self.values['Weapon Tier'], list(selected_tier))
+        for col, selected in [('Weapon Type', selected_type), ('Weapon Archetype', selected_archetype), ('Weapon Slot', selected_slot),
+                              ('Weapon Element', selected_element)]:
+            if selected != 'Select all':
+                mask &= self.values[col] == selected
+        if selected_sunset == 'Yes':
+            mask &= self.values['Is Sunset'] == 'No'
+        return mask
+
+    def _options(self, column, *selections):
+        # Sorted values of a facet still available under the selections made so far (tier passed as a tuple)
+        return tuple(sorted(set(self.values[column][self._mask(*selections)])))
+
+    def _rows(self, *selections):
+        # Sorted manifest row positions matching every selection (tier passed as a tuple)
+        matched = [self.positions[i] for i in np.flatnonzero(self._mask(*selections))]
+        rows = np.sort(np.concatenate(matched)) if len(matched) > 0 else np.empty(0, dtype=np.int64)
+        rows.setflags(write=False)
+        return rows
+
+    def cache_stats(self):
+        options_info = self.options.cache_info()
+        rows_info = self.rows.cache_info()
+        return {'hits': options_info.hits + rows_info.hits, 'misses': options_info.misses + rows_info.misses,
+                'entries': options_info.currsize + rows_info.currsize}
+
+@instrumented
+@cache_resource
+def load_facet_index(manifest_weapon_data):
+    return FacetIndex(manifest_weapon_data)
+
+class ItemIndex:
+    # Hash-keyed lookups over the manifest - hash to row position, and weapon name (with or without season) to the hashes that carry it.
+    # Names with season aren't unique (some weapons have two hashes), so both name lookups return every hash in manifest order
+    link_sites = [('Light.gg', 'https://www.light.gg/db/items/{hash}/{name}'), ('D2 Foundry', 'https://d2foundry.gg/w/{hash}'),
+                  ('Destiny Tracker', 'https://destinytracker.com/destiny-2/db/items/{hash}')]
+
+    def __init__(self, manifest_weapon_data):
+        self.data = manifest_weapon_data
+        self.hashes = manifest_weapon_data['Weapon Hash'].to_numpy(dtype=np.int64)
+        # Walk Backwards So The First Row Wins If A Hash Repeats
+        self.positions = {int(item_hash): position for position, item_hash in reversed(list(enumerate(self.hashes)))}
+        # Hashes Are Unique In The Manifest, So The Index Lookup Is Exact
+        self.hash_index = pd.Index(self.hashes)
+        self.name_with_season_hashes = self._hash_groups('Weapon Name With Season')
+        self.name_hashes = self._hash_groups('Weapon Name')
+
+    def _hash_groups(self, column):
+        groups = self.data.reset_index(drop=True).groupby(column, sort=False, observed=True).indices
+        return {name: tuple(int(item_hash) for item_hash in self.hashes[positions]) for name, positions in groups.items()}
+
+    def position(self, item_hash):
+        return self.positions.get(int(item_hash))
+
+    def positions_for(self, item_hashes):
+        # Row positions for many hashes at once - -1 where a hash isn't in the manifest
+        return self.hash_index.get_indexer(np.asarray(item_hashes, dtype=np.int64))
+
+    def value(self, item_hash, column):
+        position = self.position(item_hash)
+        return None if position is None else self.data[column].iat[position]
+
+    def hashes_for_name_with_season(self, name_with_season):
+        return self.name_with_season_hashes.get(name_with_season, ())
+
+    def hashes_for_name(self, name):
+        return self.name_hashes.get(name, ())
+
+    def hash_for(self, name_with_season):
+        hashes = self.hashes_for_name_with_season(name_with_season)
+        return hashes[0] if len(hashes) > 0 else None
 
+    def links(self, item_hash):
+        # Every outbound link for a weapon as markdown, keyed by site - None if the hash isn't in the manifest
+        name = self.value(item_hash, 'Weapon Name')
+        if name is None:
+            return None
+        return {site: '[{} - {}]({})'.format(site, name, url.format(hash=item_hash, name=name).replace(' ', '%20')) for site, url in self.link_sites}
+
+@instrumented
+@cache_resource
+def load_item_index(manifest_weapon_data):
+    return ItemIndex(manifest_weapon_data)
+
+class ArchetypeStatIndex:
+    # Every manifest stat set against the other weapons of the same type and archetype. Row-aligned arrays (manifest row x stat) hold
+    # the percentile, rank and z-score, and group arrays (group x stat) the min, median and max, all computed once per manifest
+    group_columns = ['Weapon Type', 'Weapon Archetype']
+
+    def __init__(self, manifest_weapon_data):
+        df = manifest_weapon_data.reset_index(drop=True)
+        self.columns = [col for col in weapon_stat_columns if col in df.columns]
+        self.column_positions = {col: i for i, col in enumerate(self.columns)}
+        stats = df[self.columns].astype('float64')
+        groups = df.groupby(self.group_columns, observed=True, sort=True)
+        self.group_codes = groups.ngroup().to_numpy()
+        self.group_keys = list(groups.groups.keys())
+        self.values = stats.to_numpy()
+
+        # Percentile Is The Share Of The Archetype At Or Below The Stat, Rank Counts Down From The Highest
+        grouped = stats.groupby(self.group_codes)
+        self.percentiles = grouped.rank(method='max', pct=True).to_numpy()
+        self.ranks = grouped.rank(method='min', ascending=False).to_numpy()
+        spread = grouped.transform('std', ddof=0).to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.zscores = np.where(spread > 0, (self.values - grouped.transform('mean').to_numpy()) / spread, 0.0)
+        self.zscores[np.isnan(self.values)] = np.nan
+        self.group_min = grouped.min().to_numpy()
+        self.group_median = grouped.median().to_numpy()
+        self.group_max = grouped.max().to_numpy()
+
+    def view(self, positions, columns, mode):
+        # Stats for manifest rows in one of the stat_view_modes, as an array aligned to positions x columns
+        positions = np.asarray(positions, dtype=np.int64)
+        stat_positions = [self.column_positions[col] for col in columns]
+        if mode == 'Archetype Percentile':
+            return np.round(self.percentiles[positions][:, stat_positions] * 100, 1)
+        if mode == 'Archetype Rank':
+            return self.ranks[positions][:, stat_positions]
+        if mode == 'Archetype Z-Score':
+            return np.round(self.zscores[positions][:, stat_positions], 2)
+        if mode == 'Vs Archetype Median':
+            return self.values[positions][:, stat_positions] - self.group_median[self.group_codes[positions]][:, stat_positions]
+        return self.values[positions][:, stat_positions]
+
+    def deltas(self, positions, reference_positions, columns):
+        # N-way deltas - every row against every reference, as rows x references x columns
+        stat_positions = [self.column_positions[col] for col in columns]
+        values = self.values[:, stat_positions]
+        return values[np.asarray(positions, dtype=np.int64)][:, None, :] - values[np.asarray(reference_positions, dtype=np.int64)][None, :, :]
+
+    def group_summary(self, weapon_type, weapon_archetype, columns):
+        # Min, median and max of each stat across one archetype
+        group = self.group_keys.index((weapon_type, weapon_archetype))
+        stat_positions = [self.column_positions[col] for col in columns]
+        return pd.DataFrame({'Min': self.group_min[group, stat_positions], 'Median': self.group_median[group, stat_positions],
+                             'Max': self.group_max[group, stat_positions]}, index=columns).T
+
+@instrumented
+@cache_resource
+def load_archetype_stat_index(manifest_weapon_data):
+    return ArchetypeStatIndex(manifest_weapon_data)
+
+# Columns Read From A DIM Weapon Export - Everything Else Is Dropped At Parse Time
+dim_weapon_columns = ['Hash', 'Id', 'Masterwork Type', 'Masterwork Tier', 'Crafted', 'Crafted Level']
+manifest_join_columns = ['Weapon Hash', 'Weapon Name With Season', 'Weapon Name', 'Weapon Season', 'Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot',
+                         'Weapon Element', 'Weapon Current Version', 'Weapon Power Cap', 'Is Sunset']
+
+def use_dim_weapon_column(col):
+    # Perks 0 Is The Weapon Frame, Which The Manifest Already Gives As The Archetype
+    return col in dim_weapon_columns or (col.startswith('Perks') and col != 'Perks 0')
+
+def read_csv_chunks(file, usecols, chunksize=None):
+    # The whole file as one chunk, or an iterator of chunks so large exports stream through in bounded memory
+    if chunksize is None:
+        return [pd.read_csv(file, usecols=usecols)]
+    return pd.read_csv(file, usecols=usecols, chunksize=chunksize)
+
+def concat_chunks(chunks):
+    # Each chunk categorises on its own, so widen every categorical column to the union of its categories before stacking
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            dtype = union_categoricals([chunk[col] for chunk in chunks], sort_categories=True).dtype
+            for chunk in chunks:
+                chunk[col] = chunk[col].astype(dtype)
+    return pd.concat(chunks, ignore_index=True)
+
+# Perk Names That Start With 'Enhanced ' Without Being Enhanced Perks
+unenhanced_perk_names = ['Enhanced Battery']
+
+def normalize_perk_names(names):
+    # Strips DIM's '*' marker and the 'Enhanced ' prefix, flagging which names were enhanced
+    names = pd.Series(names, dtype=object).str.replace('*', '', regex=False)
+    enhanced = names.str.startswith('Enhanced ') & ~names.isin(unenhanced_perk_names)
+    names = names.where(~enhanced, names.str.slice(len('Enhanced ')))
+    return names.to_numpy(), enhanced.to_numpy()
+
+def normalize_dim_perks(df):
+    # Normalize Each Distinct Perk Once, Then Map Every Cell Back Through Its Code
+    dim_perk_columns = df.filter(regex='^Perks').columns
+    codes, uniques = pd.factorize(df[dim_perk_columns].to_numpy(dtype=object).ravel())
+    names, enhanced = normalize_perk_names(uniques)
+    name_codes, perk_names = pd.factorize(names, sort=True)
+    codes = codes.reshape(len(df), len(dim_perk_columns))
+    perk_codes = np.where(codes >= 0, name_codes[codes], -1)
+
+    df = df.drop(columns=dim_perk_columns)
+    perks = pd.DataFrame({col: pd.Categorical.from_codes(perk_codes[:, i], categories=perk_names) for i, col in enumerate(dim_perk_columns)}, index=df.index)
+
+    # Keep Track Of Rolls With At Least One Enhanced Perk
+    perks['Enhanced Roll'] = ((codes >= 0) & enhanced[codes]).any(axis=1)
+    df = pd.concat([df, perks], axis=1)
+    return df
+
+def prepare_dim_weapon_chunk(df, manifest_join_data):
+    df = pd.merge(df, manifest_join_data, left_on='Hash', right_on='Weapon Hash', how='left')
     df = df.rename(columns={'Id': 'Weapon ID'})
 
     cols = df.columns.tolist()
     first_cols = ['Weapon Name With Season', 'Weapon Name', 'Weapon Season', 'Weapon Hash', 'Weapon ID', 'Weapon Tier', 'Weapon Type', 'Weapon Archetype',
                   'Weapon Slot', 'Weapon Element',
                   'Weapon Current Version', 'Weapon Power Cap', 'Is Sunset']
-    remaining_cols = [col for col in cols if col not in first_cols]
+    remaining_cols = [col for col in cols if col not in first_cols + ['Hash']]
     df = df[first_cols + remaining_cols]
-    df = df.drop(
-        columns=['Name', 'Hash', 'Tag', 'Source', 'Tier', 'Type', 'Category', 'Element', 'Power', 'Power Limit', 'Owner', 'Locked', 'Equipped', 'Year', 'Season', 'Event', 'Recoil',
-                 'AA', 'Impact', 'Range', 'Zoom', 'Blast Radius', 'Velocity', 'Stability', 'ROF', 'Reload', 'Mag', 'Handling', 'Charge Time', 'Guard Resistance', 'Draw Time', 'Accuracy',
-                 'Charge Rate', 'Guard Efficiency', 'Swing Speed', 'Shield Duration', 'Kill Tracker', 'Foundry', 'Loadouts', 'Notes', 'Perks 0'])
 
-    dim_perk_columns = df.filter(regex='^Perks').columns
-    df[dim_perk_columns] = df[dim_perk_columns].replace(to_replace='\*', value='', regex=True)
+    df = normalize_dim_perks(df)
 
-    # Replace Enhanced Battery
-    df = df.replace('Enhanced Battery', 'E_nhanced Battery')
+    # Apply Compact Dtypes
+    df = apply_dim_weapon_schema(df)
+    return df
 
-    # Remove Enhanced from Perks
-    for column in df.columns:
-        if column.startswith('Perk'):
-            df[column] = df[column].str.replace('Enhanced ', '', regex=False)
+@instrumented
+def load_dim_weapon_data(file, manifest_weapon_data, chunksize=None):
+    manifest_join_data = manifest_weapon_data[manifest_join_columns]
+    chunks = read_csv_chunks(file, use_dim_weapon_column, chunksize)
+    df = concat_chunks(prepare_dim_weapon_chunk(chunk, manifest_join_data) for chunk in chunks)
 
-        # Replace Enhanced Battery
-        df = df.replace('E_nhanced Battery', 'Enhanced Battery')
+    # Perk Columns Share One Categorical Across Every Chunk
+    df = apply_dim_weapon_schema(df)
     return df
 
-@st.cache_data
-def load_dim_armour_data(file):
-    cols_to_use = ['Name', 'Hash', 'Id', 'Tier', 'Type', 'Equippable', 'Energy Capacity', 'Mobility (Base)', 'Resilience (Base)', 'Recovery (Base)', 'Discipline (Base)', 'Intellect (Base)', 'Strength (Base)', 'Total (Base)']
-    col_names = {'Id': 'id', 'Equippable': 'Character', 'Energy Capacity': 'MW_Tier', 'Mobility (Base)': 'base_mob', 'Resilience (Base)': 'base_res', 'Recovery (Base)': 'base_rec', 'Discipline (Base)': 'base_dis',
-                 'Intellect (Base)': 'base_int', 'Strength (Base)': 'base_str', 'Total (Base)': 'base_total'}
-    df = pd.read_csv(file, usecols=cols_to_use)
-    df = df.rename(columns=col_names)
+# Armour Stats And The Stat Combinations Derived From Them
+armour_stat_keys = ['mob', 'res', 'rec', 'dis', 'int', 'str']
+armour_stat_combinations = {'mob_res': ['mob', 'res'], 'mob_rec': ['mob', 'rec'], 'res_rec': ['res', 'rec'], 'group_1': ['mob', 'res', 'rec'],
+                            'group_2': ['dis', 'int', 'str']}
+armour_masterwork_bonus = 2
+
+def armour_combination_matrix():
+    # Maps the base stat matrix (six stats then the total) to every derived column in one multiplication, plus a masterwork offset
+    inputs = ['base_' + key for key in armour_stat_keys] + ['base_total']
+    derived = {'base_' + name: ['base_' + key for key in keys] for name, keys in armour_stat_combinations.items()}
+    derived.update({'mw_' + key: ['base_' + key] for key in armour_stat_keys})
+    derived['mw_total'] = ['base_total']
+    derived.update({'mw_' + name: ['base_' + key for key in keys] for name, keys in armour_stat_combinations.items()})
+
+    matrix = np.zeros((len(inputs), len(derived)), dtype=np.int16)
+    offset = np.zeros(len(derived), dtype=np.int16)
+    for j, (col, sources) in enumerate(derived.items()):
+        matrix[[inputs.index(source) for source in sources], j] = 1
+        if col.startswith('mw_'):
+            offset[j] = armour_masterwork_bonus * (len(armour_stat_keys) if col == 'mw_total' else len(sources))
+    return inputs, list(derived), matrix, offset
+
+def armour_stat_matrix(df, prefix='base_'):
+    # The six stats as one (n x 6) int16 matrix
+    return df[[prefix + key for key in armour_stat_keys]].to_numpy(dtype=np.int16)
+
+# Columns Read From A DIM Armour Export
+dim_armour_columns = ['Name', 'Hash', 'Id', 'Tier', 'Type', 'Equippable', 'Energy Capacity', 'Mobility (Base)', 'Resilience (Base)', 'Recovery (Base)', 'Discipline (Base)', 'Intellect (Base)', 'Strength (Base)', 'Total (Base)']
+dim_armour_column_names = {'Id': 'id', 'Equippable': 'Character', 'Energy Capacity': 'MW_Tier', 'Mobility (Base)': 'base_mob', 'Resilience (Base)': 'base_res', 'Recovery (Base)': 'base_rec', 'Discipline (Base)': 'base_dis',
+                           'Intellect (Base)': 'base_int', 'Strength (Base)': 'base_str', 'Total (Base)': 'base_total'}
+
+def prepare_dim_armour_chunk(df):
+    df = df.rename(columns=dim_armour_column_names)
     df['Type'] = df['Type'].replace({'Hunter Cloak', 'Warlock Bond', 'Titan Mark'}, 'Class Item').replace('Chest armour', 'Chest').replace('Leg armour', 'Legs')
-    df["base_mob_res"] = df['base_mob'] + df['base_res']
-    df["base_mob_rec"] = df['base_mob'] + df['base_rec']
-    df["base_res_rec"] = df['base_res'] + df['base_rec']
-    df["base_group_1"] = df['base_mob'] + df['base_res'] + df['base_rec']
-    df["base_group_2"] = df['base_dis'] + df['base_int'] + df['base_str']
-    df["mw_mob"] = df['base_mob'] + 2
-    df["mw_res"] = df['base_res'] + 2
-    df["mw_rec"] = df['base_rec'] + 2
-    df["mw_dis"] = df['base_dis'] + 2
-    df["mw_int"] = df['base_int'] + 2
-    df["mw_str"] = df['base_str'] + 2
-    df["mw_total"] = df['base_total'] + 12
-    df["mw_mob_res"] = df['mw_mob'] + df['mw_res']
-    df["mw_mob_rec"] = df['mw_mob'] + df['mw_rec']
-    df["mw_res_rec"] = df['mw_res'] + df['mw_rec']
-    df["mw_group_1"] = df['mw_mob'] + df['mw_res'] + df['mw_rec']
-    df["mw_group_2"] = df['mw_dis'] + df['mw_int'] + df['mw_str']
+    df = apply_dim_armour_schema(df)
+
+    # Derive Stat Pairs, Groups And Masterworked Stats From The Base Stat Matrix In One Pass
+    inputs, derived_columns, matrix, offset = armour_combination_matrix()
+    derived = df[inputs].to_numpy(dtype=np.int16) @ matrix + offset
+
+    # Points Past Each Tier Breakpoint, And The Total Points Wasted Per Piece
+    stats = np.concatenate([armour_stat_matrix(df), derived[:, [derived_columns.index('mw_' + key) for key in armour_stat_keys]]], axis=1)
+    remainders = stats % 10
+    wasted = np.column_stack([remainders[:, :6].sum(axis=1), remainders[:, 6:].sum(axis=1)]).astype(np.int16)
+    remainder_columns = [prefix + key + '_rem' for prefix in ['base_', 'mw_'] for key in armour_stat_keys] + ['base_wasted', 'mw_wasted']
+
+    derived = pd.DataFrame(np.concatenate([derived, remainders, wasted], axis=1), columns=derived_columns + remainder_columns, index=df.index)
+    df = pd.concat([df, derived], axis=1)
+    return df
+
+@instrumented
+def load_dim_armour_data(file, chunksize=None):
+    chunks = read_csv_chunks(file, dim_armour_columns, chunksize)
+    df = concat_chunks(prepare_dim_armour_chunk(chunk) for chunk in chunks)
     return df
+
+if __name__ == '__main__':
+    build_manifest_snapshot('data/Master Weapon Manifest.csv')
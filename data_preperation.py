@@ -1,64 +1,116 @@
-import streamlit as st
 import pandas as pd
 import numpy as np
-from st_aggrid import AgGrid, GridOptionsBuilder
+from wishlist import or_masks, mask_bits
+from caching import cache_data
+from instrumentation import instrumented, timed_block
 
-@st.cache_data
+@instrumented
+@cache_data
 def weapon_type_count(file):
-    df = file.groupby('Weapon Type').agg({'Weapon Name': ['count', 'nunique']})
+    df = file.groupby('Weapon Type', observed=True).agg({'Weapon Name': ['count', 'nunique']})
     df.columns = ['Total Count', 'Unique Count']
     df = df.reset_index().sort_values(by='Total Count', ascending=False)
     df.index += 1
     return df
 
-@st.cache_data
+@instrumented
+@cache_data
 def weapon_type_element_count(file):
-    df = file.groupby(['Weapon Type', 'Weapon Element']).agg({'Weapon Name': ['count', 'nunique']})
+    df = file.groupby(['Weapon Type', 'Weapon Element'], observed=True).agg({'Weapon Name': ['count', 'nunique']})
     df.columns = ['Total Count', 'Unique Count']
     df = df.reset_index().sort_values(by=['Weapon Type', 'Weapon Element'])
     df.index += 1
     return df
 
-@st.cache_data
-def weapon_type_output_without_dim(file):
-    df_1 = weapon_type_count(file)
-    df_2 = weapon_type_element_count(file)
-
-    weapon_elements = ['Kinetic', 'Stasis', 'Strand', 'Arc', 'Solar', 'Void']
-    for element in weapon_elements:
-        element_count_1 = df_2[df_2['Weapon Element'] == element].set_index('Weapon Type')['Unique Count']
-        df_1[element] = df_1['Weapon Type'].apply(lambda x: '{}'.format(element_count_1.get(x, 0)))
-    return df_1
-
-@st.cache_data
-def weapon_type_output_with_dim(manifest_weapon_data, file):
-    df_1 = weapon_type_count(manifest_weapon_data)
-    df_2 = weapon_type_count(file)
-    df = pd.merge(df_2, df_1, on='Weapon Type', how='left')
-    df = df.drop(columns=('Total Count_y'))
-    df = df.rename(columns={'Total Count_x': 'Total Owned', 'Unique Count_x': 'Unique Owned', 'Unique Count_y': 'Unique Available'})
-    df_3 = weapon_type_element_count(manifest_weapon_data)
-    df_4 = weapon_type_element_count(file)
-
-    weapon_elements = ['Kinetic', 'Stasis', 'Strand', 'Arc', 'Solar', 'Void']
-    for element in weapon_elements:
-        element_count_1 = df_4[df_4['Weapon Element'] == element].set_index('Weapon Type')['Unique Count']
-        element_count_2 = df_3[df_3['Weapon Element'] == element].set_index('Weapon Type')['Unique Count']
-        df[element] = df['Weapon Type'].apply(lambda x: '{} (of {})'.format(element_count_1.get(x, 0), element_count_2.get(x, 0)))
+# Vault Summary Pivot Axes, And The Order Elements Are Shown In
+vault_pivot_axes = ['Weapon Type', 'Weapon Element', 'Weapon Season', 'Weapon Archetype', 'Weapon Slot', 'Weapon Tier']
+weapon_elements = ['Kinetic', 'Stasis', 'Strand', 'Arc', 'Solar', 'Void']
+
+@instrumented
+def vault_pivot(file, rows='Weapon Type', columns='Weapon Element', value='Weapon Name'):
+    # Total and unique counts per row label, plus unique counts per (row, column) cell, from one pass over factorized codes
+    row_codes, row_labels = pd.factorize(file[rows], sort=True)
+    column_codes, column_labels = pd.factorize(file[columns], sort=True)
+    value_codes, value_labels = pd.factorize(file[value])
+    row_count, column_count, value_count = len(row_labels), len(column_labels), max(len(value_labels), 1)
+
+    # Each Distinct (Row, Column, Value) Triple Once - Column Slot 0 Holds Rows Without A Column Label
+    present = (row_codes >= 0) & (value_codes >= 0)
+    keys = np.unique((row_codes[present].astype(np.int64) * (column_count + 1) + column_codes[present] + 1) * value_count + value_codes[present])
+    key_rows = keys // ((column_count + 1) * value_count)
+    key_columns = keys // value_count % (column_count + 1) - 1
+
+    total_count = np.bincount(row_codes[present], minlength=row_count)
+    unique_count = np.bincount(np.unique(key_rows * value_count + keys % value_count) // value_count, minlength=row_count)
+    labelled = key_columns >= 0
+    cells = np.bincount(key_rows[labelled] * column_count + key_columns[labelled], minlength=row_count * column_count).reshape(row_count, column_count)
+
+    df = pd.DataFrame(cells, index=pd.Index(row_labels, name=rows), columns=[str(label) for label in column_labels])
+    df.insert(0, 'Total Count', total_count)
+    df.insert(1, 'Unique Count', unique_count)
     return df
 
-@st.cache_data
-def owned_counted_list(file):
-    df = file.groupby('Weapon Name').agg({'Weapon Name': ['count']})
+def pivot_column_order(file, columns):
+    if columns == 'Weapon Element':
+        return weapon_elements
+    return [str(label) for label in pd.factorize(file[columns], sort=True)[1]]
+
+@instrumented
+@cache_data
+def weapon_type_output_without_dim(file, rows='Weapon Type', columns='Weapon Element'):
+    df = vault_pivot(file, rows, columns)
+    df = df.reindex(columns=['Total Count', 'Unique Count'] + pivot_column_order(file, columns), fill_value=0)
+    df = df.reset_index().sort_values(by='Total Count', ascending=False)
+    df.index += 1
+    return df
+
+@instrumented
+@cache_data
+def weapon_type_output_with_dim(manifest_weapon_data, file, rows='Weapon Type', columns='Weapon Element'):
+    # Owned counts per cell, with the matching available counts alongside as '<label> Available' for format_vault_summary
+    owned = vault_pivot(file, rows, columns)
+    available = vault_pivot(manifest_weapon_data, rows, columns)
+    labels = pivot_column_order(manifest_weapon_data, columns)
+    labels = labels + [label for label in pivot_column_order(file, columns) if label not in labels]
+
+    df = owned[['Total Count', 'Unique Count']].rename(columns={'Total Count': 'Total Owned', 'Unique Count': 'Unique Owned'})
+    df['Unique Available'] = available['Unique Count'].reindex(df.index)
+    owned = owned.reindex(columns=labels, fill_value=0)
+    available = available.reindex(index=df.index, columns=labels, fill_value=0)
+    for label in labels:
+        df[label] = owned[label]
+        df[label + ' Available'] = available[label]
+    df = df.reset_index().sort_values(by='Total Owned', ascending=False).reset_index(drop=True)
+    return df
+
+@instrumented
+def format_vault_summary(df):
+    # Display strings are built only when rendering, so the numeric table stays sortable
+    df = df.copy()
+    for col in [col for col in df.columns if isinstance(col, str) and col.endswith(' Available') and col != 'Unique Available']:
+        label = col[:-len(' Available')]
+        df[label] = df[label].astype(str) + ' (of ' + df.pop(col).astype(str) + ')'
+    return df
+
+@instrumented
+def owned_counted_list(ownership_summary, item_hashes=None):
+    # Copies owned per weapon name, read off the ownership summary. item_hashes limits it to those weapons (a filtered manifest's hashes),
+    # where copies are added up over the kept hashes only - Owned By Name would also count the copies the filters hide
+    if item_hashes is None:
+        df = ownership_summary.drop_duplicates(subset='Weapon Name')[['Weapon Name', 'Owned By Name']].dropna(subset=['Weapon Name'])
+        df = df.set_index('Weapon Name').sort_index()
+    else:
+        df = ownership_summary.loc[ownership_summary.index.isin(item_hashes)].groupby('Weapon Name')[['Owned']].sum()
     df.columns = ['Count']
     df = df.reset_index().sort_values(by='Count', ascending=False)
     df = df.reset_index(drop=True)
     df.index += 1
     return df
 
-@st.cache_data
-def not_owned_list(manifest_weapon_data, file):
-    df_1 = file['Weapon Name'].unique()
+@instrumented
+def not_owned_list(manifest_weapon_data, ownership_summary):
+    # Manifest weapon names with no owned copy among the manifest's own hashes - pass a filtered manifest for a filtered view
+    df_1 = ownership_summary.loc[ownership_summary.index.isin(manifest_weapon_data['Weapon Hash']), 'Weapon Name'].unique()
     df = manifest_weapon_data[~manifest_weapon_data['Weapon Name'].isin(df_1)]['Weapon Name'].unique()
     df = pd.DataFrame({'Weapon Name': df})
     df = df.sort_values(by='Weapon Name')
@@ -66,144 +118,218 @@ def not_owned_list(manifest_weapon_data, file):
     df.index += 1
     return df
 
-@st.cache_data
+@instrumented
 def owned_weapons_perk_list(manifest_weapon_data, file):
-    # Merge Data
-    df = pd.merge(file, manifest_weapon_data, on='Weapon Hash', how='left')
-
-    # Clean Up Columns
-    columns_to_drop = df.filter(like='_y')
-    df = df.drop(columns=columns_to_drop)
-    df.columns = [col.rstrip('_x') if col.endswith('_x') else col for col in df.columns]
-
-    # Define the list of columns to keep
-    columns_to_keep = [
-        'Weapon Name', 'Weapon Hash', 'Weapon ID', 'Perks 1', 'Perks 2', 'Perks 3', 'Perks 4', 'Perks 5', 'Perks 6', 'Perks 7', 'Perks 8',
-        'Perks 9', 'Perks 10', 'Perks 11', 'Perks 12', 'Perks 13', 'Perks 14', 'Perks 15', 'Perks 16', 'Perks 17',
-        'Slot 1 Perk 0', 'Slot 1 Perk 1', 'Slot 1 Perk 2', 'Slot 1 Perk 3', 'Slot 1 Perk 4', 'Slot 1 Perk 5','Slot 1 Perk 6',
-        'Slot 1 Perk 7', 'Slot 1 Perk 8', 'Slot 1 Perk 9', 'Slot 1 Perk 10', 'Slot 1 Perk 11', 'Slot 1 Perk 12',
-        'Slot 2 Perk 0', 'Slot 2 Perk 1', 'Slot 2 Perk 2', 'Slot 2 Perk 3', 'Slot 2 Perk 4', 'Slot 2 Perk 5','Slot 2 Perk 6',
-        'Slot 2 Perk 7', 'Slot 2 Perk 8', 'Slot 2 Perk 9', 'Slot 2 Perk 10', 'Slot 2 Perk 11', 'Slot 2 Perk 12',
-        'Slot 3 Perk 0', 'Slot 3 Perk 1', 'Slot 3 Perk 2', 'Slot 3 Perk 3', 'Slot 3 Perk 4', 'Slot 3 Perk 5','Slot 3 Perk 6',
-        'Slot 3 Perk 7', 'Slot 3 Perk 8', 'Slot 3 Perk 9', 'Slot 3 Perk 10', 'Slot 3 Perk 11', 'Slot 3 Perk 12',
-        'Slot 4 Perk 0', 'Slot 4 Perk 1', 'Slot 4 Perk 2', 'Slot 4 Perk 3', 'Slot 4 Perk 4', 'Slot 4 Perk 5','Slot 4 Perk 6',
-        'Slot 4 Perk 7', 'Slot 4 Perk 8', 'Slot 4 Perk 9', 'Slot 4 Perk 10', 'Slot 4 Perk 11', 'Slot 4 Perk 12']
-
-    # Keep only the selected columns
-    df = df[columns_to_keep]
-
     # Select Perk Columns
     perk_columns = [col for col in file.columns if col.startswith('Perk')]
+    slot_columns = [col for col in manifest_weapon_data.columns if col.startswith('Slot')]
+
+    # Melt Owned Perks Into Long Form (row order, then perk column order)
+    owned_perks = file[perk_columns].reset_index(drop=True).stack()
+    owned_perks = owned_perks[owned_perks != '']
+    owned_rows = owned_perks.index.get_level_values(0)
+    owned_perks = pd.DataFrame({
+        'Weapon Name': file['Weapon Name'].to_numpy()[owned_rows],
+        'Weapon Hash': file['Weapon Hash'].to_numpy()[owned_rows],
+        'Weapon ID': file['Weapon ID'].to_numpy()[owned_rows],
+        'Perk': owned_perks.to_numpy()})
+
+    # Melt Manifest Slot Perks Into A (Weapon Hash, Perk) -> Slot Lookup
+    slot_perks = manifest_weapon_data.set_index('Weapon Hash')[slot_columns].stack()
+    slot_names = {col: ' '.join(col.split()[:2]) for col in slot_columns}
+    slot_perks = pd.DataFrame({
+        'Weapon Hash': slot_perks.index.get_level_values(0),
+        'Slot': slot_perks.index.get_level_values(1).map(slot_names),
+        'Perk': slot_perks.to_numpy()})
+
+    # Where A Perk Sits In More Than One Slot, The Last Slot Column Wins
+    slot_perks = slot_perks.drop_duplicates(subset=['Weapon Hash', 'Perk'], keep='last')
+
+    # Resolve Slots With A Single Join (left join keeps the owned perk order)
+    df = pd.merge(owned_perks, slot_perks, on=['Weapon Hash', 'Perk'], how='left')
+    df = df.dropna(subset=['Slot']).reset_index(drop=True)
 
-    # Iterate through each "Perk" column
-    for perk_col in perk_columns:
-        # Create a new column to store the results
-        df[f'{perk_col}_Slot_With_Perk'] = ''
-
-        # Iterate through each row
-        for index, row in df.iterrows():
-            perk_value = row[perk_col]
-
-            # Skip the iteration if perk_value is blank
-            if perk_value == '':
-                continue
-
-            # Check for Perk entry in Slot columns
-            for slot_col in df.columns:
-                if slot_col.startswith('Slot') and pd.notna(row[slot_col]) and pd.notna(perk_value) and str(perk_value) in str(row[slot_col]):
-                    df.at[index, f'{perk_col}_Slot_With_Perk'] = slot_col
-
-    # List of columns to explode
-    columns_to_explode = [col for col in df.columns if col.endswith('Slot_With_Perk')]
-
-    # Create a new DataFrame to store exploded rows
-    df_2 = pd.DataFrame()
-
-    # Iterate through the rows
-    for idx, row in df.iterrows():
-        entry_idx = 0  # Initialize the entry index
-
-        # Iterate through the columns to explode
-        for col in columns_to_explode:
-            # Get the non-blank entries in the column
-            entries = [entry for entry in row[col].split(', ') if entry != '']
-
-            # Create a new row for each entry
-            for entry in entries:
-                new_row = row.copy()  # Copy the original row
-                new_row[col] = entry  # Set the exploded entry
-                new_row['Entry_Index'] = entry_idx + 1  # Add the entry index
-                df_2 = pd.concat([df_2, new_row.to_frame().T], ignore_index=True)
-                entry_idx += 1  # Increment the entry index
-
-    df_2['Slot'] = ''
-    df_2['Perk'] = ''
-
-    # Find Column Numbers
-    column_number_1 = df_2.columns.get_loc('Perks 1') - 1
-    column_number_2 = df_2.columns.get_loc('Perks 1_Slot_With_Perk') - 1
+    # Reduce DataFrame
+    columns_to_keep = ['Weapon Name', 'Weapon Hash', 'Weapon ID', 'Slot', 'Perk']
+    df = df[columns_to_keep]
+    return df
 
-    # Iterate through the rows
-    for idx, row in df_2.iterrows():
-        column_idx_1 = column_number_1 + row['Entry_Index']
-        column_idx_2 = column_number_2 + row['Entry_Index']
-        df_2.loc[idx, 'Perk'] = row[column_idx_1]
-        df_2.loc[idx, 'Slot'] = row[column_idx_2]
+@instrumented
+def perk_coverage(manifest_weapon_data, perk_list):
+    # Per owned weapon and slot, how many of the perks the slot can roll turn up on at least one owned copy
+    owned = pd.DataFrame({'Weapon Hash': perk_list['Weapon Hash'].to_numpy(dtype=np.int64), 'Slot': perk_list['Slot'].astype(str).to_numpy(),
+                          'Perk': perk_list['Perk'].astype(str).to_numpy()}).drop_duplicates()
+
+    # Rollable Perks For The Owned Hashes, With The Same Last-Slot-Wins Rule As owned_weapons_perk_list
+    manifest = manifest_weapon_data.loc[manifest_weapon_data['Weapon Hash'].isin(owned['Weapon Hash'])]
+    slot_columns = [col for col in manifest.columns if col.startswith('Slot')]
+    slot_perks = manifest.set_index('Weapon Hash')[slot_columns].stack()
+    slot_names = {col: ' '.join(col.split()[:2]) for col in slot_columns}
+    rollable = pd.DataFrame({'Weapon Hash': slot_perks.index.get_level_values(0).astype(np.int64), 'Slot': slot_perks.index.get_level_values(1).map(slot_names),
+                             'Perk': slot_perks.astype(str).to_numpy()})
+    rollable = rollable.drop_duplicates(subset=['Weapon Hash', 'Perk'], keep='last')
+
+    df = rollable.groupby(['Weapon Hash', 'Slot']).size().rename('Rollable Perks').to_frame()
+    df['Owned Perks'] = owned.merge(rollable, on=['Weapon Hash', 'Slot', 'Perk']).groupby(['Weapon Hash', 'Slot']).size().reindex(df.index, fill_value=0)
+    df['Coverage'] = (df['Owned Perks'] / df['Rollable Perks']).round(3)
+    df = df.reset_index()
+    df.insert(0, 'Weapon Name With Season', manifest.set_index('Weapon Hash')['Weapon Name With Season'].reindex(df['Weapon Hash']).to_numpy())
+    df = df.sort_values(by=['Weapon Name With Season', 'Weapon Hash', 'Slot']).reset_index(drop=True)
+    df.index += 1
+    return df
 
-    df_2['Slot'] = df_2['Slot'].str.split(n=2).str[:2].str.join(' ')
+@instrumented
+def ownership_summary(file):
+    # One row per owned Weapon Hash, built once per upload: counts by hash, by name and by name + power cap, and crafted levels
+    owned = file.dropna(subset=['Weapon Hash'])
+    crafted = owned['Crafted'] == True
+    df = owned.groupby('Weapon Hash').agg(**{'Weapon Name': ('Weapon Name', 'first'), 'Weapon Power Cap': ('Weapon Power Cap', 'first'),
+                                             'Owned': ('Weapon Hash', 'size')})
+    df['Crafted Count'] = crafted.groupby(owned['Weapon Hash']).sum()
+    df['Max Crafted Level'] = owned['Crafted Level'].where(crafted).groupby(owned['Weapon Hash']).max()
+    crafted_levels = owned.loc[crafted].dropna(subset=['Crafted Level']).sort_values(by='Crafted Level', ascending=False)
+    crafted_levels = crafted_levels.groupby('Weapon Hash')['Crafted Level'].agg(tuple)
+    df['Crafted Levels'] = [crafted_levels.get(weapon_hash, ()) for weapon_hash in df.index]
+
+    # Totals Across Every Hash Sharing A Name, Or A Name And Power Cap
+    df['Owned By Name'] = df.groupby('Weapon Name', observed=True)['Owned'].transform('sum')
+    df['Owned By Name And Power Cap'] = df.groupby(['Weapon Name', 'Weapon Power Cap'], observed=True)['Owned'].transform('sum')
+    df.index = df.index.astype('int64')
+    return df
 
-    # Reduce DataFrame
-    columns_to_keep = ['Weapon Name', 'Weapon Hash', 'Weapon ID', 'Slot', 'Perk']
-    df_2 = df_2[columns_to_keep]
-    return df_2
+@instrumented
+def attach_ownership(df, ownership_summary, name='Count', column='Owned', position=1):
+    # One aligned column add in place of a merge on Weapon Hash - keeps the row order and, like the merge, a fresh index
+    df = df.reset_index(drop=True)
+    df.insert(position, name, ownership_summary[column].reindex(df['Weapon Hash']).to_numpy())
+    return df
 
-@st.cache_data
+@instrumented
+@cache_data
 def crafted_weapon_list(file):
     df = file.loc[file['Crafted'] == True]
     df = df[['Weapon Name With Season', 'Weapon Name', 'Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Crafted Level']]
     df = df.reset_index().sort_values(by='Crafted Level', ascending=False)
     return df
 
+@instrumented
+def dismantle_candidates(file, perk_list):
+    # Copies of a weapon that another copy of the same hash beats outright - the other copy has every perk this one has in every slot
+    # (and is enhanced if this one is) with at least its crafted level. Exact copies keep the first and list the rest
+    rolls = file.dropna(subset=['Weapon Hash']).drop_duplicates(subset=['Weapon ID'])
+    rolls = rolls.loc[rolls.groupby('Weapon Hash')['Weapon ID'].transform('size') > 1].reset_index(drop=True)
+    hashes = rolls['Weapon Hash'].to_numpy(dtype=np.int64)
+    levels = rolls['Crafted Level'].fillna(0).to_numpy(dtype=np.int64)
+
+    # Number Each Hash's Own (Slot, Perk) Pairs, Then OR Every Roll's Pairs Into One Mask
+    roll_rows = pd.Index(rolls['Weapon ID']).get_indexer(perk_list['Weapon ID'])
+    owned = pd.DataFrame({'Roll': roll_rows, 'Slot': perk_list['Slot'].astype(str).to_numpy(), 'Perk': perk_list['Perk'].astype(str).to_numpy()})
+    owned = owned.loc[owned['Roll'] >= 0]
+    if 'Enhanced Roll' in rolls.columns:
+        enhanced_rows = np.flatnonzero(rolls['Enhanced Roll'].to_numpy(dtype=bool))
+        owned = pd.concat([owned, pd.DataFrame({'Roll': enhanced_rows, 'Slot': 'Enhanced', 'Perk': 'Enhanced Roll'})], ignore_index=True)
+    owned['Weapon Hash'] = hashes[owned['Roll'].to_numpy(dtype=np.int64)]
+    pairs = owned[['Weapon Hash', 'Slot', 'Perk']].drop_duplicates()
+    pairs = pairs.assign(Bit=pairs.groupby('Weapon Hash').cumcount())
+    owned = owned.merge(pairs, on=['Weapon Hash', 'Slot', 'Perk'])
+    words = max(1, -(-(int(owned['Bit'].max()) + 1) // mask_bits)) if len(owned) > 0 else 1
+    masks = or_masks(owned['Roll'].to_numpy(dtype=np.int64), owned['Bit'].to_numpy(dtype=np.int64), len(rolls), words)
+
+    # Test Every Ordered Pair Of Copies At Once - b Beats a When a's Perks Are A Subset Of b's And b's Level Is At Least a's
+    copies = pd.DataFrame({'Copy': np.arange(len(rolls)), 'Weapon Hash': hashes})
+    copies = copies.merge(copies, on='Weapon Hash', suffixes=(' A', ' B'))
+    a, b = copies['Copy A'].to_numpy(), copies['Copy B'].to_numpy()
+    covered = ((masks[a] & ~masks[b]) == 0).all(axis=1) & (levels[b] >= levels[a])
+    same = (masks[a] == masks[b]).all(axis=1) & (levels[a] == levels[b])
+    beats = (a != b) & covered & (~same | (b < a))
+    a, b, same = a[beats], b[beats], same[beats]
+
+    # Point Each Candidate At A Copy Nothing Beats (beating is transitive, so there's always one)
+    keepers = ~np.isin(b, a)
+    a, b, same = a[keepers], b[keepers], same[keepers]
+    a, first = np.unique(a, return_index=True)
+    b, same = b[first], same[first]
+
+    df = pd.DataFrame({'Weapon Name With Season': rolls['Weapon Name With Season'].to_numpy()[a], 'Weapon Hash': hashes[a],
+                       'Weapon ID': 'id:' + rolls['Weapon ID'].astype(str).to_numpy()[a], 'Crafted Level': rolls['Crafted Level'].to_numpy()[a],
+                       'Reason': np.where(same, 'Duplicate', 'Dominated'), 'Kept Copy': 'id:' + rolls['Weapon ID'].astype(str).to_numpy()[b]})
+    df = df.sort_values(by=['Weapon Name With Season', 'Weapon ID']).reset_index(drop=True)
+    df.index += 1
+    return df
+
+# Weapon Table Layouts - Shared Weapon Details, Then The Stats Each Family Of Weapon Types Shows
+weapon_info_columns = ['Weapon Name With Season', 'Weapon Name', 'Weapon Season', 'Weapon Hash', 'Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot',
+                       'Weapon Element', 'Weapon Current Version', 'Weapon Power Cap', 'Is Sunset']
+weapon_stat_layouts = {
+    'Primary': ['Impact', 'Range', 'Stability', 'Handling', 'Reload Speed', 'Aim Assistance', 'Zoom', 'Airborne Effectiveness', 'Recoil Direction', 'Rounds Per Minute', 'Magazine'],
+    'Bow': ['Impact', 'Accuracy', 'Stability', 'Handling', 'Reload Speed', 'Aim Assistance', 'Zoom', 'Airborne Effectiveness', 'Recoil Direction', 'Draw Time'],
+    'Fusion': ['Impact', 'Range', 'Stability', 'Handling', 'Reload Speed', 'Aim Assistance', 'Zoom', 'Airborne Effectiveness', 'Recoil Direction', 'Charge Time', 'Magazine'],
+    'Launcher': ['Blast Radius', 'Velocity', 'Stability', 'Handling', 'Reload Speed', 'Aim Assistance', 'Zoom', 'Airborne Effectiveness', 'Recoil Direction', 'Rounds Per Minute',
+                 'Magazine'],
+    'Glaive': ['Impact', 'Range', 'Shield Duration', 'Handling', 'Reload Speed', 'Aim Assistance', 'Airborne Effectiveness', 'Rounds Per Minute', 'Charge Time', 'Magazine'],
+    'Sword': ['Impact', 'Swing Speed', 'Guard Efficiency', 'Guard Resistance', 'Charge Rate', 'Ammo Capacity'],
+}
+weapon_type_layouts = {
+    'Auto Rifle': 'Primary', 'Hand Cannon': 'Primary', 'Machine Gun': 'Primary', 'Pulse Rifle': 'Primary', 'Scout Rifle': 'Primary', 'Shotgun': 'Primary',
+    'Sidearm': 'Primary', 'Sniper Rifle': 'Primary', 'Submachine Gun': 'Primary', 'Trace Rifle': 'Primary', 'Combat Bow': 'Bow', 'Fusion Rifle': 'Fusion',
+    'Linear Fusion Rifle': 'Fusion', 'Grenade Launcher': 'Launcher', 'Rocket Launcher': 'Launcher', 'Glaive': 'Glaive', 'Sword': 'Sword',
+}
+
+# Grid Column Widths (anything not listed is 90) And Columns Always Kept Out Of View
+weapon_column_widths = {'Weapon Name With Season': 250, 'Weapon Hash': 125, 'Weapon Tier': 125, 'Weapon Type': 125, 'Weapon Archetype': 150, 'Weapon Slot': 125,
+                        'Weapon Element': 135}
+weapon_default_column_width = 90
+weapon_hidden_columns = ['Weapon Name', 'Weapon Season', 'Weapon Current Version', 'Weapon Power Cap']
+
+# Grid Pages And The Empty Column Dtypes That Stand In For Each Dtype Kind When Building GridOptions
+grid_page_sizes = [100, 250, 500, 1000]
+grid_kind_dtypes = {'b': 'bool', 'i': 'int64', 'u': 'uint64', 'f': 'float64', 'M': 'datetime64[ns]', 'm': 'timedelta64[ns]'}
+
+
+def weapon_type_columns(selected_type):
+    # Weapon details plus the stats for the type - just the details for 'Select all' or anything without a layout
+    layout = weapon_type_layouts.get(selected_type)
+    return weapon_info_columns + (weapon_stat_layouts[layout] if layout is not None else [])
+
+def weapon_type_stat_columns(selected_type):
+    return weapon_type_columns(selected_type)[len(weapon_info_columns):]
+
+@instrumented
 def load_weapon_type_data(file, selected_type):
-    # Define first_cols
-    first_cols = ['Weapon Name With Season', 'Weapon Name', 'Weapon Season', 'Weapon Hash', 'Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot', 'Weapon Element',
-                  'Weapon Current Version', 'Weapon Power Cap', 'Is Sunset']
-
-    type_1_list = pd.DataFrame(file, columns=['Impact', 'Range', 'Stability', 'Handling', 'Reload Speed', 'Aim Assistance', 'Zoom', 'Airborne Effectiveness', 'Recoil Direction', 'Rounds Per Minute', 'Magazine'])
-    type_2_list = pd.DataFrame(file, columns=['Impact', 'Accuracy', 'Stability', 'Handling', 'Reload Speed', 'Aim Assistance', 'Zoom', 'Airborne Effectiveness', 'Recoil Direction', 'Draw Time'])
-    type_3_list = pd.DataFrame(file, columns=['Impact', 'Range', 'Stability', 'Handling', 'Reload Speed', 'Aim Assistance', 'Zoom', 'Airborne Effectiveness', 'Recoil Direction', 'Charge Time', 'Magazine'])
-    type_4_list = pd.DataFrame(file, columns=['Blast Radius', 'Velocity', 'Stability', 'Handling', 'Reload Speed', 'Aim Assistance', 'Zoom', 'Airborne Effectiveness', 'Recoil Direction', 'Rounds Per Minute',
-                                              'Magazine'])
-    type_5_list = pd.DataFrame(file, columns=['Impact', 'Range', 'Shield Duration', 'Handling', 'Reload Speed', 'Aim Assistance', 'Airborne Effectiveness', 'Rounds Per Minute', 'Charge Time', 'Magazine'])
-    type_6_list = pd.DataFrame(file, columns=['Impact', 'Swing Speed', 'Guard Efficiency', 'Guard Resistance', 'Charge Rate', 'Ammo Capacity'])
-
-    # Create Additional Filters for Weapon Type
-    type_map = {
-        'Auto Rifle': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Hand Cannon': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Machine Gun': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Pulse Rifle': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Scout Rifle': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Shotgun': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Sidearm': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Sniper Rifle': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Submachine Gun': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Trace Rifle': pd.concat([pd.DataFrame(file, columns=first_cols), type_1_list], axis=1),
-        'Combat Bow': pd.concat([pd.DataFrame(file, columns=first_cols), type_2_list], axis=1),
-        'Fusion Rifle': pd.concat([pd.DataFrame(file, columns=first_cols), type_3_list], axis=1),
-        'Linear Fusion Rifle': pd.concat([pd.DataFrame(file, columns=first_cols), type_3_list], axis=1),
-        'Grenade Launcher': pd.concat([pd.DataFrame(file, columns=first_cols), type_4_list], axis=1),
-        'Rocket Launcher': pd.concat([pd.DataFrame(file, columns=first_cols), type_4_list], axis=1),
-        'Glaive': pd.concat([pd.DataFrame(file, columns=first_cols), type_5_list], axis=1),
-        'Sword': pd.concat([pd.DataFrame(file, columns=first_cols), type_6_list], axis=1),
-    }
-
-    # Return the selected type from the type_map dictionary
-    return type_map[selected_type]
+    # One column selection for the requested type - columns the frame lacks come back empty
+    columns = weapon_type_columns(selected_type)
+    if set(columns).issubset(file.columns):
+        return file[columns]
+    return file.reindex(columns=columns)
+
+# Ways To Show Stat Columns - As Is, Or Against The Rest Of The Weapon's Archetype
+stat_view_modes = ['Value', 'Archetype Percentile', 'Archetype Rank', 'Archetype Z-Score', 'Vs Archetype Median']
+
+@instrumented
+def apply_stat_view(df, stat_index, item_index, mode):
+    # Swap a table's stat columns for their standing within the archetype, looked up by hash - 'Value' leaves the table as is
+    columns = [col for col in df.columns if col in stat_index.column_positions]
+    if mode == 'Value' or len(columns) == 0:
+        return df
+    df = df.copy()
+    df[columns] = stat_index.view(item_index.positions_for(df['Weapon Hash']), columns, mode)
+    if mode == 'Archetype Rank':
+        df[columns] = df[columns].astype('Int16')
+    return df
+
+def grid_visible_columns(columns, hidden_filters):
+    # Columns the grid shows - the layout's always-hidden columns, and filter columns pinned to one value, are left out of the payload
+    return [column for column in columns if not (column in weapon_hidden_columns or hidden_filters.get(column, False))]
+
+@instrumented
+@cache_data
+def grid_options(columns, kinds):
+    # GridOptions only depend on the visible columns and their dtype kinds, so each layout is built once and reused across reruns
+    from st_aggrid import GridOptionsBuilder
+    layout = pd.DataFrame({column: pd.Series(dtype=grid_kind_dtypes.get(kind, 'object')) for column, kind in zip(columns, kinds)})
 
-def create_grid_table(file, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
     # Set up the GridOptionsBuilder object
-    gridOptionsBuilder = GridOptionsBuilder.from_dataframe(file)
+    gridOptionsBuilder = GridOptionsBuilder.from_dataframe(layout)
 
     # Set first column as index
     gridOptionsBuilder.configure_first_column_as_index(headerText='Weapon Name (S)')
@@ -211,174 +337,96 @@ def create_grid_table(file, selected_tier, selected_type, selected_archetype, se
     # Add single select box
     gridOptionsBuilder.configure_selection(selection_mode='single', use_checkbox=True)
 
-    # Hide Unneeded Columns
-    gridOptionsBuilder.configure_column('Weapon Name', resizable=True, hide=True)
-    gridOptionsBuilder.configure_column('Weapon Season', resizable=True, hide=True)
-    gridOptionsBuilder.configure_column('Weapon Current Version', resizable=True, hide=True)
-    gridOptionsBuilder.configure_column('Weapon Power Cap', resizable=True, hide=True)
-
     # Size Columns
-    columns_to_configure = file
-    for column in columns_to_configure:
-        gridOptionsBuilder.configure_column(column, resizable=True, width=90)
-    gridOptionsBuilder.configure_column('Weapon Name With Season', resizable=True, width=250)
-    gridOptionsBuilder.configure_column('Weapon Hash', resizable=True, width=125)
-    gridOptionsBuilder.configure_column('Weapon Tier', resizable=True, width=125)
-    gridOptionsBuilder.configure_column('Weapon Type', resizable=True, width=125)
-    gridOptionsBuilder.configure_column('Weapon Archetype', resizable=True, width=150)
-    gridOptionsBuilder.configure_column('Weapon Slot', resizable=True, width=125)
-    gridOptionsBuilder.configure_column('Weapon Element', resizable=True, width=135)
+    for column in columns:
+        gridOptionsBuilder.configure_column(column, resizable=True, width=weapon_column_widths.get(column, weapon_default_column_width))
+    return gridOptionsBuilder.build()
+
+@instrumented
+def grid_search(file, search):
+    # Weapons whose name contains the search text, ignoring case
+    if len(search) == 0:
+        return file
+    return file.loc[file['Weapon Name With Season'].astype(str).str.contains(search, case=False, regex=False)]
+
+@instrumented
+def grid_page(file, sort_by=None, ascending=True, page=1, page_size=grid_page_sizes[0]):
+    # Sort the whole frame, then cut out one page
+    if sort_by is not None:
+        file = file.sort_values(by=sort_by, ascending=ascending, kind='stable', na_position='last')
+    start = (page - 1) * page_size
+    return file.iloc[start:start + page_size]
+
+@instrumented
+def create_grid_table(file, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
+    # Streamlit And AgGrid Are Only Loaded By The App, Never By Batch Reports
+    import streamlit as st
+    from st_aggrid import AgGrid
 
     # Hide columns where the filter is selected
-    if len(selected_tier) == 1:
-        gridOptionsBuilder.configure_column('Weapon Tier', resizable=True, hide=True)
-
-    if selected_type != 'Select all':
-        gridOptionsBuilder.configure_column('Weapon Type', resizable=True, hide=True)
-
-    if selected_archetype != 'Select all':
-        gridOptionsBuilder.configure_column('Weapon Archetype', resizable=True, hide=True)
-
-    if selected_slot != 'Select all':
-        gridOptionsBuilder.configure_column('Weapon Slot', resizable=True, hide=True)
-
-    if selected_element != 'Select all':
-        gridOptionsBuilder.configure_column('Weapon Element', resizable=True, hide=True)
-
-    if selected_sunset == 'Yes':
-        gridOptionsBuilder.configure_column('Is Sunset', resizable=True, hide=True)
+    hidden_filters = {'Weapon Tier': len(selected_tier) == 1, 'Weapon Type': selected_type != 'Select all', 'Weapon Archetype': selected_archetype != 'Select all',
+                      'Weapon Slot': selected_slot != 'Select all', 'Weapon Element': selected_element != 'Select all', 'Is Sunset': selected_sunset == 'Yes'}
+    columns = grid_visible_columns(file.columns, hidden_filters)
+
+    # Search, Sort And Page On The Server - The Browser Only Receives The Rows On Screen
+    col1, col2, col3, col4, col5 = st.columns([3, 2, 1, 1, 1])
+    search = col1.text_input('Search Weapons', help='Only Show Weapons Whose Name Contains This Text')
+    sort_by = col2.selectbox('Sort Table By', ['Default Order'] + columns, help='Sort Every Matching Row, Not Just This Page')
+    sort_order = col3.selectbox('Order', ['Descending', 'Ascending'])
+    page_size = col4.selectbox('Rows Per Page', grid_page_sizes)
+    file = grid_search(file, search)
+    page_count = max(1, -(-len(file) // page_size))
+    page = col5.selectbox('Page', list(range(1, page_count + 1)), help='{} Matching Weapons'.format(len(file)))
+    page_rows = grid_page(file, None if sort_by == 'Default Order' else sort_by, sort_order == 'Ascending', page, page_size)[columns]
 
     # Build and display the grid table
-    gridOptions = gridOptionsBuilder.build()
-    grid_table = AgGrid(file, gridOptions=gridOptions, height=400, theme='balham')
+    gridOptions = grid_options(tuple(columns), tuple(page_rows[column].dtype.kind for column in columns))
+    with timed_block('AgGrid Render'):
+        grid_table = AgGrid(page_rows, gridOptions=gridOptions, height=400, theme='balham')
     # Return the grid table object
     return grid_table
 
-def create_hyperlinks_v1(dataframe, grid_table, col1, col2, col3, col4, col5):
-    # Create hyperlink for light.gg
+def selected_weapon_links(item_index, grid_table):
+    # Outbound links for the weapon selected in the grid, from one index lookup - None when nothing is selected
     try:
-        hyperlink_df = dataframe[['Weapon Name', 'Weapon Hash']]
-        sel_row_1 = grid_table.selected_rows
-        selected_hash_1 = sel_row_1[0]["Weapon Hash"]
-        hyperlink_df = hyperlink_df.loc[hyperlink_df['Weapon Hash'] == selected_hash_1]
-        selected_name_1 = hyperlink_df['Weapon Name'].iloc[0]
-        selected_url_1 = "https://www.light.gg/db/items/{}/{}".format(selected_hash_1, selected_name_1)
-        hyperlink_text_1 = "Light.gg - {}".format(selected_name_1)
-        link_text_1 = '[{}]({})'.format(hyperlink_text_1, selected_url_1.replace(' ', '%20'))
-        # Use st.write to display the formatted hyperlink text
-        col1.write(link_text_1, unsafe_allow_html=True)
+        selected_hash = grid_table.selected_rows[0]["Weapon Hash"]
     except Exception:
+        return None
+    return item_index.links(selected_hash)
+
+def write_dim_links(col_1, col_2):
+    col_1.write('<a href="https://app.destinyitemmanager.com/" target="_blank">Destiny Item Manager (DIM)</a>', unsafe_allow_html=True)
+    col_2.write('<a href="https://beta.destinyitemmanager.com/" target="_blank">BETA - Destiny Item Manager (DIM)</a>', unsafe_allow_html=True)
+
+def create_hyperlinks_v1(item_index, grid_table, col1, col2, col3, col4, col5):
+    links = selected_weapon_links(item_index, grid_table)
+
+    # Create hyperlinks for light.gg, D2 Foundry and Destiny Tracker
+    if links is not None:
+        col1.write(links['Light.gg'], unsafe_allow_html=True)
+        col2.write(links['D2 Foundry'], unsafe_allow_html=True)
+        col3.write(links['Destiny Tracker'], unsafe_allow_html=True)
+    else:
         col1.write('Select Weapon to see Light.gg link', unsafe_allow_html=True)
-
-    # Create hyperlink for D2 Foundry
-    try:
-        hyperlink_df = dataframe[['Weapon Name', 'Weapon Hash']]
-        sel_row_2 = grid_table.selected_rows
-        selected_hash_2 = sel_row_2[0]["Weapon Hash"]
-        hyperlink_df = hyperlink_df.loc[hyperlink_df['Weapon Hash'] == selected_hash_2]
-        selected_name_2 = hyperlink_df['Weapon Name'].iloc[0]
-        selected_url_2 = "https://d2foundry.gg/w/{}".format(selected_hash_2)
-        hyperlink_text_2 = "D2 Foundry - {}".format(selected_name_2)
-        link_text_2 = '[{}]({})'.format(hyperlink_text_2, selected_url_2.replace(' ', '%20'))
-        # Use st.write to display the formatted hyperlink text
-        col2.write(link_text_2, unsafe_allow_html=True)
-    except Exception:
         col2.write('Select Weapon to see D2 Foundry link', unsafe_allow_html=True)
-
-    # Create hyperlink for Destiny Tracker
-    try:
-        hyperlink_df = dataframe[['Weapon Name', 'Weapon Hash']]
-        sel_row_3 = grid_table.selected_rows
-        selected_hash_3 = sel_row_3[0]["Weapon Hash"]
-        hyperlink_df = hyperlink_df.loc[hyperlink_df['Weapon Hash'] == selected_hash_3]
-        selected_name_3 = hyperlink_df['Weapon Name'].iloc[0]
-        selected_url_3 = "https://destinytracker.com/destiny-2/db/items/{}".format(selected_hash_3)
-        hyperlink_text_3 = "Destiny Tracker - {}".format(selected_name_2)
-        link_text_3 = '[{}]({})'.format(hyperlink_text_3, selected_url_3.replace(' ', '%20'))
-        # Use st.write to display the formatted hyperlink text
-        col3.write(link_text_3, unsafe_allow_html=True)
-    except Exception:
         col3.write('Select Weapon to see Destiny Tracker', unsafe_allow_html=True)
 
-    # Create hyperlink for DIM
-    try:
-        selected_url_4 = "https://app.destinyitemmanager.com/"
-        link_text_4 = 'Destiny Item Manager (DIM)'
-        # Use st.write to display the formatted hyperlink text
-        col4.write(f'<a href="{selected_url_4}" target="_blank">{link_text_4}</a>', unsafe_allow_html=True)
-    except Exception:
-        pass
+    # Create hyperlinks for DIM and DIM Beta
+    write_dim_links(col4, col5)
 
-    # Create hyperlink for DIM Beta
-    try:
-        selected_url_5 = "https://beta.destinyitemmanager.com/"
-        link_text_5 = 'BETA - Destiny Item Manager (DIM)'
-        # Use st.write to display the formatted hyperlink text
-        col5.write(f'<a href="{selected_url_5}" target="_blank">{link_text_5}</a>', unsafe_allow_html=True)
-    except Exception:
-        pass
 
+def create_hyperlinks_v2(item_index, grid_table, col5):
+    links = selected_weapon_links(item_index, grid_table)
 
-def create_hyperlinks_v2(dataframe, grid_table, col5):
-    # Create hyperlink for light.gg
-    try:
-        hyperlink_df = dataframe[['Weapon Name', 'Weapon Hash']]
-        sel_row_1 = grid_table.selected_rows
-        selected_hash_1 = sel_row_1[0]["Weapon Hash"]
-        hyperlink_df = hyperlink_df.loc[hyperlink_df['Weapon Hash'] == selected_hash_1]
-        selected_name_1 = hyperlink_df['Weapon Name'].iloc[0]
-        selected_url_1 = "https://www.light.gg/db/items/{}/{}".format(selected_hash_1, selected_name_1)
-        hyperlink_text_1 = "Light.gg - {}".format(selected_name_1)
-        link_text_1 = '[{}]({})'.format(hyperlink_text_1, selected_url_1.replace(' ', '%20'))
-        # Use st.write to display the formatted hyperlink text
-        col5.write(link_text_1, unsafe_allow_html=True)
-    except Exception:
+    # Create hyperlinks for light.gg, D2 Foundry and Destiny Tracker
+    if links is not None:
+        col5.write(links['Light.gg'], unsafe_allow_html=True)
+        col5.write(links['D2 Foundry'], unsafe_allow_html=True)
+        col5.write(links['Destiny Tracker'], unsafe_allow_html=True)
+    else:
         col5.write('Select Weapon to see Light.gg link', unsafe_allow_html=True)
-
-    # Create hyperlink for D2 Foundry
-    try:
-        hyperlink_df = dataframe[['Weapon Name', 'Weapon Hash']]
-        sel_row_2 = grid_table.selected_rows
-        selected_hash_2 = sel_row_2[0]["Weapon Hash"]
-        hyperlink_df = hyperlink_df.loc[hyperlink_df['Weapon Hash'] == selected_hash_2]
-        selected_name_2 = hyperlink_df['Weapon Name'].iloc[0]
-        selected_url_2 = "https://d2foundry.gg/w/{}".format(selected_hash_2)
-        hyperlink_text_2 = "D2 Foundry - {}".format(selected_name_2)
-        link_text_2 = '[{}]({})'.format(hyperlink_text_2, selected_url_2.replace(' ', '%20'))
-        # Use st.write to display the formatted hyperlink text
-        col5.write(link_text_2, unsafe_allow_html=True)
-    except Exception:
         col5.write('Select Weapon to see D2 Foundry link', unsafe_allow_html=True)
-
-    # Create hyperlink for Destiny Tracker
-    try:
-        hyperlink_df = dataframe[['Weapon Name', 'Weapon Hash']]
-        sel_row_3 = grid_table.selected_rows
-        selected_hash_3 = sel_row_3[0]["Weapon Hash"]
-        hyperlink_df = hyperlink_df.loc[hyperlink_df['Weapon Hash'] == selected_hash_3]
-        selected_name_3 = hyperlink_df['Weapon Name'].iloc[0]
-        selected_url_3 = "https://destinytracker.com/destiny-2/db/items/{}".format(selected_hash_3)
-        hyperlink_text_3 = "Destiny Tracker - {}".format(selected_name_2)
-        link_text_3 = '[{}]({})'.format(hyperlink_text_3, selected_url_3.replace(' ', '%20'))
-        # Use st.write to display the formatted hyperlink text
-        col5.write(link_text_3, unsafe_allow_html=True)
-    except Exception:
         col5.write('Select Weapon to see Destiny Tracker', unsafe_allow_html=True)
 
-    # Create hyperlink for DIM
-    try:
-        selected_url_4 = "https://app.destinyitemmanager.com/"
-        link_text_4 = 'Destiny Item Manager (DIM)'
-        # Use st.write to display the formatted hyperlink text
-        col5.write(f'<a href="{selected_url_4}" target="_blank">{link_text_4}</a>', unsafe_allow_html=True)
-    except Exception:
-        pass
-
-    # Create hyperlink for DIM Beta
-    try:
-        selected_url_5 = "https://beta.destinyitemmanager.com/"
-        link_text_5 = 'BETA - Destiny Item Manager (DIM)'
-        # Use st.write to display the formatted hyperlink text
-        col5.write(f'<a href="{selected_url_5}" target="_blank">{link_text_5}</a>', unsafe_allow_html=True)
-    except Exception:
-        pass
\ No newline at end of file
+    # Create hyperlinks for DIM and DIM Beta
+    write_dim_links(col5, col5)
\ No newline at end of file
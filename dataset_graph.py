@@ -0,0 +1,37 @@
+import hashlib
+
+
+class DatasetGraph:
+    # Named datasets built on first request from their parameters and the datasets they depend on. Results are kept in the shared
+    # upload cache, keyed on (name, fingerprint of parameters and upstream keys, manifest version), so sessions asking the same
+    # question share one frame, and every memoized frame counts against the cache's byte budget and is evicted with it
+    def __init__(self, cache, version):
+        self.cache = cache
+        self.version = version
+        self.nodes = {}
+        self.computed = []
+        self.reused = []
+
+    def define(self, name, compute, params=(), deps=()):
+        self.nodes[name] = {'compute': compute, 'params': tuple(params), 'deps': tuple(deps)}
+
+    def key(self, name):
+        node = self.nodes[name]
+        return node['params'], tuple(self.key(dep) for dep in node['deps'])
+
+    def cache_key(self, name):
+        return name, hashlib.sha256(repr(self.key(name)).encode()).hexdigest(), self.version
+
+    def get(self, name):
+        key = self.cache_key(name)
+        value = self.cache.get(key)
+        if value is not None:
+            self.reused.append(name)
+            return value
+
+        node = self.nodes[name]
+        value = node['compute'](*[self.get(dep) for dep in node['deps']])
+        if value is not None:
+            self.cache.put(key, value)
+        self.computed.append(name)
+        return value
@@ -0,0 +1,143 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Instrumentation Switches - Off Unless D2VM_INSTRUMENT Is Set, With Optional Metric Files For Dashboards
+instrumentation_enabled = os.environ.get('D2VM_INSTRUMENT', '').lower() not in ('', '0', 'false', 'no')
+metrics_jsonl_file = os.environ.get('D2VM_METRICS_JSONL')
+metrics_prometheus_file = os.environ.get('D2VM_METRICS_PROM')
+memory_page_bytes = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def resident_bytes():
+    # Current resident set size - 0 where there's no /proc, so memory deltas read as 0 there
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * memory_page_bytes
+    except (OSError, IndexError, ValueError):
+        return 0
+
+def row_count(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value)
+    return None
+
+def first_row_count(args):
+    # Rows in is the size of the first frame handed to the call
+    for arg in args:
+        rows = row_count(arg)
+        if rows is not None:
+            return rows
+    return None
+
+def prometheus_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class CallRecorder:
+    # Timed steps of the current rerun, kept per thread so concurrent sessions don't mix, plus running totals per step across every
+    # session for the Prometheus output. Steps outside a rerun (no begin_run) only count towards the totals
+    metric_fields = [('calls', 'Calls'), ('seconds', 'Wall time in seconds'), ('rows_in', 'Rows handed in'),
+                     ('rows_out', 'Rows handed back'), ('memory_delta_bytes', 'Resident memory change in bytes')]
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.runs = 0
+
+    def begin_run(self):
+        self.local.records = []
+        self.local.depth = 0
+
+    @contextmanager
+    def step(self, name, rows_in=None):
+        depth = getattr(self.local, 'depth', 0)
+        record = {'Step': name, 'Depth': depth, 'Seconds': None, 'Rows In': rows_in, 'Rows Out': None, 'Memory Delta (MB)': None}
+        records = getattr(self.local, 'records', None)
+        if records is not None:
+            records.append(record)
+        self.local.depth = depth + 1
+        memory = resident_bytes()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['Seconds'] = time.perf_counter() - start
+            record['Memory Delta (MB)'] = (resident_bytes() - memory) / 2 ** 20
+            self.local.depth = depth
+            self.add_totals(record)
+
+    def add_totals(self, record):
+        with self.lock:
+            totals = self.totals.setdefault(record['Step'], dict.fromkeys([field for field, _ in self.metric_fields], 0))
+            totals['calls'] += 1
+            totals['seconds'] += record['Seconds']
+            totals['rows_in'] += record['Rows In'] or 0
+            totals['rows_out'] += record['Rows Out'] or 0
+            totals['memory_delta_bytes'] += int(record['Memory Delta (MB)'] * 2 ** 20)
+
+    def end_run(self):
+        # The rerun's steps in call order, also appended to the JSON-lines file and rolled into the Prometheus file when they're set
+        records = getattr(self.local, 'records', None) or []
+        self.local.records = None
+        with self.lock:
+            self.runs += 1
+            run = self.runs
+        if metrics_jsonl_file is not None and len(records) > 0:
+            stamp = time.time()
+            with self.lock, open(metrics_jsonl_file, 'a') as f:
+                for record in records:
+                    f.write(json.dumps({'time': stamp, 'run': run, 'step': record['Step'], 'depth': record['Depth'], 'seconds': record['Seconds'],
+                                        'rows_in': record['Rows In'], 'rows_out': record['Rows Out'],
+                                        'memory_delta_bytes': int((record['Memory Delta (MB)'] or 0) * 2 ** 20)}) + '\n')
+        if metrics_prometheus_file is not None:
+            # Written Beside The Target And Swapped In, So A Scraper Never Reads Half A File
+            with open(metrics_prometheus_file + '.tmp', 'w') as f:
+                f.write(self.prometheus_text())
+            os.replace(metrics_prometheus_file + '.tmp', metrics_prometheus_file)
+        return records
+
+    def prometheus_text(self):
+        with self.lock:
+            totals = {step: dict(values) for step, values in self.totals.items()}
+        lines = []
+        for field, description in self.metric_fields:
+            metric = 'd2vm_step_{}_total'.format(field)
+            lines.extend(['# HELP {} {} per instrumented step'.format(metric, description), '# TYPE {} counter'.format(metric)])
+            lines.extend(['{}{{step="{}"}} {}'.format(metric, prometheus_label(step), values[field]) for step, values in sorted(totals.items())])
+        return '\n'.join(lines) + '\n'
+
+recorder = CallRecorder()
+
+def instrumented(function):
+    # Records wall time, rows in / out and memory change for every call. Disabled, the function is handed back untouched
+    if not instrumentation_enabled:
+        return function
+    name = function.__qualname__ if function.__module__ == '__main__' else '{}.{}'.format(function.__module__, function.__qualname__)
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with recorder.step(name, first_row_count(args)) as record:
+            result = function(*args, **kwargs)
+            record['Rows Out'] = row_count(result)
+        return result
+    return wrapper
+
+def timed_block(name):
+    # The same record for a block of code, e.g. a page or a widget render
+    if not instrumentation_enabled:
+        return nullcontext()
+    return recorder.step(name)
+
+def timing_table(records):
+    # A rerun's steps for display, nested calls indented under the step that made them
+    df = pd.DataFrame(records, columns=['Step', 'Depth', 'Seconds', 'Rows In', 'Rows Out', 'Memory Delta (MB)'])
+    df['Step'] = ['\u00a0\u00a0' * depth + step for step, depth in zip(df['Step'], df['Depth'])]
+    df = df.drop(columns='Depth').astype({'Rows In': 'Int64', 'Rows Out': 'Int64'}).round({'Seconds': 4, 'Memory Delta (MB)': 1})
+    df.index += 1
+    return df
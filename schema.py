@@ -0,0 +1,56 @@
+import pandas as pd
+import hashlib
+
+# Low Cardinality Text Columns Stored As Categories
+manifest_category_columns = ['Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot', 'Weapon Element', 'Is Sunset',
+                             'Weapon Slot 1 Type', 'Weapon Slot 2 Type', 'Weapon Slot 3 Type', 'Weapon Slot 4 Type']
+dim_weapon_category_columns = ['Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot', 'Weapon Element', 'Is Sunset', 'Masterwork Type']
+dim_armour_category_columns = ['Tier', 'Type', 'Character']
+
+# Weapon Stats Are Whole Numbers With Gaps Where A Stat Doesn't Apply, So Use Nullable Integers
+weapon_stat_columns = ['Accuracy', 'Aim Assistance', 'Airborne Effectiveness', 'Ammo Capacity', 'Blast Radius', 'Charge Rate', 'Charge Time', 'Draw Time',
+                       'Guard Efficiency', 'Guard Endurance', 'Guard Resistance', 'Handling', 'Impact', 'Inventory Size', 'Magazine', 'Range',
+                       'Recoil Direction', 'Reload Speed', 'Rounds Per Minute', 'Shield Duration', 'Stability', 'Swing Speed', 'Velocity', 'Zoom']
+
+# Small Integer Columns And Their Compact Dtypes
+manifest_integer_columns = {'Weapon Season': 'int8', 'Weapon Current Version': 'int8', 'Weapon Power Cap': 'int32',
+                            **{col: 'Int16' for col in weapon_stat_columns}}
+dim_weapon_integer_columns = {'Weapon Season': 'Int8', 'Weapon Current Version': 'Int8', 'Weapon Power Cap': 'Int32', 'Masterwork Tier': 'Int8',
+                              'Crafted Level': 'Int16'}
+dim_armour_integer_columns = {'MW_Tier': 'int8', 'base_mob': 'int16', 'base_res': 'int16', 'base_rec': 'int16', 'base_dis': 'int16', 'base_int': 'int16',
+                              'base_str': 'int16', 'base_total': 'int16'}
+
+# Perk Columns Share One Categorical Per Frame
+manifest_perk_prefix = 'Slot'
+dim_weapon_perk_prefix = 'Perks'
+
+
+def perk_dtype(df, perk_columns):
+    # One sorted vocabulary over every perk column, so they all share the same categories
+    values = pd.unique(df[perk_columns].to_numpy(dtype=object).ravel())
+    return pd.CategoricalDtype(sorted(value for value in values if isinstance(value, str)))
+
+def apply_schema(df, category_columns, integer_columns, perk_prefix=None):
+    dtypes = {col: 'category' for col in category_columns if col in df.columns}
+    dtypes.update({col: dtype for col, dtype in integer_columns.items() if col in df.columns})
+    if perk_prefix is not None:
+        perk_columns = [col for col in df.columns if col.startswith(perk_prefix)]
+        if len(perk_columns) > 0:
+            shared_perk_dtype = perk_dtype(df, perk_columns)
+            dtypes.update({col: shared_perk_dtype for col in perk_columns})
+    return df.astype(dtypes)
+
+def apply_manifest_schema(df):
+    return apply_schema(df, manifest_category_columns, manifest_integer_columns, manifest_perk_prefix)
+
+def apply_dim_weapon_schema(df):
+    return apply_schema(df, dim_weapon_category_columns, dim_weapon_integer_columns, dim_weapon_perk_prefix)
+
+def apply_dim_armour_schema(df):
+    return apply_schema(df, dim_armour_category_columns, dim_armour_integer_columns)
+
+def schema_fingerprint():
+    # Changes whenever a declared dtype changes, so cached snapshots built under an older schema are rebuilt
+    declared = [manifest_category_columns, dim_weapon_category_columns, dim_armour_category_columns, manifest_integer_columns,
+                dim_weapon_integer_columns, dim_armour_integer_columns, manifest_perk_prefix, dim_weapon_perk_prefix]
+    return hashlib.sha256(repr(declared).encode()).hexdigest()
@@ -0,0 +1,200 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import threading
+from caching import cache_resource
+from schema import apply_dim_weapon_schema, apply_dim_armour_schema
+
+# Snapshot History Location - Override Per Deployment With An Environment Variable
+snapshot_store_file = os.environ.get('D2VM_SNAPSHOT_DB', 'data/snapshots.sqlite')
+
+# Item Id Column And Schema Per Kind Of Upload
+snapshot_kinds = {'weapons': ('Weapon ID', apply_dim_weapon_schema), 'armour': ('id', apply_dim_armour_schema)}
+
+# Share Of An Upload's Item Ids A History Must Already Hold For The Upload To Be Taken As The Same Vault
+owner_overlap = 0.5
+
+# Snapshots Hold No Rows Themselves - Each Distinct Version Of An Item Is Stored Once, And An Append-Only Event Log Records The
+# Versions Each Snapshot Added (+1) And Dropped (-1) Against The One Before It
+snapshot_tables = '''
+CREATE TABLE IF NOT EXISTS snapshots (snapshot_id INTEGER PRIMARY KEY, user TEXT NOT NULL, kind TEXT NOT NULL, uploaded_at REAL NOT NULL,
+                                      upload_digest TEXT, manifest_version TEXT, item_count INTEGER NOT NULL, columns TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS snapshots_user_kind ON snapshots (user, kind, snapshot_id);
+CREATE TABLE IF NOT EXISTS items (item_key INTEGER PRIMARY KEY, user TEXT NOT NULL, kind TEXT NOT NULL, item_id TEXT NOT NULL,
+                                  row_digest INTEGER NOT NULL, data TEXT NOT NULL, UNIQUE (user, kind, item_id, row_digest));
+CREATE INDEX IF NOT EXISTS items_kind_item ON items (kind, item_id);
+CREATE TABLE IF NOT EXISTS events (snapshot_id INTEGER NOT NULL, item_key INTEGER NOT NULL, change INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS events_snapshot ON events (snapshot_id, item_key);
+'''
+
+# Item Versions Held As Of A Snapshot - Every Event For The User And Kind Up To It, Netted Per Version
+held_query = '''
+SELECT items.item_key, items.item_id, items.row_digest FROM items JOIN (
+    SELECT events.item_key FROM events JOIN snapshots ON snapshots.snapshot_id = events.snapshot_id
+    WHERE snapshots.user = ? AND snapshots.kind = ? AND events.snapshot_id <= ?
+    GROUP BY events.item_key HAVING SUM(events.change) > 0) AS held ON held.item_key = items.item_key
+ORDER BY items.item_key
+'''
+
+
+def row_digests(df):
+    # One 64-bit hash per row over every column, so an item whose roll, level or stats moved gets a new version
+    return pd.util.hash_pandas_object(df, index=False).to_numpy().view(np.int64)
+
+def frame_records(df):
+    # Rows as JSON, one per item
+    return df.to_json(orient='records', lines=True, double_precision=15).splitlines()
+
+def changed_columns(old, new):
+    # Per row of two aligned frames, the columns whose values differ - compared as objects with every kind of missing as None, and a
+    # column only one side has as missing on the other
+    columns = list(dict.fromkeys(list(new.columns) + list(old.columns)))
+    old, new = old.reindex(columns=columns).to_numpy(dtype=object), new.reindex(columns=columns).to_numpy(dtype=object)
+    old[pd.isna(old)] = None
+    new[pd.isna(new)] = None
+    return [', '.join(col for col, differs in zip(columns, row) if differs) for row in old != new]
+
+class SnapshotStore:
+    # Normalized DIM weapon and armour uploads (load_dim_weapon_data / load_dim_armour_data output) kept per user over time in
+    # SQLite. Items are deduplicated by id and row digest, so re-uploading an unchanged vault adds one snapshot row and nothing else,
+    # and deltas between any two snapshots are set differences over hash-indexed item ids
+    def __init__(self, path):
+        if path != ':memory:' and os.path.dirname(path) != '':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.executescript(snapshot_tables)
+
+    def held(self, user, kind, snapshot_id):
+        return pd.DataFrame(self.connection.execute(held_query, (user, kind, snapshot_id)).fetchall(), columns=['item_key', 'item_id', 'row_digest'])
+
+    def snapshot_row(self, snapshot_id):
+        row = self.connection.execute('SELECT user, kind, columns FROM snapshots WHERE snapshot_id = ?', (snapshot_id,)).fetchone()
+        if row is None:
+            raise KeyError('No snapshot {}'.format(snapshot_id))
+        return row[0], row[1], json.loads(row[2])
+
+    def owner(self, kind, df):
+        # The history an upload belongs to, found from the upload itself - item instance ids belong to one player's items, so the
+        # history already holding most of them is this vault's, and nobody can name their way into another player's history.
+        # An upload sharing too few ids with every history starts a new one, keyed from its ids
+        id_column, _ = snapshot_kinds[kind]
+        ids = df[id_column].dropna().astype(str).unique().tolist()
+        with self.lock:
+            best = self.connection.execute('SELECT items.user, COUNT(DISTINCT items.item_id) FROM json_each(?) AS uploaded '
+                                           'JOIN items ON items.kind = ? AND items.item_id = uploaded.value GROUP BY items.user ORDER BY 2 DESC LIMIT 1',
+                                           (json.dumps(ids), kind)).fetchone()
+        if best is not None and best[1] >= owner_overlap * len(ids):
+            return best[0]
+        return 'vault-{}'.format(hashlib.sha256('\n'.join(sorted(ids)).encode()).hexdigest()[:16])
+
+    def save(self, user, kind, df, upload_digest=None, manifest_version=None, uploaded_at=None):
+        # Appends a snapshot of one upload and returns its id - only item versions not held by the user's previous snapshot are
+        # written, and versions seen before (an item back to an earlier roll) reuse their stored row
+        id_column, _ = snapshot_kinds[kind]
+        df = df.drop_duplicates(subset=[id_column]).reset_index(drop=True)
+        ids = df[id_column].astype(str).to_numpy(dtype=object)
+        digests = row_digests(df)
+        columns = [[col, str(dtype)] for col, dtype in df.dtypes.items()]
+        with self.lock, self.connection:
+            previous = self.connection.execute('SELECT MAX(snapshot_id) FROM snapshots WHERE user = ? AND kind = ?', (user, kind)).fetchone()[0]
+            held = self.held(user, kind, -1 if previous is None else previous)
+
+            # Hash-Indexed Set Difference On (Item Id, Row Digest)
+            held_index = pd.MultiIndex.from_arrays([held['item_id'].to_numpy(dtype=object), held['row_digest'].to_numpy(dtype=np.int64)])
+            upload_index = pd.MultiIndex.from_arrays([ids, digests])
+            added = np.flatnonzero(held_index.get_indexer(upload_index) == -1)
+            dropped = held['item_key'].to_numpy()[upload_index.get_indexer(held_index) == -1]
+
+            snapshot_id = self.connection.execute('INSERT INTO snapshots (user, kind, uploaded_at, upload_digest, manifest_version, item_count, columns) '
+                                                  'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                                  (user, kind, time.time() if uploaded_at is None else uploaded_at, upload_digest, manifest_version,
+                                                   len(df), json.dumps(columns))).lastrowid
+            if len(added) > 0:
+                rows = list(zip(ids[added], digests[added].tolist(), frame_records(df.loc[added])))
+                self.connection.executemany('INSERT OR IGNORE INTO items (user, kind, item_id, row_digest, data) VALUES (?, ?, ?, ?, ?)',
+                                            [(user, kind, item_id, digest, data) for item_id, digest, data in rows])
+                self.connection.executemany('INSERT INTO events (snapshot_id, item_key, change) SELECT ?, item_key, 1 FROM items '
+                                            'WHERE user = ? AND kind = ? AND item_id = ? AND row_digest = ?',
+                                            [(snapshot_id, user, kind, item_id, digest) for item_id, digest, _ in rows])
+            self.connection.executemany('INSERT INTO events (snapshot_id, item_key, change) VALUES (?, ?, -1)',
+                                        [(snapshot_id, int(item_key)) for item_key in dropped])
+        return snapshot_id
+
+    def snapshots(self, user=None, kind=None):
+        # Every snapshot, newest first, with the items it added and dropped against the one before it
+        query = ('SELECT snapshots.snapshot_id, user, kind, uploaded_at, item_count, upload_digest, manifest_version, '
+                 'COALESCE(SUM(events.change = 1), 0), COALESCE(SUM(events.change = -1), 0) '
+                 'FROM snapshots LEFT JOIN events ON events.snapshot_id = snapshots.snapshot_id '
+                 'WHERE (? IS NULL OR user = ?) AND (? IS NULL OR kind = ?) GROUP BY snapshots.snapshot_id ORDER BY snapshots.snapshot_id DESC')
+        with self.lock:
+            rows = self.connection.execute(query, (user, user, kind, kind)).fetchall()
+        df = pd.DataFrame(rows, columns=['Snapshot', 'User', 'Kind', 'Uploaded', 'Items', 'Upload Digest', 'Manifest Version', 'Versions Added', 'Versions Dropped'])
+        df['Uploaded'] = pd.to_datetime(df['Uploaded'], unit='s').dt.floor('s')
+        df['Upload Digest'] = df['Upload Digest'].str[:12]
+        df['Manifest Version'] = df['Manifest Version'].str[:12]
+        return df
+
+    def items(self, kind, columns, item_keys):
+        # Stored item versions back to a frame indexed by item key, with the dtypes they were saved with - categories are left to
+        # the schema, so perk columns share one categorical again
+        _, schema = snapshot_kinds[kind]
+        rows = self.connection.execute('SELECT items.item_key, data FROM items JOIN json_each(?) AS wanted ON items.item_key = wanted.value '
+                                       'ORDER BY items.item_key', (json.dumps([int(item_key) for item_key in item_keys]),)).fetchall()
+        df = pd.DataFrame.from_records([json.loads(data) for _, data in rows], columns=[col for col, _ in columns])
+        df.index = pd.Index([item_key for item_key, _ in rows], dtype=np.int64)
+        return schema(df.astype({col: dtype for col, dtype in columns if dtype not in ('category', 'object')}))
+
+    def load(self, snapshot_id):
+        # The vault as it was at a snapshot
+        with self.lock:
+            user, kind, columns = self.snapshot_row(snapshot_id)
+            return self.items(kind, columns, self.held(user, kind, snapshot_id)['item_key']).reset_index(drop=True)
+
+    def delta_keys(self, old_snapshot_id, new_snapshot_id):
+        # Item keys added, removed and changed (from, to) between two snapshots of the same user and kind - ids are diffed through a
+        # hash index and digests tell changed items from unchanged ones, so nothing is decoded
+        with self.lock:
+            user, kind, _ = self.snapshot_row(old_snapshot_id)
+            new_user, new_kind, _ = self.snapshot_row(new_snapshot_id)
+            if (user, kind) != (new_user, new_kind):
+                raise ValueError('Snapshots {} and {} are not of the same user and kind'.format(old_snapshot_id, new_snapshot_id))
+            old, new = self.held(user, kind, old_snapshot_id), self.held(user, kind, new_snapshot_id)
+
+        in_old = pd.Index(old['item_id']).get_indexer(new['item_id'])
+        in_new = pd.Index(new['item_id']).get_indexer(old['item_id'])
+        both = np.flatnonzero(in_old >= 0)
+        changed = both[new['row_digest'].to_numpy()[both] != old['row_digest'].to_numpy()[in_old[both]]]
+        return {'Added': new['item_key'].to_numpy()[in_old == -1], 'Removed': old['item_key'].to_numpy()[in_new == -1],
+                'Changed From': old['item_key'].to_numpy()[in_old[changed]], 'Changed To': new['item_key'].to_numpy()[changed]}
+
+    def delta(self, old_snapshot_id, new_snapshot_id):
+        # Items added, removed and changed between two snapshots - only the items that differ are decoded, each side in one pass.
+        # Snapshots and item versions are never rewritten, so the keys stay good between the two steps
+        keys = self.delta_keys(old_snapshot_id, new_snapshot_id)
+        with self.lock:
+            _, kind, old_columns = self.snapshot_row(old_snapshot_id)
+            _, _, new_columns = self.snapshot_row(new_snapshot_id)
+            old_items = self.items(kind, old_columns, np.concatenate([keys['Removed'], keys['Changed From']]))
+            new_items = self.items(kind, new_columns, np.concatenate([keys['Added'], keys['Changed To']]))
+
+        # Changed Items Show The Newer Version, Lined Up With The Older By Position
+        changed_items = new_items.loc[keys['Changed To']].reset_index(drop=True)
+        changed_items.insert(0, 'Changed Columns', changed_columns(old_items.loc[keys['Changed From']], new_items.loc[keys['Changed To']]))
+        return {'Added': new_items.loc[keys['Added']].reset_index(drop=True), 'Removed': old_items.loc[keys['Removed']].reset_index(drop=True),
+                'Changed': changed_items}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+@cache_resource
+def load_snapshot_store():
+    return SnapshotStore(snapshot_store_file)
@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from st_aggrid import AgGrid, GridOptionsBuilder
 from typing import Any
 
@@ -11,88 +12,32 @@ class SessionState:
     def __init__(self, **kwargs: Any):
         self.__dict__.update(kwargs)
 
+# Time This Rerun's Steps When D2VM_INSTRUMENT Is Set
+from instrumentation import instrumentation_enabled, instrumented, timed_block, recorder, timing_table
+recorder.begin_run()
+
 # Import Manifest
-from csv_processing import load_manifest_data
+from csv_processing import load_manifest_data, load_manifest_version, load_perk_index, load_facet_index, load_item_index, load_archetype_stat_index
 weapon_manifest_file = load_manifest_data('data/Master Weapon Manifest.csv')
+weapon_manifest_version = load_manifest_version('data/Master Weapon Manifest.csv')
+weapon_perk_index = load_perk_index(weapon_manifest_file)
+weapon_facet_index = load_facet_index(weapon_manifest_file)
+weapon_item_index = load_item_index(weapon_manifest_file)
+weapon_stat_index = load_archetype_stat_index(weapon_manifest_file)
 
 # Define Navigation Bar
 def navigation():
     st.sidebar.title('Navigation')
-    selection = st.sidebar.selectbox("Go to", ['Home', 'Vault Summary', 'Weapon Analysis', 'Weapon Comparison', 'Weapon Perks', 'Build Tool'])
+    selection = st.sidebar.selectbox("Go to", ['Home', 'Vault Summary', 'Weapon Analysis', 'Weapon Comparison', 'Weapon Perks', 'Build Tool', 'Vault History', 'Admin'])
     return selection
 
-def weapon_type_filter(df, selected_tier):
-    if len(selected_tier) > 0:
-        df = sorted(df[df['Weapon Tier'].isin(selected_tier)]['Weapon Type'].unique())
-    else:
-        df = sorted(df['Weapon Type'].unique())
-    return df
-
-def weapon_archetype_filter(df, selected_tier, selected_type):
-    if len(selected_tier) > 0 and selected_type != 'Select all':
-        df = sorted(df[(df['Weapon Tier'].isin(selected_tier)) & (df['Weapon Type'] == selected_type)]['Weapon Archetype'].unique())
-    elif len(selected_tier) > 0:
-        df = sorted(
-            df[df['Weapon Tier'].isin(selected_tier)]['Weapon Archetype'].unique())
-    elif selected_type != 'Select all':
-        df = sorted(
-            df[df['Weapon Type'] == selected_type]['Weapon Archetype'].unique())
-    else:
-        df = sorted(df['Weapon Archetype'].unique())
-    return df
-
-def weapon_slot_filter(df, selected_tier, selected_type, selected_archetype):
-    if len(selected_tier) > 0 and selected_type != 'Select all' and selected_archetype != 'Select all':
-        df = sorted(df[(df['Weapon Tier'].isin(selected_tier)) & (df['Weapon Type'] == selected_type) & (df['Weapon Archetype'] == selected_archetype)]['Weapon Slot'].unique())
-    elif len(selected_tier) > 0 and selected_type != 'Select all':
-        df = sorted(df[(df['Weapon Tier'].isin(selected_tier)) & (df['Weapon Type'] == selected_type)]['Weapon Slot'].unique())
-    elif len(selected_tier) > 0 and selected_archetype != 'Select all':
-        df = sorted(df[(df['Weapon Tier'].isin(selected_tier)) & (df['Weapon Archetype'] == selected_archetype)]['Weapon Slot'].unique())
-    elif selected_type != 'Select all' and selected_archetype != 'Select all':
-        df = sorted(df[(df['Weapon Type'] == selected_type) & (df['Weapon Archetype'] == selected_archetype)]['Weapon Slot'].unique())
-    elif selected_type != 'Select all':
-        df = sorted(df[df['Weapon Type'] == selected_type]['Weapon Slot'].unique())
-    elif selected_archetype != 'Select all':
-        df = sorted(
-            df[df['Weapon Archetype'] == selected_archetype]['Weapon Slot'].unique())
-    elif len(selected_tier) > 0:
-        df = sorted(
-            df[df['Weapon Tier'].isin(selected_tier)]['Weapon Slot'].unique())
-    else:
-        df = sorted(df['Weapon Slot'].unique())
-    return df
-
-def weapon_element_filter(df, selected_tier, selected_type, selected_archetype, selected_slot):
-    if len(selected_tier) > 0:
-        df = df[df['Weapon Tier'].isin(selected_tier)]
-    else:
-        df = df.copy()
-    if selected_type != 'Select all':
-        df = df.loc[df['Weapon Type'] == selected_type]
-    if selected_archetype != 'Select all':
-        df = df.loc[df['Weapon Archetype'] == selected_archetype]
-    if selected_slot != 'Select all':
-        df = df.loc[df['Weapon Slot'] == selected_slot]
-    df = sorted(df['Weapon Element'].unique())
-    return df
-
 # Define Filters
-def apply_all_filters(df, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
-    # Apply filters here
-    if len(selected_tier) > 0:
-        df = df.loc[df['Weapon Tier'].isin(selected_tier)]
-    if selected_type != 'Select all':
-        df = df.loc[df['Weapon Type'] == selected_type]
-    if selected_archetype != 'Select all':
-        df = df.loc[df['Weapon Archetype'] == selected_archetype]
-    if selected_slot != 'Select all':
-        df = df.loc[df['Weapon Slot'] == selected_slot]
-    if selected_element != 'Select all':
-        df = df.loc[df['Weapon Element'] == selected_element]
-    if selected_sunset == 'Yes':
-        df = df.loc[df['Is Sunset'] == 'No']
-    return df
+@instrumented
+def apply_manifest_filters(selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
+    # Manifest rows come straight from the facet index
+    return weapon_manifest_file.iloc[weapon_facet_index.rows(tuple(selected_tier), selected_type, selected_archetype, selected_slot, selected_element, selected_sunset)]
 
+@instrumented
 def apply_reduced_filters(df, selected_tier, selected_sunset):
     # Apply filters here
     if len(selected_tier) > 0:
@@ -109,50 +54,50 @@ def sidebar():
     unique_tier = ['Exotic', 'Legendary', 'Rare', 'Common', 'Basic']  # Free Choice
     selected_tier = st.sidebar.multiselect('Select Tiers', unique_tier, default=unique_tier[1], help='Select the Tiers to Look At. Can Select Multiple. Select None For All')
 
-    unique_type = weapon_type_filter(weapon_manifest_file, selected_tier)
-    unique_type.insert(0, 'Select all')
+    unique_type = ['Select all'] + list(weapon_facet_index.options('Weapon Type', tuple(selected_tier)))
     selected_type = st.sidebar.selectbox('Select a Type', unique_type, help="Select the Weapon Type. Can Only Select One As The Stats Categories by Weapon Type. 'Select All' To See Full Weapon List")
 
-    unique_archetype = weapon_archetype_filter(weapon_manifest_file, selected_tier, selected_type)
-    unique_archetype.insert(0, 'Select all')
+    unique_archetype = ['Select all'] + list(weapon_facet_index.options('Weapon Archetype', tuple(selected_tier), selected_type))
     selected_archetype = st.sidebar.selectbox('Select an Archetype', unique_archetype, help='Select Weapon Archetype')
 
-    unique_slot = weapon_slot_filter(weapon_manifest_file, selected_tier, selected_type, selected_archetype)
-    unique_slot.insert(0, 'Select all')
+    unique_slot = ['Select all'] + list(weapon_facet_index.options('Weapon Slot', tuple(selected_tier), selected_type, selected_archetype))
     selected_slot = st.sidebar.selectbox('Select a Weapon Slot', unique_slot, help="Select the Weapon Slot")
 
-    unique_element = weapon_element_filter(weapon_manifest_file, selected_tier, selected_type, selected_archetype, selected_slot)
-    unique_element.insert(0, 'Select all')
+    unique_element = ['Select all'] + list(weapon_facet_index.options('Weapon Element', tuple(selected_tier), selected_type, selected_archetype, selected_slot))
     selected_element = st.sidebar.selectbox('Select an Element', unique_element, help='Select the Elements to Look At. Can Select Multiple. Select None For All')
 
     exclude_sunset = ['Yes', 'No']
     selected_sunset = st.sidebar.selectbox('Exclude Sunset Weapons', exclude_sunset, index=0, help='Include or Exclude Sunset Weapons')
 
+    # Show Filter Cache Usage
+    with st.sidebar.expander('Filter Cache', expanded=False):
+        facet_cache_stats = weapon_facet_index.cache_stats()
+        st.write('Hits: {hits:,} | Misses: {misses:,} | Entries: {entries:,}'.format(**facet_cache_stats))
+
     return selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset
 
 def main():
     # Setup DIM Uploads
     try:
         from csv_processing import load_dim_weapon_data, load_dim_armour_data
-        from data_preperation import weapon_type_count, weapon_type_element_count, weapon_type_output_without_dim, weapon_type_output_with_dim, owned_counted_list, not_owned_list, owned_weapons_perk_list
-        from data_preperation import load_weapon_type_data, create_grid_table, create_hyperlinks_v1, create_hyperlinks_v2
+        from data_preperation import weapon_type_output_without_dim, weapon_type_output_with_dim, owned_counted_list, not_owned_list, owned_weapons_perk_list, dismantle_candidates
+        from data_preperation import vault_pivot_axes, format_vault_summary
+        from data_preperation import load_weapon_type_data, weapon_type_stat_columns, stat_view_modes, apply_stat_view, create_grid_table, create_hyperlinks_v1, create_hyperlinks_v2, ownership_summary, attach_ownership
+        from upload_cache import load_upload_cache, upload_digest
+        from dataset_graph import DatasetGraph
     except ImportError:
         pass
 
-    # Setup Session States
-    session_state = SessionState(dim_weapon_data=None, dim_armour_data=None, owned_weapons_perk_list=None)
+    # Processed Uploads Are Shared Across Sessions By File Content
+    upload_cache = load_upload_cache()
 
-    # Setup DIM Uploads & Process Data
+    # Setup DIM Uploads - Files Are Only Fingerprinted Here, And Parsed When A Page First Needs Them
     with st.expander('DIM File Uploader', expanded=False):
         col1, col2 = st.columns([1, 1])
         uploaded_weapon_file = col1.file_uploader("DIM Weapon Uploader", type="csv")
-        if uploaded_weapon_file is not None:
-            session_state.dim_weapon_data = load_dim_weapon_data(uploaded_weapon_file, weapon_manifest_file)
-            weapon_type_count = weapon_type_count(session_state.dim_weapon_data)
-            weapon_type_element_count = weapon_type_element_count(session_state.dim_weapon_data)
+        weapon_upload_digest = upload_digest(uploaded_weapon_file) if uploaded_weapon_file is not None else None
         uploaded_armour_file = col2.file_uploader("DIM armour Uploader", type="csv")
-        if uploaded_armour_file is not None:
-            session_state.dim_armour_data = load_dim_armour_data(uploaded_armour_file)
+        armour_upload_digest = upload_digest(uploaded_armour_file) if uploaded_armour_file is not None else None
 
     # Determine the selected page based on navigation
     selection = navigation()
@@ -161,16 +106,28 @@ def main():
     st.sidebar.title('Filters')
 
     # Setup Sidebar Filters
-    selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset = sidebar()
-
-    # Apply Filters
-    weapon_manifest_file_filtered_all = apply_all_filters(weapon_manifest_file, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset)
-    weapon_manifest_file_filtered_reduced = apply_reduced_filters(weapon_manifest_file, selected_tier, selected_sunset)
-    if uploaded_weapon_file is not None:
-        dim_weapon_data_filtered_all = apply_all_filters(session_state.dim_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset)
-        dim_weapon_data_filtered_reduced = apply_reduced_filters(session_state.dim_weapon_data, selected_tier, selected_sunset)
-    else:
-        pass
+    with timed_block('Sidebar Filters'):
+        selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset = sidebar()
+
+    # Define Datasets - Each Is Computed When A Page First Asks For It, And Reused From The Upload Cache Until Its Filters Or Upload Change
+    datasets = DatasetGraph(upload_cache, weapon_manifest_version)
+    all_filters = (tuple(selected_tier), selected_type, selected_archetype, selected_slot, selected_element, selected_sunset)
+    reduced_filters = (tuple(selected_tier), selected_sunset)
+
+    datasets.define('weapon_manifest_file_filtered_all', lambda: apply_manifest_filters(*all_filters), params=all_filters)
+    datasets.define('weapon_manifest_file_filtered_reduced', lambda: apply_manifest_filters(selected_tier, 'Select all', 'Select all', 'Select all', 'Select all', selected_sunset),
+                    params=reduced_filters)
+    datasets.define('dim_weapon_data', lambda: None if uploaded_weapon_file is None else load_dim_weapon_data(uploaded_weapon_file, weapon_manifest_file),
+                    params=(weapon_upload_digest,))
+    datasets.define('dim_armour_data', lambda: None if uploaded_armour_file is None else load_dim_armour_data(uploaded_armour_file), params=(armour_upload_digest,))
+    datasets.define('dim_weapon_data_filtered_reduced', lambda dim_weapon_data: apply_reduced_filters(dim_weapon_data, selected_tier, selected_sunset), params=reduced_filters,
+                    deps=['dim_weapon_data'])
+    datasets.define('ownership_summary', ownership_summary, deps=['dim_weapon_data'])
+    datasets.define('owned_weapons_perk_list', lambda dim_weapon_data: owned_weapons_perk_list(weapon_manifest_file, dim_weapon_data), deps=['dim_weapon_data'])
+    datasets.define('dismantle_candidates', dismantle_candidates, deps=['dim_weapon_data', 'owned_weapons_perk_list'])
+
+    # Setup Session States
+    session_state = SessionState(datasets=datasets)
 
     # Define the page functions
     def home_page(session_state, weapon_manifest_file, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
@@ -220,24 +177,32 @@ def main():
     def vault_summary(session_state, manifest_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
         st.title('Vault Summary')
 
+        # Datasets Used On This Page
+        weapon_manifest_file_filtered_all = datasets.get('weapon_manifest_file_filtered_all')
+        weapon_manifest_file_filtered_reduced = datasets.get('weapon_manifest_file_filtered_reduced')
+        dim_weapon_data = datasets.get('dim_weapon_data')
+        dim_armour_data = datasets.get('dim_armour_data')
+        if uploaded_weapon_file is not None:
+            dim_weapon_data_filtered_reduced = datasets.get('dim_weapon_data_filtered_reduced')
+
         # Setup Overall Metrics
         col1, col2, col3, col4 = st.columns([4, 4, 4, 6])
 
         # Populate Col 1 Metric
         if uploaded_weapon_file is not None:
-            col1.metric(label='Total Weapons Owned', value=len(session_state.dim_weapon_data), help='Count Of All Weapons Owned')
+            col1.metric(label='Total Weapons Owned', value=len(dim_weapon_data), help='Count Of All Weapons Owned')
         else:
             col1.metric(label='Total Weapons Owned', value='Load DIM Data', help='Count Of All Weapons Owned')
 
         # Populate Col 2 Metric
         if uploaded_armour_file is not None:
-            col2.metric(label='Total armour Pieces Owned', value=len(session_state.dim_armour_data), help='Count Of All armour Owned')
+            col2.metric(label='Total armour Pieces Owned', value=len(dim_armour_data), help='Count Of All armour Owned')
         else:
             col2.metric(label='Total armour Pieces Owned', value='Load DIM Data', help='Count Of All armour Owned')
 
         # Populate Col 3 Metric
         if uploaded_weapon_file and uploaded_armour_file is not None:
-            col3.metric(label='Total Items Owned', value=len(session_state.dim_weapon_data) + len(session_state.dim_armour_data), help='Total Item Count')
+            col3.metric(label='Total Items Owned', value=len(dim_weapon_data) + len(dim_armour_data), help='Total Item Count')
         else:
             col3.metric(label='Total Items Owned', value='Load DIM Data', help='Total Item Count')
 
@@ -246,19 +211,26 @@ def main():
             # Set up columns for multiselect
             col1, col2, col3 = st.columns([12, 4, 4])
 
+            # Choose The Summary Rows And Columns
+            col1_1, col1_2 = col1.columns([1, 1])
+            pivot_rows = col1_1.selectbox('Summary Rows', vault_pivot_axes, index=0, help='Group The Summary Rows By')
+            pivot_column_axes = [axis for axis in vault_pivot_axes if axis != pivot_rows]
+            pivot_columns = col1_2.selectbox('Summary Columns', pivot_column_axes, index=pivot_column_axes.index('Weapon Element') if 'Weapon Element' in pivot_column_axes else 0,
+                                             help='Split The Summary Columns By')
+
             # Setup Weapon Details
             if uploaded_weapon_file is not None:
-                vault_summary_table_1 = weapon_type_output_with_dim(weapon_manifest_file_filtered_reduced, dim_weapon_data_filtered_reduced)
+                vault_summary_table_1 = weapon_type_output_with_dim(weapon_manifest_file_filtered_reduced, dim_weapon_data_filtered_reduced, pivot_rows, pivot_columns)
                 col1.write('Weapons Available (with owned count)')
-                col1.dataframe(vault_summary_table_1, use_container_width=True)
+                col1.dataframe(format_vault_summary(vault_summary_table_1), use_container_width=True)
             else:
-                vault_summary_table_1 = weapon_type_output_without_dim(weapon_manifest_file_filtered_reduced)
+                vault_summary_table_1 = weapon_type_output_without_dim(weapon_manifest_file_filtered_reduced, pivot_rows, pivot_columns)
                 col1.write('Available Weapons (upload DIM file to show owned)')
                 col1.dataframe(vault_summary_table_1, use_container_width=True)
 
             # Setup Weapon Owned
             if uploaded_weapon_file is not None:
-                vault_summary_table_2 = owned_counted_list(dim_weapon_data_filtered_all)
+                vault_summary_table_2 = owned_counted_list(datasets.get('ownership_summary'), weapon_manifest_file_filtered_all['Weapon Hash'])
                 vault_summary_table_2 = vault_summary_table_2.reset_index(drop=True)  # Reset the index
                 col2.write('Weapons Owned (with count)')
                 col2.dataframe(vault_summary_table_2, use_container_width=True)
@@ -267,7 +239,7 @@ def main():
 
             # Setup Missing Weapon Details
             if uploaded_weapon_file is not None:
-                vault_summary_table_3 = not_owned_list(weapon_manifest_file_filtered_all, dim_weapon_data_filtered_all)
+                vault_summary_table_3 = not_owned_list(weapon_manifest_file_filtered_all, datasets.get('ownership_summary'))
                 vault_summary_table_3 = pd.DataFrame(vault_summary_table_3, columns=['Weapon Name'])
                 col3.write('Weapons Not Owned')
                 col3.dataframe(vault_summary_table_3, use_container_width=True)
@@ -281,16 +253,31 @@ def main():
             from data_preperation import crafted_weapon_list
 
             # Create Crafted Weapon List
-            crafted_weapon_list = crafted_weapon_list(session_state.dim_weapon_data)
+            crafted_weapon_list = crafted_weapon_list(dim_weapon_data)
             crafted_weapon_list = apply_reduced_filters(crafted_weapon_list, selected_tier, selected_sunset)
             crafted_weapon_list = crafted_weapon_list.reset_index(drop=True)
             crafted_weapon_list.index += 1
             crafted_weapon_list.drop(columns=['index'], inplace=True, errors='ignore')
             st.write(crafted_weapon_list)
 
+        with st.expander('Dismantle Candidates', expanded=False):
+            # Copies Another Copy Of The Same Weapon Beats On Every Slot's Perks And Crafted Level
+            if uploaded_weapon_file is not None:
+                dismantle_list = datasets.get('dismantle_candidates')
+                dismantle_list = dismantle_list.loc[dismantle_list['Weapon Hash'].isin(weapon_manifest_file_filtered_all['Weapon Hash'])]
+                st.write('Copies where another copy has every perk in every slot, and at least the same crafted level. Keep the listed copy')
+                st.dataframe(dismantle_list.drop(columns=['Weapon Hash']), use_container_width=True)
+            else:
+                st.write('Upload DIM Weapon Data')
+
     def weapon_analysis(session_state, manifest_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
         st.title('Weapon Analysis')
 
+        # Datasets Used On This Page
+        weapon_manifest_file_filtered_all = datasets.get('weapon_manifest_file_filtered_all')
+        if uploaded_weapon_file is not None:
+            weapon_ownership = datasets.get('ownership_summary')
+
         # Set up Weapon Manifest counts
         unique_filtered_manifest_weapons_count = weapon_manifest_file_filtered_all[['Weapon Name', 'Weapon Power Cap']]
         unique_filtered_manifest_weapons_count = unique_filtered_manifest_weapons_count.drop_duplicates()
@@ -298,11 +285,10 @@ def main():
 
         # Set up DIM counts
         if uploaded_weapon_file is not None:
-            dim_total_weapons_owned = len(dim_weapon_data_filtered_all)
-            dim_total_unique_weapons_owned = dim_weapon_data_filtered_all[['Weapon Name', 'Weapon Power Cap']]
-            dim_total_unique_weapons_owned = len(dim_total_unique_weapons_owned.drop_duplicates())
-            dim_weapon_unique_count = dim_weapon_data_filtered_all[['Weapon Name', 'Weapon Power Cap']]
-            dim_weapon_unique_count = len(dim_weapon_unique_count.drop_duplicates())
+            filtered_ownership = weapon_ownership.loc[weapon_ownership.index.isin(weapon_manifest_file_filtered_all['Weapon Hash'])]
+            dim_total_weapons_owned = int(filtered_ownership['Owned'].sum())
+            dim_total_unique_weapons_owned = filtered_ownership.groupby(['Weapon Name', 'Weapon Power Cap']).ngroups
+            dim_weapon_unique_count = dim_total_unique_weapons_owned
         else:
             pass
 
@@ -341,31 +327,33 @@ def main():
             col1, col2, col3, col4, col5 = st.columns(5)
 
             # Create table, based on selected weapon type
-            if selected_type != 'Select all':
-                weapon_analysis_table_1 = load_weapon_type_data(weapon_manifest_file_filtered_all, selected_type)
-            else:
-                weapon_analysis_table_1 = weapon_manifest_file_filtered_all[['Weapon Name With Season', 'Weapon Name', 'Weapon Season', 'Weapon Hash', 'Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot', 'Weapon Element', 'Weapon Current Version', 'Weapon Power Cap', 'Is Sunset']]
+            weapon_analysis_table_1 = load_weapon_type_data(weapon_manifest_file_filtered_all, selected_type)
 
             if uploaded_weapon_file is not None:
-                weapon_count = dim_weapon_data_filtered_all.groupby('Weapon Hash').size().reset_index(name='count')
-                weapon_analysis_table_1 = weapon_analysis_table_1.merge(weapon_count, on='Weapon Hash', how='left')
-                weapon_analysis_table_1.insert(1, 'Count', weapon_analysis_table_1.pop('count'))
+                weapon_analysis_table_1 = attach_ownership(weapon_analysis_table_1, weapon_ownership)
 
             try:
                 weapon_analysis_table_1 = weapon_analysis_table_1.sort_values(by=['Count', 'Weapon Name With Season'], ascending=[False, True])
             except Exception:
                 weapon_analysis_table_1 = weapon_analysis_table_1.sort_values(by=['Weapon Name With Season'], ascending=[True])
 
+            # Show Stats Against The Rest Of Their Archetype
+            if selected_type != 'Select all':
+                stat_view = col1.selectbox('Show Stats As', stat_view_modes, help='Stat values, or how each stat ranks within the weapon\'s type and archetype')
+                weapon_analysis_table_1 = apply_stat_view(weapon_analysis_table_1, weapon_stat_index, weapon_item_index, stat_view)
 
             # Create table
             grid_table = create_grid_table(weapon_analysis_table_1, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset)
 
             # Create hyperlinks
-            create_hyperlinks_v1(weapon_analysis_table_1, grid_table, col1, col2, col3, col4, col5)
+            create_hyperlinks_v1(weapon_item_index, grid_table, col1, col2, col3, col4, col5)
 
     def weapon_comparison(session_state, manifest_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
         st.title('Weapon Comparison')
 
+        # Datasets Used On This Page
+        weapon_manifest_file_filtered_all = datasets.get('weapon_manifest_file_filtered_all')
+
         # Set up columns for multiselect
         col1, col2, col3, col4, col5 = st.columns([2, 2, 4, 2, 2])
 
@@ -390,123 +378,154 @@ def main():
         weapon_comparison_list = col3.multiselect('Select Weapon To Compare', weapon_list)
 
         # Set Up Comparison Type
-        comparison_type = col4.selectbox('Choose The Type Of Comparison', ['Absolute', 'Relative'], index=1)
+        comparison_type = col4.selectbox('Choose The Type Of Comparison', ['Absolute', 'Relative'] + stat_view_modes[1:], index=1,
+                                          help='Relative subtracts the selected weapon\'s stats, and each weapon picked to compare is shown as a reference too - the archetype options show each stat against its type and archetype')
 
         # Lookup The Weapon Type and Achetype of the Selection Comparison Weapon
-        comparison_weapon_type = weapon_manifest_file_filtered_all.loc[weapon_manifest_file_filtered_all['Weapon Name With Season'] == weapon_selected_name, 'Weapon Type'].iloc[0]
-        comparison_weapon_archetype = weapon_manifest_file_filtered_all.loc[weapon_manifest_file_filtered_all['Weapon Name With Season'] == weapon_selected_name, 'Weapon Archetype'].iloc[0]
+        selected_hash = weapon_item_index.hash_for(weapon_selected_name)
+        comparison_weapon_type = weapon_item_index.value(selected_hash, 'Weapon Type')
+        comparison_weapon_archetype = weapon_item_index.value(selected_hash, 'Weapon Archetype')
 
-        # Apply Weapon Type and Weapon Archetype Filter if a Weapon is Selected for Comparison
-        selected_weapon_filtered = weapon_manifest_file_filtered_all.loc[weapon_manifest_file_filtered_all['Weapon Type'] == comparison_weapon_type]
-        selected_weapon_filtered = selected_weapon_filtered.loc[selected_weapon_filtered['Weapon Archetype'] == comparison_weapon_archetype]
+        # Apply Weapon Type and Weapon Archetype Filter if a Weapon is Selected for Comparison - The Selected Weapon Passed Every Filter, So Its Type Matches Any Type Filter
+        selected_weapon_rows = weapon_facet_index.rows(tuple(selected_tier), comparison_weapon_type, comparison_weapon_archetype, selected_slot, selected_element, selected_sunset)
+        selected_positions = [weapon_item_index.position(item_hash) for item_hash in weapon_item_index.hashes_for_name_with_season(weapon_selected_name)]
 
         # Create Selected Weapon Data for Table (So that it appears first)
-        selected_weapon = weapon_manifest_file_filtered_all.loc[weapon_manifest_file_filtered_all['Weapon Name With Season'] == weapon_selected_name]
+        selected_weapon = weapon_manifest_file.iloc[selected_weapon_rows[np.isin(selected_weapon_rows, selected_positions)]]
 
         # Add Other Weapons With That Are The Same Type And Archetype
-        comparison_weapons = selected_weapon_filtered.loc[selected_weapon_filtered['Weapon Name With Season'] != weapon_selected_name]
+        comparison_weapons = weapon_manifest_file.iloc[selected_weapon_rows[~np.isin(selected_weapon_rows, selected_positions)]]
 
         # Created Combined Table
         weapon_comparison_table_1 = pd.concat([selected_weapon, comparison_weapons], ignore_index=True)
 
         # Create table, based on selected weapon type
-        if comparison_weapon_type != 'Select all':
-            weapon_comparison_table_1 = load_weapon_type_data(weapon_comparison_table_1, comparison_weapon_type)
-        else:
-            weapon_comparison_table_1 = weapon_comparison_table_1[['Weapon Name With Season', 'Weapon Name', 'Weapon Season', 'Weapon Hash', 'Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot', 'Weapon Element', 'Weapon Current Version', 'Weapon Power Cap', 'Is Sunset']]
-
-        if comparison_type == 'Relative':
-            if comparison_weapon_type == 'Grenade Launcher' or selected_type == 'Rocket Launcher':
-                first_index = weapon_comparison_table_1.columns.get_loc("Blast Radius")
-            else:
-                first_index = weapon_comparison_table_1.columns.get_loc("Impact")
-            for col in weapon_comparison_table_1.iloc[:, first_index:].columns:
-                # subtract the first row value from the subsequent rows and store in new column
-                weapon_comparison_table_1.loc[1:, col] = weapon_comparison_table_1.loc[1:, col] - weapon_comparison_table_1.loc[0, col]
-        else:
-            pass
+        weapon_comparison_table_1 = load_weapon_type_data(weapon_comparison_table_1, comparison_weapon_type)
+
+        comparison_deltas = None
+        if comparison_type == 'Relative' and len(weapon_comparison_table_1) > 0:
+            # Every Row Against Every Reference At Once - The Selected Weapon (The First Row), Then Each Weapon Picked To Compare
+            stat_columns = [col for col in weapon_type_stat_columns(comparison_weapon_type) if col in weapon_stat_index.column_positions]
+            row_positions = weapon_item_index.positions_for(weapon_comparison_table_1['Weapon Hash'])
+            picked_hashes = [item_hash for name in weapon_comparison_list for item_hash in weapon_item_index.hashes_for_name_with_season(name)]
+            reference_positions = np.concatenate([row_positions[:1], weapon_item_index.positions_for(picked_hashes)])
+            deltas = weapon_stat_index.deltas(row_positions, reference_positions, stat_columns)
+
+            # The Table Shows Each Row Against The Selected Weapon, Which Keeps Its Own Stats
+            weapon_comparison_table_1.loc[1:, stat_columns] = deltas[1:, 0, :]
+
+            # Long Form For Every Reference - One Row Per (Weapon, Reference) Pair
+            if len(reference_positions) > 1:
+                comparison_deltas = pd.DataFrame(deltas.reshape(-1, len(stat_columns)), columns=stat_columns)
+                comparison_deltas.insert(0, 'Against', np.tile(weapon_manifest_file['Weapon Name With Season'].to_numpy()[reference_positions], len(row_positions)))
+                comparison_deltas.insert(0, 'Weapon Name With Season', np.repeat(weapon_comparison_table_1['Weapon Name With Season'].to_numpy(), len(reference_positions)))
+        elif comparison_type != 'Absolute':
+            weapon_comparison_table_1 = apply_stat_view(weapon_comparison_table_1, weapon_stat_index, weapon_item_index, comparison_type)
 
         with st.expander('Weapon Comparison', expanded=True):
             if uploaded_weapon_file is not None:
-                weapon_count = session_state.dim_weapon_data.groupby('Weapon Hash').size().reset_index(name='count')
-                weapon_comparison_table_1 = weapon_comparison_table_1.merge(weapon_count, on='Weapon Hash', how='left')
-                weapon_comparison_table_1.insert(1, 'Count', weapon_comparison_table_1.pop('count'))
+                weapon_comparison_table_1 = attach_ownership(weapon_comparison_table_1, datasets.get('ownership_summary'))
 
             # Create table
             grid_table = create_grid_table(weapon_comparison_table_1, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset)
 
+        # Show Every Weapon Against The Selected Weapon And Each Weapon Picked To Compare
+        if comparison_deltas is not None:
+            with st.expander('Relative To Each Reference', expanded=True):
+                st.dataframe(comparison_deltas, use_container_width=True, hide_index=True)
+
+        # Show The Spread Of Each Stat Across The Selected Weapon's Archetype
+        if len(weapon_type_stat_columns(comparison_weapon_type)) > 0:
+            with st.expander('Archetype Stat Range', expanded=False):
+                st.dataframe(weapon_stat_index.group_summary(comparison_weapon_type, comparison_weapon_archetype, weapon_type_stat_columns(comparison_weapon_type)),
+                             use_container_width=True)
+
         # Create hyperlinks
-        create_hyperlinks_v2(weapon_comparison_table_1, grid_table, col5)
+        create_hyperlinks_v2(weapon_item_index, grid_table, col5)
 
     def weapon_perks(session_state, manifest_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
         st.title('Weapon Perks')
 
-        # Copy Filtered Manifest Weapon Data
-        weapon_perk_filtered_df = apply_all_filters(manifest_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset)
+        # Datasets Used On This Page
+        weapon_manifest_file_filtered_all = datasets.get('weapon_manifest_file_filtered_all')
+
+        # Copy Filtered Manifest Weapon Data, With Its Manifest Row Positions - The Perk Index Works In Positions, Not Index Labels
+        weapon_perk_filtered_df = weapon_manifest_file_filtered_all
+        weapon_perk_positions = weapon_item_index.positions_for(weapon_perk_filtered_df['Weapon Hash'])
 
         # Set up columns for multiselect
         col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 2, 2])
 
         # Search for Slot 3 Selection
-        slot3_cols = weapon_perk_filtered_df.filter(regex='^Slot 3').columns
-        slot3_perks = sorted(weapon_perk_filtered_df.filter(regex='^Slot 3').stack().unique())
+        slot3_perks = weapon_perk_index.perk_options('Slot 3', weapon_perk_positions)
         slot_3 = col1.multiselect('Select Perk(s) in Slot 3', slot3_perks)
+        slot_3_all = col1.checkbox('Match All', key='slot_3_match_all', help='Only Weapons That Can Roll Every Selected Slot 3 Perk, Not Just One')
         if len(slot_3) > 0:
-            slot_3_list = weapon_perk_filtered_df[slot3_cols].apply(lambda x: any(item in x.values for item in slot_3), axis=1)
+            slot_3_rows = weapon_perk_index.rows_with_all('Slot 3', slot_3) if slot_3_all else weapon_perk_index.rows_with_any('Slot 3', slot_3)
+            slot_3_list = np.isin(weapon_perk_positions, slot_3_rows)
             weapon_perk_filtered_df = weapon_perk_filtered_df.loc[slot_3_list]
+            weapon_perk_positions = weapon_perk_positions[slot_3_list]
         slot_3_count = col1.metric('Filtered Data Count', len(weapon_perk_filtered_df))
 
         # Search for Slot 4 Selection
-        slot4_cols = weapon_perk_filtered_df.filter(regex='^Slot 4').columns
-        slot4_perks = sorted(weapon_perk_filtered_df.filter(regex='^Slot 4').stack().unique())
+        slot4_perks = weapon_perk_index.perk_options('Slot 4', weapon_perk_positions)
         slot_4 = col2.multiselect('Select Perk(s) in Slot 4', slot4_perks)
+        slot_4_all = col2.checkbox('Match All', key='slot_4_match_all', help='Only Weapons That Can Roll Every Selected Slot 4 Perk, Not Just One')
         if len(slot_4) > 0:
-            slot_4_list = weapon_perk_filtered_df[slot4_cols].apply(lambda x: any(item in x.values for item in slot_4), axis=1)
+            slot_4_rows = weapon_perk_index.rows_with_all('Slot 4', slot_4) if slot_4_all else weapon_perk_index.rows_with_any('Slot 4', slot_4)
+            slot_4_list = np.isin(weapon_perk_positions, slot_4_rows)
             weapon_perk_filtered_df = weapon_perk_filtered_df.loc[slot_4_list]
+            weapon_perk_positions = weapon_perk_positions[slot_4_list]
         slot_4_count = col2.metric('Filtered Data Count', len(weapon_perk_filtered_df))
 
         # Search for Slot 2 Selection
-        slot2_cols = weapon_perk_filtered_df.filter(regex='^Slot 2').columns
-        slot2_perks = sorted(weapon_perk_filtered_df.filter(regex='^Slot 2').stack().unique())
+        slot2_perks = weapon_perk_index.perk_options('Slot 2', weapon_perk_positions)
         slot_2 = col3.multiselect('Select Perk(s) in Slot 2', slot2_perks)
+        slot_2_all = col3.checkbox('Match All', key='slot_2_match_all', help='Only Weapons That Can Roll Every Selected Slot 2 Perk, Not Just One')
         if len(slot_2) > 0:
-            slot_2_list = weapon_perk_filtered_df[slot2_cols].apply(lambda x: any(item in x.values for item in slot_2), axis=1)
+            slot_2_rows = weapon_perk_index.rows_with_all('Slot 2', slot_2) if slot_2_all else weapon_perk_index.rows_with_any('Slot 2', slot_2)
+            slot_2_list = np.isin(weapon_perk_positions, slot_2_rows)
             weapon_perk_filtered_df = weapon_perk_filtered_df.loc[slot_2_list]
+            weapon_perk_positions = weapon_perk_positions[slot_2_list]
         slot_2_count = col3.metric('Filtered Data Count', len(weapon_perk_filtered_df))
 
         # Search for Slot 1 Selection
-        slot1_cols = weapon_perk_filtered_df.filter(regex='^Slot 1').columns
-        slot1_perks = sorted(weapon_perk_filtered_df.filter(regex='^Slot 1').stack().unique())
+        slot1_perks = weapon_perk_index.perk_options('Slot 1', weapon_perk_positions)
         slot_1 = col4.multiselect('Select Perk(s) in Slot 1', slot1_perks)
+        slot_1_all = col4.checkbox('Match All', key='slot_1_match_all', help='Only Weapons That Can Roll Every Selected Slot 1 Perk, Not Just One')
         if len(slot_1) > 0:
-            slot_1_list = weapon_perk_filtered_df[slot1_cols].apply(lambda x: any(item in x.values for item in slot_1), axis=1)
+            slot_1_rows = weapon_perk_index.rows_with_all('Slot 1', slot_1) if slot_1_all else weapon_perk_index.rows_with_any('Slot 1', slot_1)
+            slot_1_list = np.isin(weapon_perk_positions, slot_1_rows)
             weapon_perk_filtered_df = weapon_perk_filtered_df.loc[slot_1_list]
+            weapon_perk_positions = weapon_perk_positions[slot_1_list]
         slot_1_count = col4.metric('Filtered Data Count', len(weapon_perk_filtered_df))
 
         # Create table, based on selected weapon type
-        if selected_type != 'Select all':
-            weapon_perk_filtered_df = load_weapon_type_data(weapon_perk_filtered_df, selected_type)
-        else:
-            weapon_perk_filtered_df = weapon_perk_filtered_df[['Weapon Name With Season', 'Weapon Name', 'Weapon Season', 'Weapon Hash', 'Weapon Tier', 'Weapon Type', 'Weapon Archetype', 'Weapon Slot', 'Weapon Element', 'Weapon Current Version', 'Weapon Power Cap', 'Is Sunset']]
+        weapon_perk_filtered_df = load_weapon_type_data(weapon_perk_filtered_df, selected_type)
 
         # Import Functions
         from data_preperation import owned_weapons_perk_list
 
         if uploaded_weapon_file is not None:
-            # Create List of Owned Weapon's Perks
-            owned_weapons_perk_list = owned_weapons_perk_list(weapon_manifest_file_filtered_all, dim_weapon_data_filtered_all)
+            # Create List of Owned Weapon's Perks - Built Once Per Upload, Then Narrowed To The Filtered Weapons (filters follow the hash)
+            owned_weapons_perk_list = datasets.get('owned_weapons_perk_list')
+            owned_weapons_perk_list = owned_weapons_perk_list.loc[owned_weapons_perk_list['Weapon Hash'].isin(weapon_manifest_file_filtered_all['Weapon Hash'])]
             available_weapons_perk_list = owned_weapons_perk_list
 
             # Set Up Owned Perk Count
             dfs_to_merge = []
             slots = ['Slot 1', 'Slot 2', 'Slot 3', 'Slot 4']
             slot_perks = [slot_1, slot_2, slot_3, slot_4]
+            slot_match_all = [slot_1_all, slot_2_all, slot_3_all, slot_4_all]
 
             if (len(slot_1) + len(slot_2) + len(slot_3) + len(slot_4)) > 0:
-                for s, perks in zip(slots, slot_perks):
+                for s, perks, match_all in zip(slots, slot_perks, slot_match_all):
                     if len(perks) > 0:
                         temp_df = owned_weapons_perk_list.loc[
                             (owned_weapons_perk_list['Slot'] == s) & (owned_weapons_perk_list['Perk'].isin(perks))]
+                        # Match All Keeps One Row Per Roll That Has Every Selected Perk In The Slot
+                        if match_all:
+                            temp_df = temp_df.loc[temp_df.groupby('Weapon ID')['Perk'].transform('nunique') == len(perks)].drop_duplicates(subset='Weapon ID')
                         dfs_to_merge.append(temp_df[['Weapon Name', 'Weapon ID']])  # Only retain the 'Weapon ID' column
 
                 # Start with the first dataframe and successively merge with others
@@ -519,17 +538,18 @@ def main():
                 weapon_perk_filtered_df = weapon_perk_filtered_df.merge(weapon_count, on='Weapon Name', how='left')
                 weapon_perk_filtered_df.insert(1, 'With Perks', weapon_perk_filtered_df.pop('count'))
                 weapon_perk_filtered_df = weapon_perk_filtered_df.sort_values(by=['With Perks', 'Weapon Name With Season'], ascending=[False, True])
-                weapon_count = session_state.dim_weapon_data.groupby('Weapon Hash').size().reset_index(name='count')
-                weapon_perk_filtered_df = weapon_perk_filtered_df.merge(weapon_count, on='Weapon Hash', how='left')
-                weapon_perk_filtered_df.insert(1, 'Owned', weapon_perk_filtered_df.pop('count'))
+                weapon_perk_filtered_df = attach_ownership(weapon_perk_filtered_df, datasets.get('ownership_summary'), name='Owned')
                 weapon_perk_filtered_df = weapon_perk_filtered_df.sort_values(by=['Owned', 'Weapon Name With Season'], ascending=[False, True])
             else:
-                weapon_count = session_state.dim_weapon_data.groupby('Weapon Hash').size().reset_index(name='count')
-                weapon_perk_filtered_df = weapon_perk_filtered_df.merge(weapon_count, on='Weapon Hash', how='left')
-                weapon_perk_filtered_df.insert(1, 'Owned', weapon_perk_filtered_df.pop('count'))
+                weapon_perk_filtered_df = attach_ownership(weapon_perk_filtered_df, datasets.get('ownership_summary'), name='Owned')
                 weapon_perk_filtered_df = weapon_perk_filtered_df.sort_values(by=['Owned', 'Weapon Name With Season'], ascending=[False, True])
 
         with st.expander('Available Weapons', expanded=True):
+            # Show Stats Against The Rest Of Their Archetype
+            if selected_type != 'Select all':
+                stat_view = st.selectbox('Show Stats As', stat_view_modes, help='Stat values, or how each stat ranks within the weapon\'s type and archetype')
+                weapon_perk_filtered_df = apply_stat_view(weapon_perk_filtered_df, weapon_stat_index, weapon_item_index, stat_view)
+
             # Create table
             grid_table = create_grid_table(weapon_perk_filtered_df, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset)
 
@@ -537,10 +557,10 @@ def main():
 
             try:
                 selected_weapon = grid_table.selected_rows
-                selected_weapon_name = selected_weapon[0]["Weapon Name"]
+                selected_weapon_name = weapon_item_index.value(selected_weapon[0]["Weapon Hash"], 'Weapon Name')
 
-                # Filter Results For Selected Weapon
-                available_weapons_perk_list = available_weapons_perk_list.loc[available_weapons_perk_list['Weapon Name'] == selected_weapon_name]
+                # Filter Results For Selected Weapon - Every Hash Sharing Its Name
+                available_weapons_perk_list = available_weapons_perk_list.loc[available_weapons_perk_list['Weapon Hash'].isin(weapon_item_index.hashes_for_name(selected_weapon_name))]
 
                 # Filter For Selected Perks
                 # TODO
@@ -574,11 +594,149 @@ def main():
                 pass
 
             # Create hyperlinks
-            create_hyperlinks_v2(weapon_perk_filtered_df, grid_table, col5)
+            create_hyperlinks_v2(weapon_item_index, grid_table, col5)
+
+        with st.expander('Wishlist Matches', expanded=False):
+            # Score Owned Rolls Against A DIM Wishlist (perks listed by name)
+            uploaded_wishlist_file = st.file_uploader('DIM Wishlist Uploader', type='txt', help='dimwishlist:item=<hash>&perks=<perk>,<perk> lines, with perks named as in the manifest')
+            if uploaded_weapon_file is None:
+                st.write('Load DIM Weapon Data To Match Owned Rolls')
+            elif uploaded_wishlist_file is not None:
+                from wishlist import load_wishlist, match_wishlist, wishlist_roll_summary, wishlist_resolution
+
+                compiled_wishlist = load_wishlist(uploaded_wishlist_file.getvalue().decode('utf-8', errors='replace'), weapon_manifest_file)
+                wishlist_perk_list = datasets.get('owned_weapons_perk_list')
+                wishlist_perk_list = wishlist_perk_list.loc[wishlist_perk_list['Weapon Hash'].isin(weapon_manifest_file_filtered_all['Weapon Hash'])]
+                wishlist_matches = match_wishlist(compiled_wishlist, wishlist_perk_list)
+
+                wishlist_counts = wishlist_resolution(compiled_wishlist)
+                col1, col2, col3 = st.columns(3)
+                col1.metric('Wishlist Entries', wishlist_counts['entries'])
+                col2.metric('Entries With Unknown Perks', wishlist_counts['unresolved'], help='Entries naming a perk the weapon can\'t roll never match')
+                col3.metric('Owned Rolls Matched', wishlist_matches['Weapon ID'].nunique())
+
+                # Most Entries Unresolved Usually Means The Wishlist Lists Perk Hashes, Which The Manifest Can't Name
+                if wishlist_counts['unresolved'] > wishlist_counts['entries'] / 2:
+                    if wishlist_counts['unresolved_hashes'] > 0:
+                        st.warning('{:,} of {:,} Wishlist Entries List Perks By Hash, Which The Manifest Can\'t Name - Those Entries Never Match. '
+                                   'Use A Wishlist With Perk Names'.format(wishlist_counts['unresolved_hashes'], wishlist_counts['entries']))
+                    else:
+                        st.warning('{:,} of {:,} Wishlist Entries Name Perks These Weapons Can\'t Roll - Those Entries Never Match'.format(
+                            wishlist_counts['unresolved'], wishlist_counts['entries']))
+                st.dataframe(wishlist_roll_summary(wishlist_matches), use_container_width=True)
+                st.dataframe(wishlist_matches, use_container_width=True)
 
     def build_tool(session_state, manifest_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
         st.title('Build Tool')
-        st.write('Coming soon!')
+
+        if uploaded_armour_file is None:
+            st.write('Load DIM Armour Data To Find Builds')
+            return
+
+        from build_optimizer import optimize_builds, armour_skyline_report, stat_names, stat_pairs
+        armour_data = datasets.get('dim_armour_data')
+
+        # Set up columns for build options
+        col1, col2, col3, col4 = st.columns([3, 5, 2, 2])
+        characters = sorted(armour_data['Character'].dropna().unique().tolist())
+        selected_character = col1.selectbox('Select a Class', characters, help='Select the Class to Build For')
+        exotics = sorted(armour_data.loc[(armour_data['Character'] == selected_character) & (armour_data['Tier'] == 'Exotic'), 'Name'].unique().tolist())
+        selected_exotic = col2.selectbox('Lock an Exotic', ['Any Exotic'] + exotics, help='Lock an Exotic Into Every Build, or Allow Any Single Exotic')
+        masterworked = col3.checkbox('Masterworked', value=True, help='Add 2 To Every Stat For Masterworked Armour')
+        top_n = int(col4.number_input('Number of Builds', min_value=1, max_value=100, value=10, step=1))
+
+        # Set up columns for target tiers
+        tier_columns = st.columns(6)
+        target_tiers = tuple(int(col.number_input('Min {} Tier'.format(name), min_value=0, max_value=10, value=0, step=1)) for col, name in zip(tier_columns, stat_names))
+
+        # Find The Top Builds
+        exotic_lock = None if selected_exotic == 'Any Exotic' else selected_exotic
+        with st.spinner('Searching Builds'):
+            builds = optimize_builds(armour_data, selected_character, exotic_lock, target_tiers, masterworked, top_n)
+
+        if len(builds) == 0:
+            st.write('No Builds Reach The Target Tiers')
+        else:
+            st.dataframe(builds, use_container_width=True)
+
+        with st.expander('Redundant Armour', expanded=False):
+            # Pieces Another Piece For The Same Class And Slot Matches Or Beats On Every Base Stat, Or On The Chosen Stat Pairs
+            col1, col2 = st.columns([5, 2])
+            selected_pairs = col1.multiselect('Also Compare On Stat Pairs', list(stat_pairs), help='Flag Pieces Beaten On Just These Two Stats')
+            dominated_only = col2.checkbox('Only Show Dominated Pieces', value=True)
+            skyline_report = armour_skyline_report(armour_data, tuple(selected_pairs))
+            skyline_report = skyline_report.loc[skyline_report['Character'] == selected_character]
+            if dominated_only:
+                skyline_report = skyline_report.loc[skyline_report.filter(like='Dominated').any(axis=1)]
+            st.dataframe(skyline_report, use_container_width=True)
+
+    def vault_history(session_state, manifest_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
+        st.title('Vault History')
+
+        from snapshot_store import load_snapshot_store
+        snapshot_store = load_snapshot_store()
+
+        # Each Upload Only Opens The History Of The Vault It Came From - Matched On The Upload's Own Item Ids, Not A Name Anyone Could Type
+        uploads = [('weapons', 'dim_weapon_data', weapon_upload_digest), ('armour', 'dim_armour_data', armour_upload_digest)]
+        owners = {kind: (snapshot_store.owner(kind, datasets.get(dataset)), dataset, digest) for kind, dataset, digest in uploads if digest is not None}
+        col1, col2 = st.columns([5, 2])
+        col1.write('Upload Your DIM Exports To Save And Compare Snapshots Of That Vault')
+
+        # Save The Current Uploads - An Unchanged Vault Adds A Snapshot Without Storing Any Items Again
+        if col2.button('Save Snapshot', disabled=len(owners) == 0, help='Save The Uploaded Weapons And Armour As Of Now'):
+            for kind, (owner, dataset, digest) in owners.items():
+                snapshot_store.save(owner, kind, datasets.get(dataset), upload_digest=digest, manifest_version=weapon_manifest_version)
+
+        for kind, label in [('weapons', 'Weapons'), ('armour', 'Armour')]:
+            st.subheader(label)
+            if kind not in owners:
+                st.write('Upload DIM {} Data To See Its History'.format(label))
+                continue
+            snapshots = snapshot_store.snapshots(owners[kind][0], kind)
+            if len(snapshots) < 2:
+                st.write('{} Snapshot{} Saved - Save Another To See What Changed'.format(len(snapshots), '' if len(snapshots) == 1 else 's'))
+                continue
+
+            # Compare Any Two Snapshots, The Latest Against The One Before By Default
+            labels = {row['Snapshot']: '{} - {:,} Items'.format(row['Uploaded'], row['Items']) for _, row in snapshots.iterrows()}
+            col1, col2 = st.columns([1, 1])
+            old_snapshot = col1.selectbox('From', list(labels), index=1, format_func=labels.get, key='{}_from_snapshot'.format(kind))
+            new_snapshot = col2.selectbox('To', list(labels), index=0, format_func=labels.get, key='{}_to_snapshot'.format(kind))
+            delta = snapshot_store.delta(old_snapshot, new_snapshot)
+
+            col1, col2, col3 = st.columns([1, 1, 1])
+            col1.metric(label='Added', value=len(delta['Added']))
+            col2.metric(label='Removed', value=len(delta['Removed']))
+            col3.metric(label='Changed', value=len(delta['Changed']))
+            for change, df in delta.items():
+                if len(df) > 0:
+                    with st.expander('{} {}'.format(change, label), expanded=False):
+                        st.dataframe(df, use_container_width=True)
+
+            with st.expander('{} Snapshots'.format(label), expanded=False):
+                st.dataframe(snapshots.drop(columns=['User', 'Kind']), use_container_width=True)
+
+    def admin(session_state, manifest_weapon_data, selected_tier, selected_type, selected_archetype, selected_slot, selected_element, selected_sunset):
+        st.title('Admin')
+
+        # Upload Cache Metrics
+        upload_cache_stats = upload_cache.cache_stats()
+        col1, col2, col3, col4 = st.columns([4, 4, 4, 4])
+        col1.metric(label='Cached Uploads', value=upload_cache_stats['entries'], help='Processed Weapon, Armour And Perk Tables Held In Memory')
+        col2.metric(label='Cache Size (MB)', value='{:,.1f} / {:,.0f}'.format(upload_cache_stats['bytes'] / 2 ** 20, upload_cache_stats['budget_bytes'] / 2 ** 20),
+                    help='Memory Used Against The Budget (D2VM_UPLOAD_CACHE_MB)')
+        col3.metric(label='Hit Rate', value='{:.0%}'.format(upload_cache_stats['hit_rate']),
+                    help='Hits: {hits:,} | Misses: {misses:,}'.format(**upload_cache_stats))
+        col4.metric(label='Evicted / Expired', value='{evictions:,} / {expirations:,}'.format(**upload_cache_stats),
+                    help='Entries Dropped For Space / Entries Older Than {:,.0f}s (D2VM_UPLOAD_CACHE_TTL)'.format(upload_cache_stats['ttl_seconds']))
+
+        # Cached Entries, Most Recently Used First
+        st.dataframe(upload_cache.entry_table(), use_container_width=True)
+        if st.button('Clear Upload Cache'):
+            upload_cache.clear()
+
+        # Datasets This Rerun Built Or Took From The Upload Cache
+        st.write('Datasets This Rerun: {:,} Computed | {:,} Reused'.format(len(datasets.computed), len(datasets.reused)))
 
 # Call the selected page function
     page = {
@@ -595,9 +753,19 @@ def main():
                                              selected_archetype, selected_slot, selected_element, selected_sunset),
         'Build Tool': lambda: build_tool(session_state, weapon_manifest_file, selected_tier, selected_type,
                                          selected_archetype, selected_slot, selected_element, selected_sunset),
+        'Vault History': lambda: vault_history(session_state, weapon_manifest_file, selected_tier, selected_type, selected_archetype,
+                                               selected_slot, selected_element, selected_sunset),
+        'Admin': lambda: admin(session_state, weapon_manifest_file, selected_tier, selected_type, selected_archetype,
+                               selected_slot, selected_element, selected_sunset),
     }[selection]
 
-    page()
+    with timed_block('Page: {}'.format(selection)):
+        page()
+
+    # Step Timings For This Rerun
+    if instrumentation_enabled:
+        with st.sidebar.expander('Rerun Timings', expanded=False):
+            st.dataframe(timing_table(recorder.end_run()), use_container_width=True)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
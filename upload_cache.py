@@ -0,0 +1,99 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from caching import cache_resource
+
+# Upload Cache Limits - Override Per Deployment With Environment Variables
+upload_cache_budget_mb = float(os.environ.get('D2VM_UPLOAD_CACHE_MB', 512))
+upload_cache_ttl_seconds = float(os.environ.get('D2VM_UPLOAD_CACHE_TTL', 3600))
+
+
+def upload_digest(uploaded_file):
+    # Content hash of an upload, so identical files from different users share one entry
+    data = uploaded_file.getvalue()
+    return hashlib.sha256(data).hexdigest()
+
+def value_bytes(value):
+    # Memory held by a cached value, so every kind of entry counts against the budget - pandas objects and arrays report their
+    # buffers (object arrays their items too), containers are summed through, and anything else falls back to sys.getsizeof
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes) + (sum(sys.getsizeof(item) for item in value.flat) if value.dtype == object else 0)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_bytes(key) + value_bytes(item) for key, item in value.items())
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(value_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+class UploadCache:
+    # Processed uploads and the datasets built from them, shared across sessions and keyed by (product, digest, manifest version) -
+    # the digest is the upload's for an upload, or the dataset's parameters for a dataset. Evicted least recently used
+    # first once over the byte budget, and dropped once older than the TTL
+    def __init__(self, budget_bytes, ttl_seconds):
+        self.budget_bytes = budget_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry['stored'] > self.ttl_seconds:
+                del self.entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry['value']
+
+    def put(self, key, value):
+        size = value_bytes(value)
+        with self.lock:
+            self.entries.pop(key, None)
+            # Anything Bigger Than The Whole Budget Is Returned But Not Kept
+            if size > self.budget_bytes:
+                return
+            self.entries[key] = {'value': value, 'bytes': size, 'stored': time.monotonic()}
+            while self.size_bytes() > self.budget_bytes:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def size_bytes(self):
+        return sum(entry['bytes'] for entry in self.entries.values())
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def cache_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self.entries), 'bytes': self.size_bytes(), 'budget_bytes': self.budget_bytes, 'ttl_seconds': self.ttl_seconds,
+                    'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+                    'evictions': self.evictions, 'expirations': self.expirations}
+
+    def entry_table(self):
+        now = time.monotonic()
+        with self.lock:
+            rows = [{'Product': key[0], 'Digest': key[1][:12], 'Manifest Version': key[2][:12], 'Size (MB)': round(entry['bytes'] / 2 ** 20, 2),
+                     'Age (s)': int(now - entry['stored'])} for key, entry in reversed(self.entries.items())]
+        return pd.DataFrame(rows, columns=['Product', 'Digest', 'Manifest Version', 'Size (MB)', 'Age (s)'])
+
+@cache_resource
+def load_upload_cache():
+    return UploadCache(int(upload_cache_budget_mb * 2 ** 20), upload_cache_ttl_seconds)
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from csv_processing import normalize_perk_names
+from caching import cache_data
+
+# DIM Wishlist Lines - dimwishlist:item=<hash>&perks=<perk>,<perk>...#notes:<text>, With //notes: Lines Applying To The Block Below Them
+wishlist_pattern = r'^dimwishlist:item=(-?\d+)(?:&perks=([^#]*))?(?:#notes:(.*))?$'
+wishlist_wildcard_item = 69420
+mask_bits = 64
+
+
+def parse_wishlist(text, perk_hash_names=None):
+    # One row per wishlist entry. Perks are perk names as they appear in the manifest - numeric perk hashes are looked up in
+    # perk_hash_names when given, and left as they are (so never match) otherwise
+    lines = pd.Series(text.splitlines(), dtype=object).str.strip()
+    parts = lines.str.extract(wishlist_pattern)
+    parts.columns = ['Item', 'Perks', 'Notes']
+
+    # Block Notes Carry Down To The Entries Below Them Until A Blank Line
+    block_notes = pd.Series(np.where(lines.str.startswith('//notes:'), lines.str.slice(len('//notes:')), np.where(lines == '', '', None)), dtype=object).ffill()
+    entries = parts.assign(Line=np.arange(1, len(lines) + 1), Notes=parts['Notes'].fillna(block_notes).fillna('')).dropna(subset=['Item'])
+
+    # Negative Items Are Trash Entries, And DIM's Any-Weapon Wildcard Isn't Supported Here
+    item = entries['Item'].astype(np.int64)
+    entries = entries.assign(**{'Weapon Hash': item.abs(), 'Trash': item < 0})
+    entries = entries.loc[entries['Weapon Hash'] != wishlist_wildcard_item]
+
+    perks = entries['Perks'].fillna('').str.split(',').map(lambda tokens: [token.strip() for token in tokens if token.strip() != ''])
+    if perk_hash_names is not None:
+        perks = perks.map(lambda tokens: [perk_hash_names.get(int(token), token) if token.isdigit() else token for token in tokens])
+    df = pd.DataFrame({'Entry': np.arange(len(entries)), 'Line': entries['Line'].to_numpy(), 'Weapon Hash': entries['Weapon Hash'].to_numpy(),
+                       'Perks': perks.to_numpy(), 'Notes': entries['Notes'].to_numpy(), 'Trash': entries['Trash'].to_numpy(),
+                       'Perk Hashes': perks.map(lambda tokens: any(token.isdigit() for token in tokens)).to_numpy(dtype=bool)})
+    return df
+
+def perk_bits(manifest_weapon_data):
+    # Each weapon's rollable perks numbered from 0 in manifest column order, so a perk set becomes a bitmask local to the weapon hash
+    slot_columns = [col for col in manifest_weapon_data.columns if col.startswith('Slot') and ' Perk ' in col]
+    stacked = manifest_weapon_data.set_index('Weapon Hash')[slot_columns].stack()
+    df = pd.DataFrame({'Weapon Hash': stacked.index.get_level_values(0).astype(np.int64), 'Perk': stacked.astype(str).to_numpy()})
+    df = df.drop_duplicates().reset_index(drop=True)
+    df['Bit'] = df.groupby('Weapon Hash').cumcount().astype(np.int64)
+    return df
+
+def or_masks(groups, bits, group_count, words):
+    # Bitwise OR of every (group, bit) pair into one mask per group, as group_count x words uint64 words
+    masks = np.zeros((group_count, words), dtype=np.uint64)
+    np.bitwise_or.at(masks, (groups, bits // mask_bits), np.left_shift(np.uint64(1), (bits % mask_bits).astype(np.uint64)))
+    return masks
+
+def compile_wishlist(entries, bits):
+    # Per-entry perk masks over the entry weapon's own perks. Entries naming a perk the weapon can't roll are kept but marked unresolved
+    words = max(1, -(-(int(bits['Bit'].max()) + 1) // mask_bits)) if len(bits) > 0 else 1
+    exploded = entries[['Entry', 'Weapon Hash', 'Perks']].explode('Perks').dropna(subset=['Perks'])
+    names, _ = normalize_perk_names(exploded['Perks'].to_numpy())
+    exploded = exploded.assign(Perk=names).merge(bits, on=['Weapon Hash', 'Perk'], how='left')
+
+    resolved = np.ones(len(entries), dtype=bool)
+    resolved[exploded.loc[exploded['Bit'].isna(), 'Entry'].to_numpy(dtype=np.int64)] = False
+    found = exploded.dropna(subset=['Bit'])
+    masks = or_masks(found['Entry'].to_numpy(dtype=np.int64), found['Bit'].to_numpy(dtype=np.int64), len(entries), words)
+    return {'entries': entries.assign(Resolved=resolved), 'masks': masks, 'bits': bits, 'words': words}
+
+def wishlist_resolution(compiled):
+    # How many entries can match at all - unresolved entries name a perk the weapon can't roll, or a perk hash with no name to map to
+    entries = compiled['entries']
+    unresolved = ~entries['Resolved']
+    return {'entries': len(entries), 'unresolved': int(unresolved.sum()), 'unresolved_hashes': int((unresolved & entries['Perk Hashes']).sum())}
+
+def roll_masks(owned_perk_list, bits, words):
+    # One mask per owned roll (Weapon ID) from the per-roll perk table, over the same per-hash bits as the wishlist
+    rolls = owned_perk_list[['Weapon ID', 'Weapon Hash', 'Weapon Name']].drop_duplicates(subset=['Weapon ID']).reset_index(drop=True)
+    rolls['Weapon Hash'] = rolls['Weapon Hash'].astype(np.int64)
+    roll_codes = pd.Index(rolls['Weapon ID']).get_indexer(owned_perk_list['Weapon ID'])
+    perks = pd.DataFrame({'Roll': roll_codes, 'Weapon Hash': owned_perk_list['Weapon Hash'].to_numpy(dtype=np.int64),
+                          'Perk': owned_perk_list['Perk'].astype(str).to_numpy()}).merge(bits, on=['Weapon Hash', 'Perk'], how='inner')
+    masks = or_masks(perks['Roll'].to_numpy(dtype=np.int64), perks['Bit'].to_numpy(dtype=np.int64), len(rolls), words)
+    return rolls, masks
+
+def match_wishlist(compiled, owned_perk_list):
+    # Every (owned roll, wishlist entry) pair on the same hash where the roll has every perk the entry asks for
+    entries, entry_masks = compiled['entries'], compiled['masks']
+    rolls, masks = roll_masks(owned_perk_list, compiled['bits'], compiled['words'])
+
+    # Pair Rolls With The Resolved Entries For Their Hash, Then Test All Pairs At Once
+    live = entries.loc[entries['Resolved'], ['Entry', 'Weapon Hash']]
+    pairs = pd.DataFrame({'Roll': np.arange(len(rolls)), 'Weapon Hash': rolls['Weapon Hash'].to_numpy()}).merge(live, on='Weapon Hash')
+    roll_rows, entry_rows = pairs['Roll'].to_numpy(), pairs['Entry'].to_numpy()
+    wanted = entry_masks[entry_rows]
+    matched = ((masks[roll_rows] & wanted) == wanted).all(axis=1)
+    roll_rows, entry_rows = roll_rows[matched], entry_rows[matched]
+
+    df = pd.DataFrame({'Weapon ID': rolls['Weapon ID'].to_numpy()[roll_rows], 'Weapon Name': rolls['Weapon Name'].to_numpy()[roll_rows],
+                       'Weapon Hash': rolls['Weapon Hash'].to_numpy()[roll_rows], 'Line': entries['Line'].to_numpy()[entry_rows],
+                       'Perks': [', '.join(perks) for perks in entries['Perks'].to_numpy()[entry_rows]], 'Notes': entries['Notes'].to_numpy()[entry_rows],
+                       'Trash': entries['Trash'].to_numpy()[entry_rows]})
+    return df
+
+def wishlist_roll_summary(matches):
+    # One row per matched roll - how many wishlist and trash entries it satisfies
+    counts = matches.assign(**{'Wishlist Matches': ~matches['Trash'], 'Trash Matches': matches['Trash']})
+    df = counts.groupby(['Weapon ID', 'Weapon Name'], sort=False)[['Wishlist Matches', 'Trash Matches']].sum()
+    df = df.reset_index().sort_values(by=['Wishlist Matches', 'Weapon Name'], ascending=[False, True]).reset_index(drop=True)
+    df['Weapon ID'] = 'id:' + df['Weapon ID'].astype(str)
+    df.index += 1
+    return df
+
+@cache_data
+def load_wishlist(text, manifest_weapon_data, perk_hash_names=None):
+    # perk_hash_names maps numeric perk hashes to manifest perk names - the bundled manifest lists perks by name only, so without
+    # one, entries written with perk hashes stay unresolved and wishlist_resolution counts them
+    return compile_wishlist(parse_wishlist(text, perk_hash_names), perk_bits(manifest_weapon_data))